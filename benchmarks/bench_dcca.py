@@ -0,0 +1,108 @@
+"""Benchmarks of DCCA."""
+import numpy as np
+import fathon
+from . import common
+
+
+class ComputeFlucVec:
+    params = [common.SIZES, ['absVals', 'noAbsVals'], ['forward', 'revSeg', 'overlap', 'float32'], common.POL_ORDS, common.METHODS]
+    param_names = ['N', 'values', 'mode', 'polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, values, mode, polOrd, method):
+        common.requireMethod(method, polOrd)
+        common.skipIf(values == 'absVals' and method == 'fast', 'method `fast` cannot use absolute values')
+        common.requireSize(N, common.workKind(method, mode == 'overlap'))
+        dtype = np.float32 if mode == 'float32' else np.float64
+        self.dcca = fathon.DCCA(common.noise(N), common.correlated(N), dtype=dtype)
+        self.winSizes = common.winSizes(N, polOrd)
+        self.kwargs = {'polOrd': polOrd, 'absVals': values == 'absVals', 'overlap': mode == 'overlap',
+                       'revSeg': mode == 'revSeg', 'method': method}
+
+    def time_computeFlucVec(self, N, values, mode, polOrd, method):
+        self.dcca.computeFlucVec(self.winSizes, **self.kwargs)
+
+    def peakmem_computeFlucVec(self, N, values, mode, polOrd, method):
+        self.dcca.computeFlucVec(self.winSizes, **self.kwargs)
+
+
+class PolOrd:
+    params = [[1, 2, 3, 4, 5], common.METHODS]
+    param_names = ['polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, polOrd, method):
+        common.requireMethod(method, polOrd)
+        N = 10**5
+        self.dcca = fathon.DCCA(common.noise(N), common.correlated(N))
+        self.winSizes = common.winSizes(N, polOrd)
+
+    def time_computeFlucVec(self, polOrd, method):
+        self.dcca.computeFlucVec(self.winSizes, polOrd=polOrd, absVals=False, revSeg=True, method=method)
+
+
+class ComputeRho:
+    params = [common.SIZES, ['forward', 'revSeg', 'overlap'], common.POL_ORDS, common.METHODS]
+    param_names = ['N', 'mode', 'polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, mode, polOrd, method):
+        common.requireMethod(method, polOrd)
+        common.requireSize(N, common.workKind(method, mode == 'overlap'))
+        self.dcca = fathon.DCCA(common.noise(N), common.correlated(N))
+        self.winSizes = common.winSizes(N, polOrd)
+        self.kwargs = {'polOrd': polOrd, 'overlap': mode == 'overlap', 'revSeg': mode == 'revSeg', 'method': method}
+
+    def time_computeRho(self, N, mode, polOrd, method):
+        self.dcca.computeRho(self.winSizes, **self.kwargs)
+
+    def peakmem_computeRho(self, N, mode, polOrd, method):
+        self.dcca.computeRho(self.winSizes, **self.kwargs)
+
+
+class RhoThresholds:
+    params = [[10**3, 10**4], [100, 1000], ['gsl', 'direct', 'fast']]
+    param_names = ['L', 'nSim', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, L, nSim, method):
+        common.requireSize(L * nSim, common.workKind(method, False))
+        self.dcca = fathon.DCCA()
+        self.winSizes = common.winSizes(L, 1, count=10)
+
+    def time_rhoThresholds(self, L, nSim, method):
+        self.dcca.rhoThresholds(L, self.winSizes, nSim, 0.95, method=method, seed=common.SEED)
+
+
+class RhoMatrix:
+    params = [[10**4, 10**5], [4, 16, 64], ['direct', 'ortho']]
+    param_names = ['N', 'nSeries', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, nSeries, method):
+        self.panel = np.array([common.noise(N, k) for k in range(nSeries)])
+        self.winSizes = common.winSizes(N, 1, count=10)
+
+    def time_rhoMatrix(self, N, nSeries, method):
+        fathon.DCCA.rhoMatrix(self.panel, self.winSizes, method=method)
+
+    def peakmem_rhoMatrix(self, N, nSeries, method):
+        fathon.DCCA.rhoMatrix(self.panel, self.winSizes, method=method)
+
+
+class Batch:
+    params = [[10**3, 10**4, 10**5], [10, 100], ['gsl', 'direct']]
+    param_names = ['N', 'nSeries', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, nSeries, method):
+        common.requireSize(N * nSeries, common.workKind(method, False))
+        self.tsVecs1 = np.array([common.noise(N, k) for k in range(nSeries)])
+        self.tsVecs2 = self.tsVecs1[::-1].copy()
+        self.winSizes = common.winSizes(N, 1)
+
+    def time_batch(self, N, nSeries, method):
+        fathon.DCCA.batch(self.tsVecs1, self.tsVecs2, self.winSizes, method=method)
+
+    def peakmem_batch(self, N, nSeries, method):
+        fathon.DCCA.batch(self.tsVecs1, self.tsVecs2, self.winSizes, method=method)
@@ -0,0 +1,93 @@
+"""Benchmarks of DFA and StreamDFA."""
+import numpy as np
+import fathon
+from . import common
+
+
+class ComputeFlucVec:
+    params = [common.SIZES, ['forward', 'revSeg', 'unbiased', 'float32'], common.POL_ORDS, common.METHODS]
+    param_names = ['N', 'mode', 'polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, mode, polOrd, method):
+        common.requireMethod(method, polOrd)
+        common.skipIf(mode == 'unbiased' and method == 'fast', 'method `fast` cannot compute the unbiased DFA')
+        common.requireSize(N, common.workKind(method, mode == 'unbiased'))
+        self.dfa = fathon.DFA(common.noise(N), dtype=np.float32 if mode == 'float32' else np.float64)
+        self.winSizes = common.winSizes(N, polOrd)
+        self.kwargs = {'polOrd': polOrd, 'revSeg': mode == 'revSeg', 'unbiased': mode == 'unbiased', 'method': method}
+
+    def time_computeFlucVec(self, N, mode, polOrd, method):
+        self.dfa.computeFlucVec(self.winSizes, **self.kwargs)
+
+    def peakmem_computeFlucVec(self, N, mode, polOrd, method):
+        self.dfa.computeFlucVec(self.winSizes, **self.kwargs)
+
+
+class PolOrd:
+    params = [[1, 2, 3, 4, 5], common.METHODS]
+    param_names = ['polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, polOrd, method):
+        common.requireMethod(method, polOrd)
+        N = 10**5
+        self.dfa = fathon.DFA(common.noise(N))
+        self.winSizes = common.winSizes(N, polOrd)
+
+    def time_computeFlucVec(self, polOrd, method):
+        self.dfa.computeFlucVec(self.winSizes, polOrd=polOrd, revSeg=True, method=method)
+
+
+class Batch:
+    params = [[10**3, 10**4, 10**5], [10, 100], ['gsl', 'direct']]
+    param_names = ['N', 'nSeries', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, nSeries, method):
+        common.requireSize(N * nSeries, common.workKind(method, False))
+        self.tsVecs = np.array([common.noise(N, k) for k in range(nSeries)])
+        self.winSizes = common.winSizes(N, 1)
+
+    def time_batch(self, N, nSeries, method):
+        fathon.DFA.batch(self.tsVecs, self.winSizes, method=method)
+
+    def peakmem_batch(self, N, nSeries, method):
+        fathon.DFA.batch(self.tsVecs, self.winSizes, method=method)
+
+
+class RollingH:
+    params = [[10**4, 10**5, 10**6], ['direct', 'fast']]
+    param_names = ['N', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, method):
+        self.tsVec = common.noise(N)
+        self.winSizes = common.winSizes(1000, 1)
+
+    def time_rollingH(self, N, method):
+        fathon.DFA.rollingH(self.tsVec, 1000, 100, self.winSizes, method=method)
+
+    def peakmem_rollingH(self, N, method):
+        fathon.DFA.rollingH(self.tsVec, 1000, 100, self.winSizes, method=method)
+
+
+class StreamAppend:
+    params = [[10**4, 10**5, 10**6], [100, 10000], ['gsl', 'direct']]
+    param_names = ['N', 'chunk', 'method']
+    timeout = common.TIMEOUT
+    # appending changes the state of the stream, which is created again before each run
+    number = 1
+
+    def setup(self, N, chunk, method):
+        common.requireSize(N, common.workKind(method, False))
+        self.chunks = np.array_split(common.increments(N), N // chunk)
+        self.stream = fathon.StreamDFA(common.winSizes(N, 1), method=method, aggregate=True)
+
+    def time_append(self, N, chunk, method):
+        for samples in self.chunks:
+            self.stream.append(samples)
+
+    def peakmem_append(self, N, chunk, method):
+        for samples in self.chunks:
+            self.stream.append(samples)
@@ -0,0 +1,22 @@
+"""Benchmarks of HT."""
+import numpy as np
+import fathon
+from . import common
+
+
+class ComputeHt:
+    params = [common.SIZES, ['float64', 'float32'], common.POL_ORDS, common.METHODS]
+    param_names = ['N', 'dtype', 'polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, dtype, polOrd, method):
+        common.requireMethod(method, polOrd)
+        common.requireSize(N, common.workKind(method, True))
+        self.ht = fathon.HT(common.cascade(N), dtype=np.dtype(dtype))
+        self.scales = [max(polOrd + 2, N // 100), N // 10]
+
+    def time_computeHt(self, N, dtype, polOrd, method):
+        self.ht.computeHt(self.scales, polOrd=polOrd, mfdfaPolOrd=1, method=method)
+
+    def peakmem_computeHt(self, N, dtype, polOrd, method):
+        self.ht.computeHt(self.scales, polOrd=polOrd, mfdfaPolOrd=1, method=method)
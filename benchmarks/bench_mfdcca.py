@@ -0,0 +1,25 @@
+"""Benchmarks of MFDCCA."""
+import fathon
+from . import common
+
+
+class ComputeFlucVec:
+    # MFDCCA always uses the absolute values of the fluctuations, which method `fast` does not support
+    params = [common.SIZES, ['forward', 'revSeg'], common.POL_ORDS,
+              [m for m in common.METHODS if m != 'fast'], list(common.Q_LISTS)]
+    param_names = ['N', 'mode', 'polOrd', 'method', 'qList']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, mode, polOrd, method, qList):
+        common.requireMethod(method, polOrd)
+        common.requireSize(N, common.workKind(method, False))
+        self.mfdcca = fathon.MFDCCA(common.cascade(N), common.correlated(N))
+        self.winSizes = common.winSizes(N, polOrd)
+        self.qList = common.Q_LISTS[qList]
+        self.kwargs = {'polOrd': polOrd, 'revSeg': mode == 'revSeg', 'method': method}
+
+    def time_computeFlucVec(self, N, mode, polOrd, method, qList):
+        self.mfdcca.computeFlucVec(self.winSizes, self.qList, **self.kwargs)
+
+    def peakmem_computeFlucVec(self, N, mode, polOrd, method, qList):
+        self.mfdcca.computeFlucVec(self.winSizes, self.qList, **self.kwargs)
@@ -0,0 +1,71 @@
+"""Benchmarks of MFDFA."""
+import numpy as np
+import fathon
+from . import common
+
+
+class ComputeFlucVec:
+    params = [common.SIZES, ['forward', 'revSeg', 'float32'], common.POL_ORDS, common.METHODS, list(common.Q_LISTS)]
+    param_names = ['N', 'mode', 'polOrd', 'method', 'qList']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, mode, polOrd, method, qList):
+        common.requireMethod(method, polOrd)
+        common.requireSize(N, common.workKind(method, False))
+        self.mfdfa = fathon.MFDFA(common.cascade(N), dtype=np.float32 if mode == 'float32' else np.float64)
+        self.winSizes = common.winSizes(N, polOrd)
+        self.qList = common.Q_LISTS[qList]
+        self.kwargs = {'polOrd': polOrd, 'revSeg': mode == 'revSeg', 'method': method}
+
+    def time_computeFlucVec(self, N, mode, polOrd, method, qList):
+        self.mfdfa.computeFlucVec(self.winSizes, self.qList, **self.kwargs)
+
+    def peakmem_computeFlucVec(self, N, mode, polOrd, method, qList):
+        self.mfdfa.computeFlucVec(self.winSizes, self.qList, **self.kwargs)
+
+
+class PolOrd:
+    params = [[1, 2, 3, 4, 5], common.METHODS]
+    param_names = ['polOrd', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, polOrd, method):
+        common.requireMethod(method, polOrd)
+        N = 10**5
+        self.mfdfa = fathon.MFDFA(common.cascade(N))
+        self.winSizes = common.winSizes(N, polOrd)
+
+    def time_computeFlucVec(self, polOrd, method):
+        self.mfdfa.computeFlucVec(self.winSizes, common.Q_LISTS['many'], polOrd=polOrd, revSeg=True, method=method)
+
+
+class Spectrum:
+    params = [[10**4, 10**6]]
+    param_names = ['N']
+    timeout = common.TIMEOUT
+
+    def setup(self, N):
+        self.mfdfa = fathon.MFDFA(common.cascade(N))
+        self.mfdfa.computeFlucVec(common.winSizes(N, 1), common.Q_LISTS['many'], method='direct')
+        self.mfdfa.fitFlucVec()
+
+    def time_multifractalSpectrum(self, N):
+        self.mfdfa.computeMassExponents()
+        self.mfdfa.computeMultifractalSpectrum()
+
+
+class Batch:
+    params = [[10**3, 10**4, 10**5], [10, 100], ['gsl', 'direct']]
+    param_names = ['N', 'nSeries', 'method']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, nSeries, method):
+        common.requireSize(N * nSeries, common.workKind(method, False))
+        self.tsVecs = np.array([common.noise(N, k) for k in range(nSeries)])
+        self.winSizes = common.winSizes(N, 1)
+
+    def time_batch(self, N, nSeries, method):
+        fathon.MFDFA.batch(self.tsVecs, self.winSizes, common.Q_LISTS['one'], method=method)
+
+    def peakmem_batch(self, N, nSeries, method):
+        fathon.MFDFA.batch(self.tsVecs, self.winSizes, common.Q_LISTS['one'], method=method)
@@ -0,0 +1,40 @@
+"""Scaling of the main computations with the number of threads."""
+import fathon
+from . import common
+
+
+def _computation(name, N):
+    """Computation benchmarked by `Scaling`, as a function of the number of threads."""
+    winSizes = common.winSizes(N, 1)
+    if name == 'DFA':
+        obj = fathon.DFA(common.noise(N))
+        return lambda nJobs: obj.computeFlucVec(winSizes, revSeg=True, method='direct', nJobs=nJobs)
+    if name == 'MFDFA':
+        obj = fathon.MFDFA(common.cascade(N))
+        return lambda nJobs: obj.computeFlucVec(winSizes, common.Q_LISTS['many'], method='ortho', nJobs=nJobs)
+    if name == 'DCCA':
+        obj = fathon.DCCA(common.noise(N), common.correlated(N))
+        return lambda nJobs: obj.computeFlucVec(winSizes, absVals=False, overlap=True, method='direct', nJobs=nJobs)
+    if name == 'rho':
+        obj = fathon.DCCA(common.noise(N), common.correlated(N))
+        return lambda nJobs: obj.computeRho(winSizes, method='direct', nJobs=nJobs)
+    obj = fathon.HT(common.cascade(N))
+    return lambda nJobs: obj.computeHt([N // 100, N // 10], method='direct', nJobs=nJobs)
+
+
+class Scaling:
+    params = [[10**5, 10**6, 10**7], ['DFA', 'MFDFA', 'DCCA', 'rho', 'HT'], common.THREADS]
+    param_names = ['N', 'computation', 'nJobs']
+    timeout = common.TIMEOUT
+
+    def setup(self, N, computation, nJobs):
+        self.compute = _computation(computation, N)
+
+    def time_compute(self, N, computation, nJobs):
+        self.compute(nJobs)
+
+    def track_efficiency(self, N, computation, nJobs):
+        # parallel efficiency, 1 when nJobs threads are nJobs times faster than one
+        return common.bestTime(lambda: self.compute(1)) / (nJobs * common.bestTime(lambda: self.compute(nJobs)))
+
+    track_efficiency.unit = 'ratio'
@@ -0,0 +1,93 @@
+"""Inputs and settings shared by the benchmarks.
+
+The time series are synthetic and generated from fixed seeds, so that every
+build being benchmarked sees exactly the same inputs.
+"""
+import os
+import time
+import functools
+import numpy as np
+from fathon import fathonUtils as fu
+
+# lengths of the time series
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+# numbers of threads, powers of two from one to all the cores
+THREADS = sorted({2**k for k in range(16) if 2**k < (os.cpu_count() or 1)} | {os.cpu_count() or 1})
+# polynomial orders of the main suites, all the orders are covered by the `PolOrd` suites
+POL_ORDS = [1, 3]
+# detrending methods
+METHODS = ['gsl', 'direct', 'ortho', 'fast']
+# q-orders of the multifractal analyses
+Q_LISTS = {'one': [2.0], 'many': np.arange(-10.0, 10.25, 0.25)}
+# longest time series for each kind of computation, longer ones are skipped because a single run
+# would take minutes: 'segments' detrends each window once (O(N) per window's size), 'gsl' fits each
+# window with GSL, 'sliding' updates the fit of overlapping windows point by point, 'overlap'
+# detrends every overlapping window from scratch (O(N * n) per window's size n) and 'gslOverlap'
+# does it with GSL
+MAX_SIZES = {'segments': 10**7, 'gsl': 10**6, 'sliding': 10**6, 'overlap': 10**4, 'gslOverlap': 10**3}
+# timeout of a single benchmark, in seconds
+TIMEOUT = 900
+# seed of the time series
+SEED = 20190301
+
+@functools.lru_cache(maxsize=None)
+def increments(N, stream=0):
+    """White noise of length N, the same for the same N and stream."""
+    return np.random.default_rng([SEED, stream]).standard_normal(N)
+
+@functools.lru_cache(maxsize=None)
+def noise(N, stream=0):
+    """Random walk of length N (aggregated white noise, H = 0.5)."""
+    return fu.toAggregated(increments(N, stream))
+
+@functools.lru_cache(maxsize=None)
+def correlated(N):
+    """Random walk of length N cross-correlated (rho = 0.6) with `noise(N)`."""
+    return fu.toAggregated(0.6 * increments(N, 0) + 0.8 * increments(N, 1))
+
+@functools.lru_cache(maxsize=None)
+def cascade(N):
+    """Aggregated binomial multiplicative cascade of length N (multifractal)."""
+    rng = np.random.default_rng([SEED, 2])
+    x = np.ones(1)
+    while len(x) < N:
+        w = np.where(rng.random(len(x)) < 0.5, 0.3, 0.7)
+        x = np.column_stack((x * w, x * (1.0 - w))).ravel()
+
+    return fu.toAggregated(x[:N])
+
+def winSizes(N, polOrd, count=20):
+    """Logarithmically spaced window's sizes from the smallest allowed one to N / 4."""
+    return np.unique(np.geomspace(max(10, polOrd + 2), N // 4, count).astype(np.int64))
+
+def workKind(method, overlapping):
+    """Kind of computation of a method, see `MAX_SIZES`."""
+    if overlapping:
+        if method == 'fast':
+            return 'segments'
+        return {'direct': 'sliding', 'gsl': 'gslOverlap'}.get(method, 'overlap')
+
+    return 'gsl' if method == 'gsl' else 'segments'
+
+def skipIf(condition, reason):
+    """Skip a benchmark from its setup (asv skips benchmarks raising NotImplementedError)."""
+    if condition:
+        raise NotImplementedError(reason)
+
+def requireSize(N, kind):
+    """Skip a benchmark on time series too long for its kind of computation."""
+    skipIf(N > MAX_SIZES[kind], 'N = {} is too long for a computation of kind `{}`'.format(N, kind))
+
+def requireMethod(method, polOrd):
+    """Skip the combinations of method and polynomial order that are not allowed."""
+    skipIf(method == 'fast' and polOrd > 2, 'method `fast` requires polOrd not greater than 2')
+
+def bestTime(func, repeat=3):
+    """Best wall time of `repeat` calls of func, in seconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
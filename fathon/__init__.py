@@ -17,7 +17,7 @@
 import platform
 import os
     
-from .dfa import DFA
+from .dfa import DFA, StreamDFA
 from .mfdfa import MFDFA
 from .dcca import DCCA
 from .mfdcca import MFDCCA
@@ -17,11 +17,57 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <math.h>
+#include <stdint.h>
+#include <string.h>
 #include <gsl/gsl_multifit.h>
 
-//polynomial fit
+#ifdef _WIN64
+#define THREAD_LOCAL __declspec(thread)
+#else
+#define THREAD_LOCAL __thread
+#endif
+
+//bytes requested by the allocations of the computations, counted only while a computation is
+//profiled: the counter is set on the thread that started the computation and, for each task of
+//its parallel loops, on the thread that computes the task (see profileStart in cLoops.c)
+static THREAD_LOCAL long long *counted_bytes = NULL;
+
+void countBytes(size_t n_bytes)
+{
+    long long *bytes = counted_bytes;
+    if(bytes != NULL)
+    {
+#pragma omp atomic
+        *bytes += (long long)n_bytes;
+    }
+}
+
+void *countedMalloc(size_t size)
+{
+    countBytes(size);
+
+    return malloc(size);
+}
+
+void *countedCalloc(size_t n, size_t size)
+{
+    countBytes(n * size);
+
+    return calloc(n, size);
+}
+
+void *countedRealloc(void *ptr, size_t size)
+{
+    countBytes(size);
+
+    return realloc(ptr, size);
+}
+
+//polynomial fit (the bytes counted are the ones of the matrices and vectors
+//allocated here, not the ones of the internal workspace of GSL)
 void polynomialFit(int obs, int degree, double *dx, double *dy, double *store)
 {
+    countBytes(((size_t)obs * degree + obs + degree + (size_t)degree * degree) * sizeof(double));
     gsl_matrix *X = gsl_matrix_alloc(obs, degree);
     gsl_vector *y = gsl_vector_alloc(obs);
     gsl_vector *c = gsl_vector_alloc(degree);
@@ -51,3 +97,1477 @@ void polynomialFit(int obs, int degree, double *dx, double *dy, double *store)
     gsl_vector_free(y);
     gsl_vector_free(c);
 }
+
+//residual kernels: sums of squares and of products of residuals, and residuals of a polynomial
+//evaluated with Horner's rule. Vector versions (AVX2 and AVX-512, with fused multiply-add) are
+//compiled next to the scalar ones on x86 with GCC and Clang, and the widest one supported by the
+//CPU and agreeing with the scalar path on a self-test is selected when the library is loaded;
+//the FATHON_SIMD environment variable (scalar, avx2 or avx512) caps the selection. The single
+//precision kernels (suffix F) evaluate the residuals in single precision and accumulate their
+//sums in double precision, where the products of two single precision values are exact
+#define SIMD_SCALAR 0
+#define SIMD_AVX2 1
+#define SIMD_AVX512 2
+#define SIMD_TEST_LEN 1037
+#define SIMD_TEST_ORD 6
+
+#if (defined(__GNUC__) || defined(__clang__)) && (defined(__x86_64__) || defined(__i386__))
+#define SIMD_X86_DISPATCH
+#include <immintrin.h>
+#endif
+
+typedef struct
+{
+    int level;
+    double (*sum_sq)(double *x, int n);
+    double (*sum_prod)(double *x, double *y, int n);
+    double (*sum_abs_prod)(double *x, double *y, int n);
+    void (*poly_res)(double *c, int n_coeffs, double *x, double *y, int n, double *res);
+    double (*sum_sq_f)(float *x, int n);
+    double (*sum_prod_f)(float *x, float *y, int n);
+    double (*sum_abs_prod_f)(float *x, float *y, int n);
+    void (*poly_res_f)(float *c, int n_coeffs, float *x, float *y, int n, float *res);
+} residualKernels;
+
+static double sumSquaresScalar(double *x, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += x[j] * x[j];
+    }
+
+    return f;
+}
+
+static double sumProductsScalar(double *x, double *y, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += x[j] * y[j];
+    }
+
+    return f;
+}
+
+static double sumAbsProductsScalar(double *x, double *y, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += fabs(x[j] * y[j]);
+    }
+
+    return f;
+}
+
+//res = y - sum_k c[k] * x^k
+static void polyResidualsScalar(double *c, int n_coeffs, double *x, double *y, int n, double *res)
+{
+    for(int j = 0; j < n; j++)
+    {
+        double fit = c[n_coeffs - 1];
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = fit * x[j] + c[k];
+        }
+        res[j] = y[j] - fit;
+    }
+}
+
+static double sumSquaresFScalar(float *x, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += (double)x[j] * x[j];
+    }
+
+    return f;
+}
+
+static double sumProductsFScalar(float *x, float *y, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += (double)x[j] * y[j];
+    }
+
+    return f;
+}
+
+static double sumAbsProductsFScalar(float *x, float *y, int n)
+{
+    double f = 0.0;
+
+    for(int j = 0; j < n; j++)
+    {
+        f += fabs((double)x[j] * y[j]);
+    }
+
+    return f;
+}
+
+static void polyResidualsFScalar(float *c, int n_coeffs, float *x, float *y, int n, float *res)
+{
+    for(int j = 0; j < n; j++)
+    {
+        float fit = c[n_coeffs - 1];
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = fit * x[j] + c[k];
+        }
+        res[j] = y[j] - fit;
+    }
+}
+
+#ifdef SIMD_X86_DISPATCH
+//the vector sums use several accumulators to hide the latency of the additions
+static inline __attribute__((target("avx2,fma"))) double hsumAVX2(__m256d v)
+{
+    __m128d lo = _mm256_castpd256_pd128(v);
+    __m128d hi = _mm256_extractf128_pd(v, 1);
+    lo = _mm_add_pd(lo, hi);
+
+    return _mm_cvtsd_f64(_mm_add_sd(lo, _mm_unpackhi_pd(lo, lo)));
+}
+
+static __attribute__((target("avx2,fma"))) double sumSquaresAVX2(double *x, int n)
+{
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    __m256d acc_3 = _mm256_setzero_pd(), acc_4 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 16 <= n; j += 16)
+    {
+        __m256d xv_1 = _mm256_loadu_pd(x + j), xv_2 = _mm256_loadu_pd(x + j + 4);
+        __m256d xv_3 = _mm256_loadu_pd(x + j + 8), xv_4 = _mm256_loadu_pd(x + j + 12);
+        acc_1 = _mm256_fmadd_pd(xv_1, xv_1, acc_1);
+        acc_2 = _mm256_fmadd_pd(xv_2, xv_2, acc_2);
+        acc_3 = _mm256_fmadd_pd(xv_3, xv_3, acc_3);
+        acc_4 = _mm256_fmadd_pd(xv_4, xv_4, acc_4);
+    }
+    for(; j + 4 <= n; j += 4)
+    {
+        __m256d xv = _mm256_loadu_pd(x + j);
+        acc_1 = _mm256_fmadd_pd(xv, xv, acc_1);
+    }
+    double f = hsumAVX2(_mm256_add_pd(_mm256_add_pd(acc_1, acc_2), _mm256_add_pd(acc_3, acc_4)));
+
+    for(; j < n; j++)
+    {
+        f += x[j] * x[j];
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) double sumProductsAVX2(double *x, double *y, int n)
+{
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    __m256d acc_3 = _mm256_setzero_pd(), acc_4 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 16 <= n; j += 16)
+    {
+        acc_1 = _mm256_fmadd_pd(_mm256_loadu_pd(x + j), _mm256_loadu_pd(y + j), acc_1);
+        acc_2 = _mm256_fmadd_pd(_mm256_loadu_pd(x + j + 4), _mm256_loadu_pd(y + j + 4), acc_2);
+        acc_3 = _mm256_fmadd_pd(_mm256_loadu_pd(x + j + 8), _mm256_loadu_pd(y + j + 8), acc_3);
+        acc_4 = _mm256_fmadd_pd(_mm256_loadu_pd(x + j + 12), _mm256_loadu_pd(y + j + 12), acc_4);
+    }
+    for(; j + 4 <= n; j += 4)
+    {
+        acc_1 = _mm256_fmadd_pd(_mm256_loadu_pd(x + j), _mm256_loadu_pd(y + j), acc_1);
+    }
+    double f = hsumAVX2(_mm256_add_pd(_mm256_add_pd(acc_1, acc_2), _mm256_add_pd(acc_3, acc_4)));
+
+    for(; j < n; j++)
+    {
+        f += x[j] * y[j];
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) double sumAbsProductsAVX2(double *x, double *y, int n)
+{
+    __m256d sign = _mm256_set1_pd(-0.0);
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 8 <= n; j += 8)
+    {
+        __m256d pv_1 = _mm256_mul_pd(_mm256_loadu_pd(x + j), _mm256_loadu_pd(y + j));
+        __m256d pv_2 = _mm256_mul_pd(_mm256_loadu_pd(x + j + 4), _mm256_loadu_pd(y + j + 4));
+        acc_1 = _mm256_add_pd(acc_1, _mm256_andnot_pd(sign, pv_1));
+        acc_2 = _mm256_add_pd(acc_2, _mm256_andnot_pd(sign, pv_2));
+    }
+    for(; j + 4 <= n; j += 4)
+    {
+        __m256d pv = _mm256_mul_pd(_mm256_loadu_pd(x + j), _mm256_loadu_pd(y + j));
+        acc_1 = _mm256_add_pd(acc_1, _mm256_andnot_pd(sign, pv));
+    }
+    double f = hsumAVX2(_mm256_add_pd(acc_1, acc_2));
+
+    for(; j < n; j++)
+    {
+        f += fabs(x[j] * y[j]);
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) void polyResidualsAVX2(double *c, int n_coeffs, double *x, double *y, int n, double *res)
+{
+    int j = 0;
+
+    for(; j + 4 <= n; j += 4)
+    {
+        __m256d xv = _mm256_loadu_pd(x + j);
+        __m256d fit = _mm256_set1_pd(c[n_coeffs - 1]);
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = _mm256_fmadd_pd(fit, xv, _mm256_set1_pd(c[k]));
+        }
+        _mm256_storeu_pd(res + j, _mm256_sub_pd(_mm256_loadu_pd(y + j), fit));
+    }
+    for(; j < n; j++)
+    {
+        double fit = c[n_coeffs - 1];
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = fit * x[j] + c[k];
+        }
+        res[j] = y[j] - fit;
+    }
+}
+
+//the single precision values are widened four at a time before being multiplied
+static __attribute__((target("avx2,fma"))) double sumSquaresFAVX2(float *x, int n)
+{
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 8 <= n; j += 8)
+    {
+        __m256d xv_1 = _mm256_cvtps_pd(_mm_loadu_ps(x + j));
+        __m256d xv_2 = _mm256_cvtps_pd(_mm_loadu_ps(x + j + 4));
+        acc_1 = _mm256_fmadd_pd(xv_1, xv_1, acc_1);
+        acc_2 = _mm256_fmadd_pd(xv_2, xv_2, acc_2);
+    }
+    double f = hsumAVX2(_mm256_add_pd(acc_1, acc_2));
+
+    for(; j < n; j++)
+    {
+        f += (double)x[j] * x[j];
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) double sumProductsFAVX2(float *x, float *y, int n)
+{
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 8 <= n; j += 8)
+    {
+        acc_1 = _mm256_fmadd_pd(_mm256_cvtps_pd(_mm_loadu_ps(x + j)), _mm256_cvtps_pd(_mm_loadu_ps(y + j)), acc_1);
+        acc_2 = _mm256_fmadd_pd(_mm256_cvtps_pd(_mm_loadu_ps(x + j + 4)), _mm256_cvtps_pd(_mm_loadu_ps(y + j + 4)), acc_2);
+    }
+    double f = hsumAVX2(_mm256_add_pd(acc_1, acc_2));
+
+    for(; j < n; j++)
+    {
+        f += (double)x[j] * y[j];
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) double sumAbsProductsFAVX2(float *x, float *y, int n)
+{
+    __m256d sign = _mm256_set1_pd(-0.0);
+    __m256d acc_1 = _mm256_setzero_pd(), acc_2 = _mm256_setzero_pd();
+    int j = 0;
+
+    for(; j + 8 <= n; j += 8)
+    {
+        __m256d pv_1 = _mm256_mul_pd(_mm256_cvtps_pd(_mm_loadu_ps(x + j)), _mm256_cvtps_pd(_mm_loadu_ps(y + j)));
+        __m256d pv_2 = _mm256_mul_pd(_mm256_cvtps_pd(_mm_loadu_ps(x + j + 4)), _mm256_cvtps_pd(_mm_loadu_ps(y + j + 4)));
+        acc_1 = _mm256_add_pd(acc_1, _mm256_andnot_pd(sign, pv_1));
+        acc_2 = _mm256_add_pd(acc_2, _mm256_andnot_pd(sign, pv_2));
+    }
+    double f = hsumAVX2(_mm256_add_pd(acc_1, acc_2));
+
+    for(; j < n; j++)
+    {
+        f += fabs((double)x[j] * y[j]);
+    }
+
+    return f;
+}
+
+static __attribute__((target("avx2,fma"))) void polyResidualsFAVX2(float *c, int n_coeffs, float *x, float *y, int n, float *res)
+{
+    int j = 0;
+
+    for(; j + 8 <= n; j += 8)
+    {
+        __m256 xv = _mm256_loadu_ps(x + j);
+        __m256 fit = _mm256_set1_ps(c[n_coeffs - 1]);
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = _mm256_fmadd_ps(fit, xv, _mm256_set1_ps(c[k]));
+        }
+        _mm256_storeu_ps(res + j, _mm256_sub_ps(_mm256_loadu_ps(y + j), fit));
+    }
+    for(; j < n; j++)
+    {
+        float fit = c[n_coeffs - 1];
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = fit * x[j] + c[k];
+        }
+        res[j] = y[j] - fit;
+    }
+}
+
+static __attribute__((target("avx512f"))) double sumSquaresAVX512(double *x, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+    int j = 0;
+
+    for(; j + 16 <= n; j += 16)
+    {
+        __m512d xv_1 = _mm512_loadu_pd(x + j);
+        __m512d xv_2 = _mm512_loadu_pd(x + j + 8);
+        acc_1 = _mm512_fmadd_pd(xv_1, xv_1, acc_1);
+        acc_2 = _mm512_fmadd_pd(xv_2, xv_2, acc_2);
+    }
+    for(; j < n; j += 8)
+    {
+        __mmask8 m = (n - j >= 8) ? 0xFF : (__mmask8)((1u << (n - j)) - 1);
+        __m512d xv = _mm512_maskz_loadu_pd(m, x + j);
+        acc_1 = _mm512_fmadd_pd(xv, xv, acc_1);
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) double sumProductsAVX512(double *x, double *y, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+    int j = 0;
+
+    for(; j + 16 <= n; j += 16)
+    {
+        acc_1 = _mm512_fmadd_pd(_mm512_loadu_pd(x + j), _mm512_loadu_pd(y + j), acc_1);
+        acc_2 = _mm512_fmadd_pd(_mm512_loadu_pd(x + j + 8), _mm512_loadu_pd(y + j + 8), acc_2);
+    }
+    for(; j < n; j += 8)
+    {
+        __mmask8 m = (n - j >= 8) ? 0xFF : (__mmask8)((1u << (n - j)) - 1);
+        acc_1 = _mm512_fmadd_pd(_mm512_maskz_loadu_pd(m, x + j), _mm512_maskz_loadu_pd(m, y + j), acc_1);
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) double sumAbsProductsAVX512(double *x, double *y, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+    int j = 0;
+
+    for(; j + 16 <= n; j += 16)
+    {
+        acc_1 = _mm512_add_pd(acc_1, _mm512_abs_pd(_mm512_mul_pd(_mm512_loadu_pd(x + j), _mm512_loadu_pd(y + j))));
+        acc_2 = _mm512_add_pd(acc_2, _mm512_abs_pd(_mm512_mul_pd(_mm512_loadu_pd(x + j + 8), _mm512_loadu_pd(y + j + 8))));
+    }
+    for(; j < n; j += 8)
+    {
+        __mmask8 m = (n - j >= 8) ? 0xFF : (__mmask8)((1u << (n - j)) - 1);
+        acc_1 = _mm512_add_pd(acc_1, _mm512_abs_pd(_mm512_mul_pd(_mm512_maskz_loadu_pd(m, x + j), _mm512_maskz_loadu_pd(m, y + j))));
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) void polyResidualsAVX512(double *c, int n_coeffs, double *x, double *y, int n, double *res)
+{
+    for(int j = 0; j < n; j += 8)
+    {
+        __mmask8 m = (n - j >= 8) ? 0xFF : (__mmask8)((1u << (n - j)) - 1);
+        __m512d xv = _mm512_maskz_loadu_pd(m, x + j);
+        __m512d fit = _mm512_set1_pd(c[n_coeffs - 1]);
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = _mm512_fmadd_pd(fit, xv, _mm512_set1_pd(c[k]));
+        }
+        _mm512_mask_storeu_pd(res + j, m, _mm512_sub_pd(_mm512_maskz_loadu_pd(m, y + j), fit));
+    }
+}
+
+//lower and upper halves of sixteen single precision values widened to double precision
+static inline __attribute__((target("avx512f"))) __m512d lowerAVX512(__m512 v)
+{
+    return _mm512_cvtps_pd(_mm512_castps512_ps256(v));
+}
+
+static inline __attribute__((target("avx512f"))) __m512d upperAVX512(__m512 v)
+{
+    return _mm512_cvtps_pd(_mm256_castpd_ps(_mm512_extractf64x4_pd(_mm512_castps_pd(v), 1)));
+}
+
+static __attribute__((target("avx512f"))) double sumSquaresFAVX512(float *x, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+
+    for(int j = 0; j < n; j += 16)
+    {
+        __mmask16 m = (n - j >= 16) ? 0xFFFF : (__mmask16)((1u << (n - j)) - 1);
+        __m512 xv = _mm512_maskz_loadu_ps(m, x + j);
+        acc_1 = _mm512_fmadd_pd(lowerAVX512(xv), lowerAVX512(xv), acc_1);
+        acc_2 = _mm512_fmadd_pd(upperAVX512(xv), upperAVX512(xv), acc_2);
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) double sumProductsFAVX512(float *x, float *y, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+
+    for(int j = 0; j < n; j += 16)
+    {
+        __mmask16 m = (n - j >= 16) ? 0xFFFF : (__mmask16)((1u << (n - j)) - 1);
+        __m512 xv = _mm512_maskz_loadu_ps(m, x + j), yv = _mm512_maskz_loadu_ps(m, y + j);
+        acc_1 = _mm512_fmadd_pd(lowerAVX512(xv), lowerAVX512(yv), acc_1);
+        acc_2 = _mm512_fmadd_pd(upperAVX512(xv), upperAVX512(yv), acc_2);
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) double sumAbsProductsFAVX512(float *x, float *y, int n)
+{
+    __m512d acc_1 = _mm512_setzero_pd(), acc_2 = _mm512_setzero_pd();
+
+    for(int j = 0; j < n; j += 16)
+    {
+        __mmask16 m = (n - j >= 16) ? 0xFFFF : (__mmask16)((1u << (n - j)) - 1);
+        __m512 xv = _mm512_maskz_loadu_ps(m, x + j), yv = _mm512_maskz_loadu_ps(m, y + j);
+        acc_1 = _mm512_add_pd(acc_1, _mm512_abs_pd(_mm512_mul_pd(lowerAVX512(xv), lowerAVX512(yv))));
+        acc_2 = _mm512_add_pd(acc_2, _mm512_abs_pd(_mm512_mul_pd(upperAVX512(xv), upperAVX512(yv))));
+    }
+
+    return _mm512_reduce_add_pd(_mm512_add_pd(acc_1, acc_2));
+}
+
+static __attribute__((target("avx512f"))) void polyResidualsFAVX512(float *c, int n_coeffs, float *x, float *y, int n, float *res)
+{
+    for(int j = 0; j < n; j += 16)
+    {
+        __mmask16 m = (n - j >= 16) ? 0xFFFF : (__mmask16)((1u << (n - j)) - 1);
+        __m512 xv = _mm512_maskz_loadu_ps(m, x + j);
+        __m512 fit = _mm512_set1_ps(c[n_coeffs - 1]);
+        for(int k = n_coeffs - 2; k >= 0; k--)
+        {
+            fit = _mm512_fmadd_ps(fit, xv, _mm512_set1_ps(c[k]));
+        }
+        _mm512_mask_storeu_ps(res + j, m, _mm512_sub_ps(_mm512_maskz_loadu_ps(m, y + j), fit));
+    }
+}
+#endif
+
+//kernels of the given level (the scalar ones if the level is not available)
+residualKernels residualKernelsOf(int level)
+{
+    residualKernels rk = {SIMD_SCALAR, sumSquaresScalar, sumProductsScalar, sumAbsProductsScalar, polyResidualsScalar,
+                          sumSquaresFScalar, sumProductsFScalar, sumAbsProductsFScalar, polyResidualsFScalar};
+
+#ifdef SIMD_X86_DISPATCH
+    __builtin_cpu_init();
+    if((level == SIMD_AVX2) && __builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma"))
+    {
+        residualKernels rk_avx2 = {SIMD_AVX2, sumSquaresAVX2, sumProductsAVX2, sumAbsProductsAVX2, polyResidualsAVX2,
+                                   sumSquaresFAVX2, sumProductsFAVX2, sumAbsProductsFAVX2, polyResidualsFAVX2};
+        rk = rk_avx2;
+    }
+    else if((level == SIMD_AVX512) && __builtin_cpu_supports("avx512f"))
+    {
+        residualKernels rk_avx512 = {SIMD_AVX512, sumSquaresAVX512, sumProductsAVX512, sumAbsProductsAVX512, polyResidualsAVX512,
+                                     sumSquaresFAVX512, sumProductsFAVX512, sumAbsProductsFAVX512, polyResidualsFAVX512};
+        rk = rk_avx512;
+    }
+#endif
+
+    return rk;
+}
+
+//compares the kernels of the given level with the scalar ones on every length up to
+//SIMD_TEST_LEN, returns 1 if they agree to rounding, 0 if they do not and -1 if the
+//level is not available on this CPU or build
+int simdSelfTest(int level)
+{
+    residualKernels rk = residualKernelsOf(level);
+    if(rk.level != level)
+    {
+        return -1;
+    }
+
+    double *x = malloc(SIMD_TEST_LEN * sizeof(double));
+    double *y = malloc(SIMD_TEST_LEN * sizeof(double));
+    double *res = malloc(SIMD_TEST_LEN * sizeof(double));
+    double *res_ref = malloc(SIMD_TEST_LEN * sizeof(double));
+    float *x_f = malloc(SIMD_TEST_LEN * sizeof(float));
+    float *y_f = malloc(SIMD_TEST_LEN * sizeof(float));
+    float *res_f = malloc(SIMD_TEST_LEN * sizeof(float));
+    float *res_f_ref = malloc(SIMD_TEST_LEN * sizeof(float));
+    double c[SIMD_TEST_ORD + 1];
+    float c_f[SIMD_TEST_ORD + 1];
+    for(int j = 0; j < SIMD_TEST_LEN; j++)
+    {
+        x[j] = (2.0 * j - (SIMD_TEST_LEN - 1)) / (double)(SIMD_TEST_LEN - 1);
+        y[j] = sin(0.37 * j) * (1.0 + 0.5 * cos(0.011 * j));
+        x_f[j] = (float)x[j];
+        y_f[j] = (float)y[j];
+    }
+    for(int k = 0; k <= SIMD_TEST_ORD; k++)
+    {
+        c[k] = cos(1.3 * k + 0.2) / (k + 1.0);
+        c_f[k] = (float)c[k];
+    }
+
+    int passed = 1;
+    for(int n = 0; (n <= SIMD_TEST_LEN) && passed; n += (n < 40) ? 1 : 97)
+    {
+        double tol = 1e-13 * (sumSquaresScalar(x, n) + sumSquaresScalar(y, n) + 1.0);
+        passed = (fabs(rk.sum_sq(y, n) - sumSquaresScalar(y, n)) <= tol) &&
+                 (fabs(rk.sum_prod(x, y, n) - sumProductsScalar(x, y, n)) <= tol) &&
+                 (fabs(rk.sum_abs_prod(x, y, n) - sumAbsProductsScalar(x, y, n)) <= tol) &&
+                 (fabs(rk.sum_sq_f(y_f, n) - sumSquaresFScalar(y_f, n)) <= tol) &&
+                 (fabs(rk.sum_prod_f(x_f, y_f, n) - sumProductsFScalar(x_f, y_f, n)) <= tol) &&
+                 (fabs(rk.sum_abs_prod_f(x_f, y_f, n) - sumAbsProductsFScalar(x_f, y_f, n)) <= tol);
+
+        rk.poly_res(c, SIMD_TEST_ORD + 1, x, y, n, res);
+        polyResidualsScalar(c, SIMD_TEST_ORD + 1, x, y, n, res_ref);
+        for(int j = 0; j < n; j++)
+        {
+            passed = passed && (fabs(res[j] - res_ref[j]) <= 1e-13);
+        }
+
+        //single precision residuals, with and without fused multiply-add, agree to a few ulps
+        rk.poly_res_f(c_f, SIMD_TEST_ORD + 1, x_f, y_f, n, res_f);
+        polyResidualsFScalar(c_f, SIMD_TEST_ORD + 1, x_f, y_f, n, res_f_ref);
+        for(int j = 0; j < n; j++)
+        {
+            passed = passed && (fabs(res_f[j] - res_f_ref[j]) <= 1e-5);
+        }
+    }
+
+    free(x);
+    free(y);
+    free(res);
+    free(res_ref);
+    free(x_f);
+    free(y_f);
+    free(res_f);
+    free(res_f_ref);
+
+    return passed;
+}
+
+//kernels in use, selected by residualKernelsInit
+static residualKernels resKer = {SIMD_SCALAR, sumSquaresScalar, sumProductsScalar, sumAbsProductsScalar, polyResidualsScalar,
+                                 sumSquaresFScalar, sumProductsFScalar, sumAbsProductsFScalar, polyResidualsFScalar};
+
+//selects the widest kernels passing the self-test, up to the level set in FATHON_SIMD
+void residualKernelsInit(void)
+{
+    int max_level = SIMD_AVX512;
+    char *env = getenv("FATHON_SIMD");
+    if(env != NULL)
+    {
+        max_level = (strcmp(env, "scalar") == 0) ? SIMD_SCALAR : ((strcmp(env, "avx2") == 0) ? SIMD_AVX2 : SIMD_AVX512);
+    }
+
+    for(int level = max_level; level > SIMD_SCALAR; level--)
+    {
+        if(simdSelfTest(level) == 1)
+        {
+            resKer = residualKernelsOf(level);
+            return;
+        }
+    }
+    resKer = residualKernelsOf(SIMD_SCALAR);
+}
+
+#ifdef SIMD_X86_DISPATCH
+__attribute__((constructor)) void residualKernelsLoad(void)
+{
+    residualKernelsInit();
+}
+#endif
+
+//level of the kernels in use
+int simdLevel(void)
+{
+    return resKer.level;
+}
+
+double sumSquares(double *x, int n)
+{
+    return resKer.sum_sq(x, n);
+}
+
+double sumProducts(double *x, double *y, int n)
+{
+    return resKer.sum_prod(x, y, n);
+}
+
+double sumAbsProducts(double *x, double *y, int n)
+{
+    return resKer.sum_abs_prod(x, y, n);
+}
+
+void polyResiduals(double *c, int n_coeffs, double *x, double *y, int n, double *res)
+{
+    resKer.poly_res(c, n_coeffs, x, y, n, res);
+}
+
+double sumSquaresF(float *x, int n)
+{
+    return resKer.sum_sq_f(x, n);
+}
+
+double sumProductsF(float *x, float *y, int n)
+{
+    return resKer.sum_prod_f(x, y, n);
+}
+
+double sumAbsProductsF(float *x, float *y, int n)
+{
+    return resKer.sum_abs_prod_f(x, y, n);
+}
+
+void polyResidualsF(float *c, int n_coeffs, float *x, float *y, int n, float *res)
+{
+    resKer.poly_res_f(c, n_coeffs, x, y, n, res);
+}
+
+//workspace used to detrend segments of a given length
+typedef struct
+{
+    int method;
+    int win_size;
+    int n_coeffs;
+    int shared;
+    double *fit_coeffs;
+    double *x_loc;
+    double *proj;
+    float *fit_coeffs_f;
+    float *x_loc_f;
+    float *proj_f;
+} fitWorkspace;
+
+//solves (L * L^T) x = b in place, L lower triangular stored row-major
+void cholSolve(int n, double *L, double *b)
+{
+    for(int i = 0; i < n; i++)
+    {
+        for(int k = 0; k < i; k++)
+        {
+            b[i] -= L[i * n + k] * b[k];
+        }
+        b[i] /= L[i * n + i];
+    }
+    for(int i = n - 1; i >= 0; i--)
+    {
+        for(int k = i + 1; k < n; k++)
+        {
+            b[i] -= L[k * n + i] * b[k];
+        }
+        b[i] /= L[i * n + i];
+    }
+}
+
+//fills the local abscissa in [-1, 1] of a window of length win_size and the
+//Vandermonde matrix of its powers (row-major, n columns), a centred and scaled
+//abscissa keeps the normal equations well conditioned
+void localVandermonde(int win_size, int n, double *x_loc, double *vander)
+{
+    for(int j = 0; j < win_size; j++)
+    {
+        x_loc[j] = (win_size > 1) ? (2.0 * j - (win_size - 1)) / (double)(win_size - 1) : 0.0;
+        vander[j * n] = 1.0;
+        for(int k = 1; k < n; k++)
+        {
+            vander[j * n + k] = vander[j * n + k - 1] * x_loc[j];
+        }
+    }
+}
+
+//Cholesky factor (lower triangular, row-major) of the normal equations matrix
+//built from a Vandermonde matrix with win_size rows and n columns
+void normalEquationsChol(int win_size, int n, double *vander, double *L)
+{
+    for(int i = 0; i < n * n; i++)
+    {
+        L[i] = 0.0;
+    }
+
+    for(int j = 0; j < win_size; j++)
+    {
+        for(int r = 0; r < n; r++)
+        {
+            for(int c = 0; c <= r; c++)
+            {
+                L[r * n + c] += vander[j * n + r] * vander[j * n + c];
+            }
+        }
+    }
+
+    for(int r = 0; r < n; r++)
+    {
+        for(int c = 0; c <= r; c++)
+        {
+            double val = L[r * n + c];
+            for(int k = 0; k < c; k++)
+            {
+                val -= L[r * n + k] * L[c * n + k];
+            }
+            L[r * n + c] = (r == c) ? sqrt(val) : val / L[c * n + c];
+        }
+    }
+}
+
+//orthonormal basis (row-major, n rows of length win_size) of the polynomials of degree
+//lower than n sampled on the local abscissa x_loc in [-1, 1]; each row is built from the
+//previous one times the abscissa and orthogonalised twice against all the previous rows,
+//so that the basis stays orthonormal to working precision also at high degrees
+void orthoBasis(int win_size, int n, double *x_loc, double *basis)
+{
+    for(int j = 0; j < win_size; j++)
+    {
+        basis[j] = 1.0 / sqrt((double)win_size);
+    }
+
+    for(int k = 1; k < n; k++)
+    {
+        double *q = basis + k * win_size;
+        for(int j = 0; j < win_size; j++)
+        {
+            q[j] = x_loc[j] * q[j - win_size];
+        }
+        for(int pass = 0; pass < 2; pass++)
+        {
+            for(int i = 0; i < k; i++)
+            {
+                double *p = basis + i * win_size;
+                double dot = 0.0;
+                for(int j = 0; j < win_size; j++)
+                {
+                    dot += p[j] * q[j];
+                }
+                for(int j = 0; j < win_size; j++)
+                {
+                    q[j] -= dot * p[j];
+                }
+            }
+        }
+        double norm = 0.0;
+        for(int j = 0; j < win_size; j++)
+        {
+            norm += q[j] * q[j];
+        }
+        norm = (norm > 0.0) ? 1.0 / sqrt(norm) : 0.0;
+        for(int j = 0; j < win_size; j++)
+        {
+            q[j] *= norm;
+        }
+    }
+}
+
+//allocates the workspace and precomputes, for the direct method, the matrix mapping
+//a segment of length win_size onto the coefficients of its fit and, for the
+//orthogonal method, the orthonormal polynomial basis of the segments
+void fitWorkspaceAlloc(fitWorkspace *ws, int method, int win_size, int pol_ord)
+{
+    int n = pol_ord + 1;
+
+    ws->method = method;
+    ws->win_size = win_size;
+    ws->n_coeffs = n;
+    ws->shared = 0;
+    ws->fit_coeffs = countedMalloc(n * sizeof(double));
+    ws->x_loc = NULL;
+    ws->proj = NULL;
+    ws->fit_coeffs_f = NULL;
+    ws->x_loc_f = NULL;
+    ws->proj_f = NULL;
+
+    if(method == FIT_DIRECT)
+    {
+        double *chol = countedMalloc(n * n * sizeof(double));
+        double *vander = countedMalloc(win_size * n * sizeof(double));
+        ws->x_loc = countedMalloc(win_size * sizeof(double));
+        ws->proj = countedMalloc(n * win_size * sizeof(double));
+
+        localVandermonde(win_size, n, ws->x_loc, vander);
+        normalEquationsChol(win_size, n, vander, chol);
+
+        for(int j = 0; j < win_size; j++)
+        {
+            cholSolve(n, chol, vander + j * n);
+            for(int k = 0; k < n; k++)
+            {
+                ws->proj[k * win_size + j] = vander[j * n + k];
+            }
+        }
+
+        free(chol);
+        free(vander);
+    }
+    else if(method == FIT_ORTHO)
+    {
+        ws->x_loc = countedMalloc(win_size * sizeof(double));
+        ws->proj = countedMalloc(n * win_size * sizeof(double));
+
+        for(int j = 0; j < win_size; j++)
+        {
+            ws->x_loc[j] = (win_size > 1) ? (2.0 * j - (win_size - 1)) / (double)(win_size - 1) : 0.0;
+        }
+        orthoBasis(win_size, n, ws->x_loc, ws->proj);
+    }
+}
+
+//allocates the workspace of the single precision detrending (FIT_DIRECT and FIT_ORTHO only),
+//the abscissa and the projection matrix or the basis are computed in double precision and
+//then rounded to single precision
+void fitWorkspaceAllocF(fitWorkspace *ws, int method, int win_size, int pol_ord)
+{
+    int n = pol_ord + 1;
+
+    fitWorkspaceAlloc(ws, method, win_size, pol_ord);
+    ws->fit_coeffs_f = countedMalloc(n * sizeof(float));
+    ws->x_loc_f = countedMalloc(win_size * sizeof(float));
+    ws->proj_f = countedMalloc(n * win_size * sizeof(float));
+
+    for(int j = 0; j < win_size; j++)
+    {
+        ws->x_loc_f[j] = (float)ws->x_loc[j];
+    }
+    for(int j = 0; j < n * win_size; j++)
+    {
+        ws->proj_f[j] = (float)ws->proj[j];
+    }
+
+    free(ws->x_loc);
+    free(ws->proj);
+    ws->x_loc = NULL;
+    ws->proj = NULL;
+}
+
+//workspace that detrends segments with the abscissa and the projection matrix or the basis of
+//the workspace basis, which are only read and can be shared by several threads at the same time:
+//only the coefficients of the fits are allocated
+void fitWorkspaceShare(fitWorkspace *ws, fitWorkspace *basis)
+{
+    *ws = *basis;
+    ws->shared = 1;
+    ws->fit_coeffs = countedMalloc(basis->n_coeffs * sizeof(double));
+    ws->fit_coeffs_f = (basis->fit_coeffs_f != NULL) ? countedMalloc(basis->n_coeffs * sizeof(float)) : NULL;
+}
+
+void fitWorkspaceFree(fitWorkspace *ws)
+{
+    free(ws->fit_coeffs);
+    free(ws->fit_coeffs_f);
+    if(!ws->shared)
+    {
+        free(ws->x_loc);
+        free(ws->proj);
+        free(ws->x_loc_f);
+        free(ws->proj_f);
+    }
+}
+
+//detrends the segment y[0:win_size] and stores the residuals in res,
+//t is the segment abscissa and it is only used by the GSL method; the coefficients
+//of the orthogonal method are the ones of the basis, not of the powers of t
+void detrendSegment(fitWorkspace *ws, double *t, double *y, double *res)
+{
+    int s = ws->win_size;
+    int n = ws->n_coeffs;
+    double *c = ws->fit_coeffs;
+
+    if(ws->method == FIT_DIRECT)
+    {
+        for(int k = 0; k < n; k++)
+        {
+            c[k] = sumProducts(ws->proj + k * s, y, s);
+        }
+
+        polyResiduals(c, n, ws->x_loc, y, s, res);
+    }
+    else if(ws->method == FIT_ORTHO)
+    {
+        //the projections onto the basis are removed one at a time from the residuals
+        //(modified Gram-Schmidt), which is more accurate than removing the whole fit
+        for(int j = 0; j < s; j++)
+        {
+            res[j] = y[j];
+        }
+        for(int k = 0; k < n; k++)
+        {
+            double *q = ws->proj + k * s;
+            double ck = sumProducts(q, res, s);
+            for(int j = 0; j < s; j++)
+            {
+                res[j] -= ck * q[j];
+            }
+            c[k] = ck;
+        }
+    }
+    else
+    {
+        polynomialFit(s, n, t, y, c);
+        polyResiduals(c, n, t, y, s, res);
+    }
+}
+
+//single precision version of detrendSegment for FIT_DIRECT and FIT_ORTHO, the projections
+//are accumulated in double precision and the residuals are evaluated in single precision
+void detrendSegmentF(fitWorkspace *ws, float *y, float *res)
+{
+    int s = ws->win_size;
+    int n = ws->n_coeffs;
+    float *c = ws->fit_coeffs_f;
+
+    if(ws->method == FIT_DIRECT)
+    {
+        for(int k = 0; k < n; k++)
+        {
+            c[k] = (float)sumProductsF(ws->proj_f + k * s, y, s);
+        }
+
+        polyResidualsF(c, n, ws->x_loc_f, y, s, res);
+    }
+    else
+    {
+        for(int j = 0; j < s; j++)
+        {
+            res[j] = y[j];
+        }
+        for(int k = 0; k < n; k++)
+        {
+            float *q = ws->proj_f + k * s;
+            float ck = (float)sumProductsF(q, res, s);
+            for(int j = 0; j < s; j++)
+            {
+                res[j] -= ck * q[j];
+            }
+            c[k] = ck;
+        }
+    }
+}
+
+//least-squares fit of a window sliding over a series one point at a time.
+//The fit is carried by the moments sum_j u_j^k * (y_j - y_ref) of the window,
+//u_j being its local abscissa, so that moving the window by one point costs
+//O(pol_ord^2) instead of O(win_size * pol_ord). The reference value y_ref is
+//only there to keep the moments small, residuals do not depend on it.
+typedef struct
+{
+    int win_size;
+    int n_coeffs;
+    double *x_loc;
+    double *vander;
+    double *gram_inv;
+    double *shift_bw;
+    double *shift_fw;
+    double *drop_pow;
+    double *col_sum;
+    double *alt_sum;
+    double *lag_gram;
+    double *tmp;
+} slidingFit;
+
+void slidingFitAlloc(slidingFit *sf, int win_size, int pol_ord)
+{
+    int n = pol_ord + 1;
+    double delta = (win_size > 1) ? 2.0 / (double)(win_size - 1) : 0.0;
+
+    sf->win_size = win_size;
+    sf->n_coeffs = n;
+    sf->x_loc = countedMalloc(win_size * sizeof(double));
+    sf->vander = countedMalloc(win_size * n * sizeof(double));
+    sf->gram_inv = countedCalloc(n * n, sizeof(double));
+    sf->shift_bw = countedCalloc(n * n, sizeof(double));
+    sf->shift_fw = countedCalloc(n * n, sizeof(double));
+    sf->drop_pow = countedMalloc(n * sizeof(double));
+    sf->col_sum = countedCalloc(n, sizeof(double));
+    sf->alt_sum = countedCalloc(n, sizeof(double));
+    sf->lag_gram = countedCalloc(n * n, sizeof(double));
+    sf->tmp = countedMalloc(n * sizeof(double));
+
+    localVandermonde(win_size, n, sf->x_loc, sf->vander);
+
+    double *chol = countedMalloc(n * n * sizeof(double));
+    normalEquationsChol(win_size, n, sf->vander, chol);
+    for(int c = 0; c < n; c++)
+    {
+        for(int r = 0; r < n; r++)
+        {
+            sf->tmp[r] = (r == c) ? 1.0 : 0.0;
+        }
+        cholSolve(n, chol, sf->tmp);
+        for(int r = 0; r < n; r++)
+        {
+            sf->gram_inv[r * n + c] = sf->tmp[r];
+        }
+    }
+    free(chol);
+
+    //(u -/+ delta)^k = sum_i binom(k, i) * (-/+ delta)^(k - i) * u^i
+    for(int k = 0; k < n; k++)
+    {
+        double binom = 1.0;
+        for(int i = k; i >= 0; i--)
+        {
+            sf->shift_bw[k * n + i] = binom * pow(-delta, k - i);
+            sf->shift_fw[k * n + i] = binom * pow(delta, k - i);
+            binom = binom * i / (double)(k - i + 1);
+        }
+        //abscissa, in the next window, of the point leaving the current one
+        sf->drop_pow[k] = pow(-1.0 - delta, k);
+    }
+
+    for(int j = 0; j < win_size; j++)
+    {
+        double sign = (j % 2 == 0) ? 1.0 : -1.0;
+        for(int k = 0; k < n; k++)
+        {
+            sf->col_sum[k] += sf->vander[j * n + k];
+            sf->alt_sum[k] += sign * sf->vander[j * n + k];
+        }
+    }
+    for(int j = 0; j < win_size - 1; j++)
+    {
+        for(int k = 0; k < n; k++)
+        {
+            for(int l = 0; l < n; l++)
+            {
+                sf->lag_gram[k * n + l] += sf->vander[j * n + k] * sf->vander[(j + 1) * n + l];
+            }
+        }
+    }
+}
+
+void slidingFitFree(slidingFit *sf)
+{
+    free(sf->x_loc);
+    free(sf->vander);
+    free(sf->gram_inv);
+    free(sf->shift_bw);
+    free(sf->shift_fw);
+    free(sf->drop_pow);
+    free(sf->col_sum);
+    free(sf->alt_sum);
+    free(sf->lag_gram);
+    free(sf->tmp);
+}
+
+//computes from scratch the moments of the window starting at y
+void slidingMomentsInit(slidingFit *sf, double *y, double y_ref, double *mom)
+{
+    int n = sf->n_coeffs;
+
+    for(int k = 0; k < n; k++)
+    {
+        mom[k] = 0.0;
+    }
+    for(int j = 0; j < sf->win_size; j++)
+    {
+        double dy = y[j] - y_ref;
+        for(int k = 0; k < n; k++)
+        {
+            mom[k] += sf->vander[j * n + k] * dy;
+        }
+    }
+}
+
+//moves the moments of the window starting at y to the window starting at y + 1
+void slidingMomentsNext(slidingFit *sf, double *y, double y_ref, double *mom)
+{
+    int n = sf->n_coeffs;
+    double dy_out = y[0] - y_ref;
+    double dy_in = y[sf->win_size] - y_ref;
+
+    for(int k = 0; k < n; k++)
+    {
+        double val = dy_in - sf->drop_pow[k] * dy_out;
+        for(int i = 0; i <= k; i++)
+        {
+            val += sf->shift_bw[k * n + i] * mom[i];
+        }
+        sf->tmp[k] = val;
+    }
+    for(int k = 0; k < n; k++)
+    {
+        mom[k] = sf->tmp[k];
+    }
+}
+
+//coefficients of the fit (in powers of the local abscissa) from the moments
+void slidingCoeffs(slidingFit *sf, double *mom, double *c)
+{
+    int n = sf->n_coeffs;
+
+    for(int r = 0; r < n; r++)
+    {
+        c[r] = 0.0;
+        for(int k = 0; k < n; k++)
+        {
+            c[r] += sf->gram_inv[r * n + k] * mom[k];
+        }
+    }
+}
+
+//value of the fit at the j-th point of the window
+double slidingFitValue(slidingFit *sf, double *c, int j)
+{
+    int n = sf->n_coeffs;
+    double fit = c[n - 1];
+
+    for(int k = n - 2; k >= 0; k--)
+    {
+        fit = fit * sf->x_loc[j] + c[k];
+    }
+
+    return fit;
+}
+
+//sum over j < win_size - 1 of fit_j * dy_{j+1} + dy_j * fit_{j+1}, where dy = y - y_ref,
+//dy_first and dy_last are the first and last values of dy in the window
+double slidingLagCross(slidingFit *sf, double *mom, double *c, double dy_first, double dy_last)
+{
+    int n = sf->n_coeffs;
+    double val = 0.0;
+
+    for(int k = 0; k < n; k++)
+    {
+        double fw = 0.0, bw = 0.0;
+        double sign = 1.0;
+        for(int i = 0; i <= k; i++)
+        {
+            fw += sf->shift_fw[k * n + i] * (mom[i] - dy_last);
+            bw += sf->shift_bw[k * n + i] * (mom[i] - sign * dy_first);
+            sign = -sign;
+        }
+        val += c[k] * (fw + bw);
+    }
+
+    return val;
+}
+
+//double-double number, the value is hi + lo with |lo| <= ulp(hi) / 2
+typedef struct
+{
+    double hi;
+    double lo;
+} ddouble;
+
+ddouble ddFastTwoSum(double a, double b)
+{
+    ddouble r;
+    r.hi = a + b;
+    r.lo = b - (r.hi - a);
+    return r;
+}
+
+ddouble ddTwoSum(double a, double b)
+{
+    ddouble r;
+    r.hi = a + b;
+    double bb = r.hi - a;
+    r.lo = (a - (r.hi - bb)) + (b - bb);
+    return r;
+}
+
+//exact product of two doubles (Dekker's algorithm)
+ddouble ddTwoProd(double a, double b)
+{
+    ddouble r;
+    double t = 134217729.0 * a;
+    double a_hi = t - (t - a);
+    double a_lo = a - a_hi;
+    t = 134217729.0 * b;
+    double b_hi = t - (t - b);
+    double b_lo = b - b_hi;
+    r.hi = a * b;
+    r.lo = ((a_hi * b_hi - r.hi) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo;
+    return r;
+}
+
+ddouble ddAdd(ddouble a, ddouble b)
+{
+    ddouble r = ddTwoSum(a.hi, b.hi);
+    return ddFastTwoSum(r.hi, r.lo + a.lo + b.lo);
+}
+
+ddouble ddSub(ddouble a, ddouble b)
+{
+    ddouble r = ddTwoSum(a.hi, -b.hi);
+    return ddFastTwoSum(r.hi, r.lo + a.lo - b.lo);
+}
+
+ddouble ddMulD(ddouble a, double b)
+{
+    ddouble r = ddTwoProd(a.hi, b);
+    return ddFastTwoSum(r.hi, r.lo + a.lo * b);
+}
+
+ddouble ddMul(ddouble a, ddouble b)
+{
+    ddouble r = ddTwoProd(a.hi, b.hi);
+    return ddFastTwoSum(r.hi, r.lo + a.hi * b.lo + a.lo * b.hi);
+}
+
+ddouble ddDivD(ddouble a, double b)
+{
+    double q = a.hi / b;
+    ddouble p = ddTwoProd(q, b);
+    return ddFastTwoSum(q, (((a.hi - p.hi) - p.lo) + a.lo) / b);
+}
+
+//cumulative sums of i^k * y1[i], i^k * y2[i] (k <= pol_ord <= 2) and y1[i] * y2[i],
+//the sums are stored as double-double numbers to avoid cancellation when
+//the sums of a segment are computed as differences of the cumulative ones
+typedef struct
+{
+    int N;
+    int pol_ord;
+    ddouble *mom_1[3];
+    ddouble *mom_2[3];
+    ddouble *cross;
+} prefixTable;
+
+void prefixMomentsAlloc(ddouble **mom, double *y, int N, int pol_ord)
+{
+    for(int k = 0; k <= pol_ord; k++)
+    {
+        mom[k] = countedMalloc((N + 1) * sizeof(ddouble));
+        mom[k][0].hi = 0.0;
+        mom[k][0].lo = 0.0;
+    }
+
+    for(int i = 0; i < N; i++)
+    {
+        ddouble term;
+        term.hi = y[i];
+        term.lo = 0.0;
+        mom[0][i + 1] = ddAdd(mom[0][i], term);
+        for(int k = 1; k <= pol_ord; k++)
+        {
+            mom[k][i + 1] = ddAdd(mom[k][i], ddTwoProd((k == 1) ? (double)i : (double)i * (double)i, y[i]));
+        }
+    }
+}
+
+ddouble *prefixCrossAlloc(double *y1, double *y2, int N)
+{
+    ddouble *cross = countedMalloc((N + 1) * sizeof(ddouble));
+
+    cross[0].hi = 0.0;
+    cross[0].lo = 0.0;
+    for(int i = 0; i < N; i++)
+    {
+        cross[i + 1] = ddAdd(cross[i], ddTwoProd(y1[i], y2[i]));
+    }
+
+    return cross;
+}
+
+//builds the cumulative sums of the series y1 and y2 (y2 can be the same array as y1)
+void prefixTableAlloc(prefixTable *pt, double *y1, double *y2, int N, int pol_ord)
+{
+    pt->N = N;
+    pt->pol_ord = pol_ord;
+
+    prefixMomentsAlloc(pt->mom_1, y1, N, pol_ord);
+    if(y2 == y1)
+    {
+        for(int k = 0; k <= pol_ord; k++)
+        {
+            pt->mom_2[k] = pt->mom_1[k];
+        }
+    }
+    else
+    {
+        prefixMomentsAlloc(pt->mom_2, y2, N, pol_ord);
+    }
+
+    pt->cross = prefixCrossAlloc(y1, y2, N);
+}
+
+void prefixTableFree(prefixTable *pt)
+{
+    for(int k = 0; k <= pt->pol_ord; k++)
+    {
+        if(pt->mom_2[k] != pt->mom_1[k])
+        {
+            free(pt->mom_2[k]);
+        }
+        free(pt->mom_1[k]);
+    }
+    free(pt->cross);
+}
+
+//projections of the segment [start, start + s) of a series onto the discrete
+//orthogonal polynomials of order 0, 1 and 2 (the last one scaled by 12)
+void prefixProjections(ddouble **mom, int pol_ord, int start, int s, ddouble *proj)
+{
+    double m0 = start + 0.5 * (s - 1);
+    ddouble s0 = ddSub(mom[0][start + s], mom[0][start]);
+    ddouble s1 = ddSub(mom[1][start + s], mom[1][start]);
+
+    proj[0] = s0;
+    proj[1] = ddSub(s1, ddMulD(s0, m0));
+    if(pol_ord > 1)
+    {
+        ddouble s2 = ddSub(mom[2][start + s], mom[2][start]);
+        ddouble l2 = ddAdd(ddSub(s2, ddMulD(s1, 2.0 * m0)), ddMulD(s0, m0 * m0));
+        proj[2] = ddSub(ddMulD(l2, 12.0), ddMulD(s0, (double)s * s - 1.0));
+    }
+}
+
+//sum of the products of the detrended values of y1 and y2 in the segment [start, start + s)
+double segmentCovFast(prefixTable *pt, int start, int s)
+{
+    ddouble p1[3], p2[3];
+    double s_2 = (double)s * s;
+
+    prefixProjections(pt->mom_1, pt->pol_ord, start, s, p1);
+    prefixProjections(pt->mom_2, pt->pol_ord, start, s, p2);
+
+    ddouble cov = ddSub(pt->cross[start + s], pt->cross[start]);
+    cov = ddSub(cov, ddDivD(ddMul(p1[0], p2[0]), s));
+    cov = ddSub(cov, ddDivD(ddDivD(ddMulD(ddMul(p1[1], p2[1]), 12.0), s), s_2 - 1.0));
+    if(pt->pol_ord > 1)
+    {
+        cov = ddSub(cov, ddDivD(ddDivD(ddDivD(ddMulD(ddMul(p1[2], p2[2]), 1.25), s), s_2 - 1.0), s_2 - 4.0));
+    }
+
+    return cov.hi + cov.lo;
+}
+
+//tables of y1 with y2, y1 with itself and y2 with itself used for the cross-correlation
+//index, the last two share the moments of the first one
+void rhoTablesAlloc(prefixTable *pt, double *y1, double *y2, int N, int pol_ord)
+{
+    prefixTableAlloc(&pt[0], y1, y2, N, pol_ord);
+    pt[1] = pt[0];
+    pt[2] = pt[0];
+    for(int k = 0; k <= pol_ord; k++)
+    {
+        pt[1].mom_2[k] = pt[0].mom_1[k];
+        pt[2].mom_1[k] = pt[0].mom_2[k];
+    }
+    pt[1].cross = prefixCrossAlloc(y1, y1, N);
+    pt[2].cross = prefixCrossAlloc(y2, y2, N);
+}
+
+void rhoTablesFree(prefixTable *pt)
+{
+    free(pt[1].cross);
+    free(pt[2].cross);
+    prefixTableFree(&pt[0]);
+}
+
+//xoshiro256** pseudo-random number generator
+typedef struct
+{
+    uint64_t s[4];
+} rngState;
+
+uint64_t splitMix64(uint64_t *x)
+{
+    uint64_t z = (*x += 0x9E3779B97F4A7C15ULL);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+//seeds the independent stream number stream of the generator, the same
+//seed and stream always give the same sequence
+void rngSeed(rngState *rng, uint64_t seed, uint64_t stream)
+{
+    uint64_t x = seed ^ (stream * 0xD1B54A32D192ED03ULL);
+
+    for(int k = 0; k < 4; k++)
+    {
+        rng->s[k] = splitMix64(&x);
+    }
+}
+
+uint64_t rngNext(rngState *rng)
+{
+    uint64_t *s = rng->s;
+    uint64_t r = s[1] * 5;
+    uint64_t res = ((r << 7) | (r >> 57)) * 9;
+    uint64_t t = s[1] << 17;
+
+    s[2] ^= s[0];
+    s[3] ^= s[1];
+    s[1] ^= s[2];
+    s[0] ^= s[3];
+    s[2] ^= t;
+    s[3] = (s[3] << 45) | (s[3] >> 19);
+
+    return res;
+}
+
+//uniform number in (0, 1)
+double rngUniform(rngState *rng)
+{
+    return ((rngNext(rng) >> 11) + 0.5) * (1.0 / 9007199254740992.0);
+}
+
+//fills vec with the cumulative sum of n standard normal numbers (Box-Muller)
+//whose mean has been subtracted
+void rngRandomWalk(rngState *rng, double *vec, int n)
+{
+    double mean = 0.0;
+
+    for(int i = 0; i < n; i += 2)
+    {
+        double rad = sqrt(-2.0 * log(rngUniform(rng)));
+        double ang = 6.283185307179586 * rngUniform(rng);
+        vec[i] = rad * cos(ang);
+        if((i + 1) < n)
+        {
+            vec[i + 1] = rad * sin(ang);
+        }
+    }
+
+    for(int i = 0; i < n; i++)
+    {
+        mean += vec[i];
+    }
+    mean /= (double)n;
+
+    vec[0] -= mean;
+    for(int i = 1; i < n; i++)
+    {
+        vec[i] += vec[i - 1] - mean;
+    }
+}
@@ -14,872 +14,2527 @@
 //    You should have received a copy of the GNU General Public License
 //    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-#include "cFuncs.h"
 #include "cLoops.h"
+#include "cFuncs.h"
 #include "omp.h"
 
-#define LQ -3.0e-15
-#define HQ 3.0e-15
+#define LQ -3.0e-15
+#define HQ 3.0e-15
+#define HT_BLOCK 4096
+#define RHO_MAT_BUF 2097152
+#define RHO_MAT_ROWS 32
+#define RHO_MAT_TILE 256
+#define SEG_TASK_WORK 32768
+#define SEG_SLIDE_COST 16
+#define SEG_FAST_COST 16
+
+//profile of a computation, collected between profileStart and profileStop: wall time of each
+//phase (PROF_INPUT to PROF_REDUCE), polynomial fits, bytes allocated, busy time of each thread in
+//the parallel loops and time spent on each window's size summed over the threads
+typedef struct
+{
+    int phase;
+    double mark;
+    double phases[PROF_N_PHASES];
+    long long n_fits;
+    long long n_bytes;
+    int n_threads;
+    double *thread_busy;
+    int n_wins;
+    double *win_cost;
+} runProfile;
+
+//profile of the computation running on the calling thread, NULL if it is not profiled. The
+//parallel loops read it before starting and pass it to the hooks of their tasks, so that each
+//computation only updates its own profile also when several threads compute at the same time
+static THREAD_LOCAL runProfile *prof = NULL;
+
+//starts the profile of a computation on n_wins window's sizes from its PROF_INPUT phase,
+//returns the number of threads profiled (to be called before the parallel regions)
+int profileStart(int n_wins)
+{
+    runProfile *rp = calloc(1, sizeof(runProfile));
+    rp->n_threads = omp_get_max_threads();
+    rp->thread_busy = calloc(rp->n_threads, sizeof(double));
+    rp->n_wins = n_wins;
+    rp->win_cost = calloc((n_wins > 0) ? n_wins : 1, sizeof(double));
+    rp->phase = PROF_INPUT;
+    rp->mark = omp_get_wtime();
+    prof = rp;
+    counted_bytes = &rp->n_bytes;
+
+    return rp->n_threads;
+}
+
+//moves the profile to the given phase (to be called outside of the parallel regions)
+void profilePhase(int phase)
+{
+    if(prof != NULL)
+    {
+        double now = omp_get_wtime();
+        prof->phases[prof->phase] += now - prof->mark;
+        prof->phase = phase;
+        prof->mark = now;
+    }
+}
+
+//profile to be passed to the tasks of the parallel loops, NULL if the computation is not
+//profiled (to be called outside of the parallel regions)
+runProfile *profileCurrent(void)
+{
+    return prof;
+}
+
+//start time of a task of a parallel loop, 0 if the computation is not profiled (rp is NULL);
+//the allocations of the task are counted in the profile rp
+double profileClock(runProfile *rp)
+{
+    if(rp == NULL)
+    {
+        return 0.0;
+    }
+    counted_bytes = &rp->n_bytes;
+
+    return omp_get_wtime();
+}
+
+//adds to the profile rp a task of window win, started at start, that made n_fits polynomial fits
+//(to be called by the thread that computed the task)
+void profileTask(runProfile *rp, int win, long long n_fits, double start)
+{
+    if(rp != NULL)
+    {
+        double busy = omp_get_wtime() - start;
+        int th = omp_get_thread_num();
+#pragma omp atomic
+        rp->n_fits += n_fits;
+        if((win >= 0) && (win < rp->n_wins))
+        {
+#pragma omp atomic
+            rp->win_cost[win] += busy;
+        }
+        if((th >= 0) && (th < rp->n_threads))
+        {
+            rp->thread_busy[th] += busy;
+        }
+        //the threads of the loop other than the calling one count allocations only during the tasks
+        counted_bytes = (prof != NULL) ? &prof->n_bytes : NULL;
+    }
+}
+
+//stops the profile and copies the wall time of the phases, the number of fits and of bytes
+//allocated (counts[0] and counts[1]), the busy time of the threads and the cost of the windows
+void profileStop(double *phases, long long *counts, double *thread_busy, double *win_cost)
+{
+    if(prof == NULL)
+    {
+        return;
+    }
+    profilePhase(PROF_INPUT);
+    counted_bytes = NULL;
+
+    memcpy(phases, prof->phases, PROF_N_PHASES * sizeof(double));
+    counts[0] = prof->n_fits;
+    counts[1] = prof->n_bytes;
+    memcpy(thread_busy, prof->thread_busy, prof->n_threads * sizeof(double));
+    memcpy(win_cost, prof->win_cost, prof->n_wins * sizeof(double));
+
+    free(prof->thread_busy);
+    free(prof->win_cost);
+    free(prof);
+    prof = NULL;
+}
+
+//ranges of segments computed as separate tasks, so that the segments of a few large windows
+//are shared among the threads: the tasks of window i go from first[i] to first[i + 1] - 1,
+//and task k covers the segments from lo[k] to hi[k] - 1 of window win[k]
+typedef struct
+{
+    int n_tasks;
+    int cap;
+    int *win;
+    int *lo;
+    int *hi;
+    int *first;
+} segTasks;
+
+void segTasksInit(segTasks *st, int n_wins)
+{
+    st->n_tasks = 0;
+    st->cap = 0;
+    st->win = NULL;
+    st->lo = NULL;
+    st->hi = NULL;
+    st->first = countedMalloc((n_wins + 1) * sizeof(int));
+    st->first[0] = 0;
+}
+
+//splits the n_segs segments of window win, costing about seg_cost operations each, in ranges of
+//about SEG_TASK_WORK operations (windows must be added in order); ranges are a multiple of align
+//segments, so that the running sums of the sliding fits are restarted at the same segments
+//whatever the number of tasks
+void segTasksAdd(segTasks *st, int win, int n_segs, int seg_cost, int align)
+{
+    int chunk = SEG_TASK_WORK / ((seg_cost > 0) ? seg_cost : 1);
+    chunk = (((chunk > 0) ? chunk : 1) + align - 1) / align * align;
+
+    for(int lo = 0; lo < n_segs; lo += chunk)
+    {
+        if(st->n_tasks == st->cap)
+        {
+            st->cap = 2 * st->cap + 16;
+            st->win = countedRealloc(st->win, st->cap * sizeof(int));
+            st->lo = countedRealloc(st->lo, st->cap * sizeof(int));
+            st->hi = countedRealloc(st->hi, st->cap * sizeof(int));
+        }
+        st->win[st->n_tasks] = win;
+        st->lo[st->n_tasks] = lo;
+        st->hi[st->n_tasks] = (n_segs - lo > chunk) ? lo + chunk : n_segs;
+        st->n_tasks++;
+    }
+    st->first[win + 1] = st->n_tasks;
+}
+
+//sum of the partial results of the tasks of window win, stored every stride elements of part
+double segTasksSum(segTasks *st, double *part, int stride, int win)
+{
+    double f = 0.0;
+
+    for(int k = st->first[win]; k < st->first[win + 1]; k++)
+    {
+        f += part[k * stride];
+    }
+
+    return f;
+}
+
+void segTasksFree(segTasks *st)
+{
+    free(st->win);
+    free(st->lo);
+    free(st->hi);
+    free(st->first);
+}
+
+//fit workspaces of the windows of a task loop, shared read-only by the tasks of each window: the
+//workspace of window i (segments of size wins[i] + seg_extra) is built by the first task of the
+//window that needs it and freed by the last one, so that the projection matrix of a window is
+//computed once and only the windows being computed hold one
+typedef struct
+{
+    int *wins;
+    int seg_extra;
+    int pol_ord;
+    int fit_method;
+    int single;
+    fitWorkspace *ws;
+    int *built;
+    int *left;
+    omp_lock_t *lock;
+} fitBases;
+
+void fitBasesInit(fitBases *fb, segTasks *st, int *wins, int n_wins, int seg_extra, int pol_ord, int fit_method, int single)
+{
+    fb->wins = wins;
+    fb->seg_extra = seg_extra;
+    fb->pol_ord = pol_ord;
+    fb->fit_method = fit_method;
+    fb->single = single;
+    fb->ws = countedMalloc(n_wins * sizeof(fitWorkspace));
+    fb->built = countedCalloc(n_wins, sizeof(int));
+    fb->left = countedMalloc(n_wins * sizeof(int));
+    fb->lock = countedMalloc(n_wins * sizeof(omp_lock_t));
+    for(int i = 0; i < n_wins; i++)
+    {
+        fb->left[i] = st->first[i + 1] - st->first[i];
+        omp_init_lock(&fb->lock[i]);
+    }
+}
+
+//workspace of window i, the tasks of the window wait for the first one to build it
+fitWorkspace *fitBasesGet(fitBases *fb, int i)
+{
+    omp_set_lock(&fb->lock[i]);
+    if(!fb->built[i])
+    {
+        if(fb->single)
+        {
+            fitWorkspaceAllocF(&fb->ws[i], fb->fit_method, fb->wins[i] + fb->seg_extra, fb->pol_ord);
+        }
+        else
+        {
+            fitWorkspaceAlloc(&fb->ws[i], fb->fit_method, fb->wins[i] + fb->seg_extra, fb->pol_ord);
+        }
+        fb->built[i] = 1;
+    }
+    omp_unset_lock(&fb->lock[i]);
+
+    return &fb->ws[i];
+}
+
+//marks a task of window i as done, the workspace of the window is freed after its last task
+void fitBasesDone(fitBases *fb, int i)
+{
+    omp_set_lock(&fb->lock[i]);
+    fb->left[i]--;
+    if((fb->left[i] == 0) && fb->built[i])
+    {
+        fitWorkspaceFree(&fb->ws[i]);
+        fb->built[i] = 0;
+    }
+    omp_unset_lock(&fb->lock[i]);
+}
+
+void fitBasesFree(fitBases *fb, int n_wins)
+{
+    for(int i = 0; i < n_wins; i++)
+    {
+        if(fb->built[i])
+        {
+            fitWorkspaceFree(&fb->ws[i]);
+        }
+        omp_destroy_lock(&fb->lock[i]);
+    }
+    free(fb->ws);
+    free(fb->built);
+    free(fb->left);
+    free(fb->lock);
+}
+
+//q-order fluctuations of the window of index i from the variances var of its n_segs
+//segments, the q = 0 order is computed with a logarithmic average
+void qOrderFluc(double *var, int n_segs, double *qs, int n_q, int i, int n_wins, double *f_vec)
+{
+    for(int iq = 0; iq < n_q; iq++)
+    {
+        double q = qs[iq];
+        double f = 0.0;
+        if((q >= LQ) && (q <= HQ))
+        {
+            for(int v = 0; v < n_segs; v++)
+            {
+                f += log(var[v]);
+            }
+            f_vec[iq * n_wins + i] = exp(f / (double)(2 * n_segs));
+        }
+        else
+        {
+            for(int v = 0; v < n_segs; v++)
+            {
+                f += pow(var[v], 0.5 * q);
+            }
+            f_vec[iq * n_wins + i] = pow(f / (double)n_segs, 1 / (double)q);
+        }
+    }
+}
+
+//unbiased DFA fluctuation of a segment of length s from the sums of its residuals df
+//(df_alt_sum is the sum of (-1)^j * df[j], df_shift_sum the sum of df[j] * df[j + 1])
+double udfaSegmentFluc(int s, double df_sum, double df_2_sum, double df_alt_sum, double df_shift_sum, double df_first, double df_last)
+{
+    double df_neg_mean = df_alt_sum / (double)s;
+    double df_neg_var = df_2_sum / (double)s - df_neg_mean * df_neg_mean;
+    double df_pos_mean = df_sum / (double)s;
+    double df_pos_var = df_2_sum / (double)s - df_pos_mean * df_pos_mean;
+
+    double df_pos_shift = (df_shift_sum + df_pos_mean * (df_first + df_last - df_pos_mean * (s + 1))) / df_pos_var;
+    double df_neg_shift = (-df_shift_sum + df_neg_mean * (df_first + pow(-1.0, s + 1) * df_last - df_neg_mean * (s + 1))) / df_neg_var;
+    double rho_A = (s + df_pos_shift) / (double)(2 * s - 1);
+    double rho_B = (s + df_neg_shift) / (double)(2 * s - 1);
+
+    double rho_A_star = rho_A + (1 + 3 * rho_A) / (double)(2 * s);
+    double rho_B_star = rho_B + (1 + 3 * rho_B) / (double)(2 * s);
+
+    return (rho_A_star + rho_B_star) * (1 - 1.0 / (double)(2 * s)) * df_pos_var;
+}
+
+//sum of the fluctuations of unbiased DFA of the segments of size s starting at y_vec + start,
+//for start from lo to hi - 1, detrended with the workspace basis (not used by FIT_DIRECT)
+double udfaSegmentsFluc(fitWorkspace *basis, double *y_vec, double *t_vec, int s, int pol, int fit_method, int lo, int hi)
+{
+    double f = 0.0;
+
+    if(fit_method == FIT_DIRECT)
+    {
+        //all the sums of the residuals follow from running sums of the series,
+        //which are recomputed from scratch every s shifts to bound round-off drift
+        slidingFit sf;
+        slidingFitAlloc(&sf, s, pol);
+        int n = pol + 1;
+        double *mom = countedMalloc(n * sizeof(double));
+        double *c = countedMalloc(n * sizeof(double));
+        double y_ref = 0.0, sq_sum = 0.0, alt_sum = 0.0, lag_sum = 0.0;
+        for(int start = lo; start < hi; start++)
+        {
+            double *y = y_vec + start;
+            if((start - lo) % s == 0)
+            {
+                y_ref = y[0];
+                slidingMomentsInit(&sf, y, y_ref, mom);
+                sq_sum = 0.0;
+                alt_sum = 0.0;
+                lag_sum = 0.0;
+                for(int j = 0; j < s; j++)
+                {
+                    double dy = y[j] - y_ref;
+                    sq_sum += dy * dy;
+                    alt_sum += (j % 2 == 0) ? dy : -dy;
+                    if(j < (s - 1))
+                    {
+                        lag_sum += dy * (y[j + 1] - y_ref);
+                    }
+                }
+            }
+            else
+            {
+                double dy_out = y[-1] - y_ref;
+                double dy_in = y[s - 1] - y_ref;
+                slidingMomentsNext(&sf, y - 1, y_ref, mom);
+                sq_sum += dy_in * dy_in - dy_out * dy_out;
+                alt_sum = dy_out - alt_sum - ((s % 2 == 0) ? dy_in : -dy_in);
+                lag_sum += (y[s - 2] - y_ref) * dy_in - dy_out * (y[0] - y_ref);
+            }
+            slidingCoeffs(&sf, mom, c);
+
+            double df_sum = mom[0], df_2_sum = sq_sum, df_alt_sum = alt_sum, fit_lag = 0.0;
+            for(int k = 0; k < n; k++)
+            {
+                df_sum -= c[k] * sf.col_sum[k];
+                df_2_sum -= c[k] * mom[k];
+                df_alt_sum -= c[k] * sf.alt_sum[k];
+                for(int l = 0; l < n; l++)
+                {
+                    fit_lag += c[k] * sf.lag_gram[k * n + l] * c[l];
+                }
+            }
+            double df_shift_sum = lag_sum - slidingLagCross(&sf, mom, c, y[0] - y_ref, y[s - 1] - y_ref) + fit_lag;
+            double df_first = y[0] - y_ref - slidingFitValue(&sf, c, 0);
+            double df_last = y[s - 1] - y_ref - slidingFitValue(&sf, c, s - 1);
+
+            f += udfaSegmentFluc(s, df_sum, df_2_sum, df_alt_sum, df_shift_sum, df_first, df_last);
+        }
+
+        free(mom);
+        free(c);
+        slidingFitFree(&sf);
+    }
+    else
+    {
+        fitWorkspace ws;
+        fitWorkspaceShare(&ws, basis);
+        double *df = countedMalloc(s * sizeof(double));
+        for(int start = lo; start < hi; start++)
+        {
+            detrendSegment(&ws, t_vec + start, y_vec + start, df);
+
+            double df_sum = 0.0, df_2_sum = 0.0, df_even_sum = 0.0, df_odd_sum = 0.0, df_shift_sum = 0.0;
+            for(int j = 0; j < s; j++)
+            {
+                df_sum += df[j];
+                df_2_sum += df[j] * df[j];
+            }
+            for(int j = 0; j < s; j += 2)
+            {
+                df_odd_sum += df[j];
+            }
+            for(int j = 1; j < s; j += 2)
+            {
+                df_even_sum += df[j];
+            }
+            for(int j = 0; j < (s - 1); j++)
+            {
+                df_shift_sum += (df[j] * df[j + 1]);
+            }
+
+            f += udfaSegmentFluc(s, df_sum, df_2_sum, df_odd_sum - df_even_sum, df_shift_sum, df[0], df[s - 1]);
+        }
+
+        free(df);
+        fitWorkspaceFree(&ws);
+    }
+
+    return f;
+}
+
+//fluctuation of unbiased DFA for segments of size s
+double udfaWindowFluc(double *y_vec, double *t_vec, int y_len, int s, int pol, int fit_method)
+{
+    int n_wins = y_len - s + 1;
+    //the sliding fits of FIT_DIRECT do not need the projection matrix
+    fitWorkspace basis;
+    fitWorkspaceAlloc(&basis, (fit_method == FIT_DIRECT) ? FIT_GSL : fit_method, s, pol);
+    double f = udfaSegmentsFluc(&basis, y_vec, t_vec, s, pol, fit_method, 0, n_wins);
+    fitWorkspaceFree(&basis);
+
+    return sqrt(f * sqrt((s - 1) / (double)s) / (double)(n_wins));
+}
+
+//sum of the squared residuals of DFA of the segments from v_lo to v_hi - 1 of the size of the workspace
+//basis starting from the beginning of the array y, the segments starting from the end of the array y
+//are added if rev_seg is set
+double dfaSegmentsFluc(fitWorkspace *basis, double *y, double *t, int N, int rev_seg, int v_lo, int v_hi)
+{
+    int curr_win_size = basis->win_size;
+    int N_s = N / curr_win_size;
+    double f = 0.0;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    double *res = countedMalloc(curr_win_size * sizeof(double));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = v * curr_win_size;
+        detrendSegment(&ws, t + start_lim, y + start_lim, res);
+        f += sumSquares(res, curr_win_size);
+
+        if(rev_seg)
+        {
+            start_lim = v * curr_win_size + (N - N_s * curr_win_size);
+            detrendSegment(&ws, t + start_lim, y + start_lim, res);
+            f += sumSquares(res, curr_win_size);
+        }
+    }
+
+    free(res);
+    fitWorkspaceFree(&ws);
+
+    return f;
+}
+
+//fluctuation of DFA for segments of size curr_win_size starting from the beginning of the
+//array y, the segments starting from the end of the array y are added if rev_seg is set
+double dfaWindowFluc(double *y, double *t, int N, int curr_win_size, int pol_ord, int rev_seg, int fit_method)
+{
+    int N_s = N / curr_win_size;
+    fitWorkspace basis;
+    fitWorkspaceAlloc(&basis, fit_method, curr_win_size, pol_ord);
+    double f = dfaSegmentsFluc(&basis, y, t, N, rev_seg, 0, N_s);
+    fitWorkspaceFree(&basis);
+
+    return sqrt(f / ((rev_seg ? 2.0 : 1.0) * N_s * curr_win_size));
+}
+
+//variances of the segments from v_lo to v_hi - 1 of the size of the workspace basis used by MFDFA
+//(y2 is the same array as y1) and MFDCCA, stored in var; the segments from N / curr_win_size on
+//start from the end of the arrays
+void mfdfaSegmentsVar(fitWorkspace *basis, double *y1, double *y2, double *t, int N, int v_lo, int v_hi, double *var)
+{
+    int curr_win_size = basis->win_size;
+    int N_s = N / curr_win_size;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    double *res_1 = countedMalloc(curr_win_size * sizeof(double));
+    double *res_2 = (y2 == y1) ? res_1 : countedMalloc(curr_win_size * sizeof(double));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
+        detrendSegment(&ws, t + start_lim, y1 + start_lim, res_1);
+        var[v] = 0.0;
+        if(y2 == y1)
+        {
+            var[v] += sumSquares(res_1, curr_win_size);
+        }
+        else
+        {
+            detrendSegment(&ws, t + start_lim, y2 + start_lim, res_2);
+            var[v] += sumAbsProducts(res_1, res_2, curr_win_size);
+        }
+        var[v] /= (double)curr_win_size;
+    }
+
+    if(res_2 != res_1)
+    {
+        free(res_2);
+    }
+    free(res_1);
+    fitWorkspaceFree(&ws);
+}
+
+//variances of the segments of size curr_win_size used by MFDFA (y2 is the same array as y1)
+//and MFDCCA, stored in var; the variances of the segments starting from the end of the arrays
+//follow the ones of the segments starting from the beginning if rev_seg is set
+//(returns the number of segments)
+int mfdfaWindowVar(double *y1, double *y2, double *t, int N, int curr_win_size, int pol_ord, int rev_seg, int fit_method, double *var)
+{
+    int n_segs = rev_seg ? 2 * (N / curr_win_size) : N / curr_win_size;
+    fitWorkspace basis;
+    fitWorkspaceAlloc(&basis, fit_method, curr_win_size, pol_ord);
+    mfdfaSegmentsVar(&basis, y1, y2, t, N, 0, n_segs, var);
+    fitWorkspaceFree(&basis);
+
+    return n_segs;
+}
+
+//sum of the products of the residuals of DCCA of the overlapping segments from v_lo to v_hi - 1
+//of size curr_win_size + 1 using absolute values, detrended with the workspace basis (not used by FIT_DIRECT)
+double dccaAbsSegmentsFluc(fitWorkspace *basis, double *y1, double *y2, double *t, int curr_win_size, int pol_ord, int fit_method, int v_lo, int v_hi)
+{
+    double f = 0.0;
+
+    if(fit_method == FIT_DIRECT)
+    {
+        //the fits are updated point by point, the residuals still have to be
+        //evaluated on the whole window because of the absolute value
+        slidingFit sf;
+        slidingFitAlloc(&sf, curr_win_size + 1, pol_ord);
+        double *mom_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *mom_2 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *c_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *c_2 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double ref_1 = 0.0, ref_2 = 0.0;
+        for(int v = v_lo; v < v_hi; v++)
+        {
+            if((v - v_lo) % (curr_win_size + 1) == 0)
+            {
+                ref_1 = y1[v];
+                ref_2 = y2[v];
+                slidingMomentsInit(&sf, y1 + v, ref_1, mom_1);
+                slidingMomentsInit(&sf, y2 + v, ref_2, mom_2);
+            }
+            else
+            {
+                slidingMomentsNext(&sf, y1 + v - 1, ref_1, mom_1);
+                slidingMomentsNext(&sf, y2 + v - 1, ref_2, mom_2);
+            }
+            slidingCoeffs(&sf, mom_1, c_1);
+            slidingCoeffs(&sf, mom_2, c_2);
+            for(int j = 0; j <= curr_win_size; j++)
+            {
+                double r_1 = y1[v + j] - ref_1 - slidingFitValue(&sf, c_1, j);
+                double r_2 = y2[v + j] - ref_2 - slidingFitValue(&sf, c_2, j);
+                f += fabs(r_1 * r_2);
+            }
+        }
+
+        free(mom_1);
+        free(mom_2);
+        free(c_1);
+        free(c_2);
+        slidingFitFree(&sf);
+    }
+    else
+    {
+        fitWorkspace ws;
+        fitWorkspaceShare(&ws, basis);
+        double *res_1 = countedMalloc((curr_win_size + 1) * sizeof(double));
+        double *res_2 = countedMalloc((curr_win_size + 1) * sizeof(double));
+        for(int v = v_lo; v < v_hi; v++)
+        {
+            detrendSegment(&ws, t + v, y1 + v, res_1);
+            detrendSegment(&ws, t + v, y2 + v, res_2);
+
+            f += sumAbsProducts(res_1, res_2, curr_win_size + 1);
+        }
+
+        free(res_1);
+        free(res_2);
+        fitWorkspaceFree(&ws);
+    }
+
+    return f;
+}
+
+//sum of the products of the residuals of DCCA of the overlapping segments from v_lo to v_hi - 1
+//of size curr_win_size + 1 without using absolute values, detrended with the workspace basis (not used by FIT_DIRECT)
+double dccaNoAbsSegmentsFluc(fitWorkspace *basis, double *y1, double *y2, double *t, int curr_win_size, int pol_ord, int fit_method, int v_lo, int v_hi)
+{
+    double f = 0.0;
+
+    if(fit_method == FIT_DIRECT)
+    {
+        //the sum of the products of the residuals is the sum of the products of
+        //the series minus the projection of one of them onto the fit of the other,
+        //running sums are recomputed from scratch every window to bound round-off drift
+        slidingFit sf;
+        slidingFitAlloc(&sf, curr_win_size + 1, pol_ord);
+        double *mom_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *mom_2 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *c_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double ref_1 = 0.0, ref_2 = 0.0, cross = 0.0;
+        for(int v = v_lo; v < v_hi; v++)
+        {
+            if((v - v_lo) % (curr_win_size + 1) == 0)
+            {
+                ref_1 = y1[v];
+                ref_2 = y2[v];
+                slidingMomentsInit(&sf, y1 + v, ref_1, mom_1);
+                slidingMomentsInit(&sf, y2 + v, ref_2, mom_2);
+                cross = 0.0;
+                for(int j = 0; j <= curr_win_size; j++)
+                {
+                    cross += (y1[v + j] - ref_1) * (y2[v + j] - ref_2);
+                }
+            }
+            else
+            {
+                slidingMomentsNext(&sf, y1 + v - 1, ref_1, mom_1);
+                slidingMomentsNext(&sf, y2 + v - 1, ref_2, mom_2);
+                cross += (y1[v + curr_win_size] - ref_1) * (y2[v + curr_win_size] - ref_2) - (y1[v - 1] - ref_1) * (y2[v - 1] - ref_2);
+            }
+            slidingCoeffs(&sf, mom_1, c_1);
+            f += cross;
+            for(int k = 0; k <= pol_ord; k++)
+            {
+                f -= c_1[k] * mom_2[k];
+            }
+        }
+
+        free(mom_1);
+        free(mom_2);
+        free(c_1);
+        slidingFitFree(&sf);
+    }
+    else
+    {
+        fitWorkspace ws;
+        fitWorkspaceShare(&ws, basis);
+        double *res_1 = countedMalloc((curr_win_size + 1) * sizeof(double));
+        double *res_2 = countedMalloc((curr_win_size + 1) * sizeof(double));
+        for(int v = v_lo; v < v_hi; v++)
+        {
+            detrendSegment(&ws, t + v, y1 + v, res_1);
+            detrendSegment(&ws, t + v, y2 + v, res_2);
+
+            f += sumProducts(res_1, res_2, curr_win_size + 1);
+        }
+
+        free(res_1);
+        free(res_2);
+        fitWorkspaceFree(&ws);
+    }
+
+    return f;
+}
+
+//sum of the products of the residuals of DCCA of the segments from v_lo to v_hi - 1 of size curr_win_size,
+//using absolute values if abs_vals is set; segments are overlapping if overlap is set, otherwise
+//the segments starting from the end of the arrays y1 and y2 are added if rev_seg is set. The segments
+//are detrended with the workspace basis, of size curr_win_size + 1 if overlap is set
+double dccaSegmentsFluc(fitWorkspace *basis, double *y1, double *y2, double *t, int N, int curr_win_size, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, int v_lo, int v_hi)
+{
+    if(overlap)
+    {
+        return abs_vals ? dccaAbsSegmentsFluc(basis, y1, y2, t, curr_win_size, pol_ord, fit_method, v_lo, v_hi) : dccaNoAbsSegmentsFluc(basis, y1, y2, t, curr_win_size, pol_ord, fit_method, v_lo, v_hi);
+    }
+
+    int N_s = N / curr_win_size;
+    double f = 0.0;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    double *res_1 = countedMalloc(curr_win_size * sizeof(double));
+    double *res_2 = countedMalloc(curr_win_size * sizeof(double));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = v * curr_win_size;
+        for(int dir = 0; dir < (rev_seg ? 2 : 1); dir++)
+        {
+            if(dir == 1)
+            {
+                start_lim = v * curr_win_size + (N - N_s * curr_win_size);
+            }
+            detrendSegment(&ws, t + start_lim, y1 + start_lim, res_1);
+            detrendSegment(&ws, t + start_lim, y2 + start_lim, res_2);
+
+            f += abs_vals ? sumAbsProducts(res_1, res_2, curr_win_size) : sumProducts(res_1, res_2, curr_win_size);
+        }
+    }
+
+    free(res_1);
+    free(res_2);
+    fitWorkspaceFree(&ws);
+
+    return f;
+}
+
+//number of segments of size curr_win_size of DCCA, overlapping if overlap is set
+int dccaWindowSegs(int N, int curr_win_size, int overlap)
+{
+    return overlap ? N - curr_win_size : N / curr_win_size;
+}
+
+//fluctuation of DCCA from the sum f of the products of the residuals of its segments
+double dccaWindowNorm(double f, int N, int curr_win_size, int abs_vals, int overlap, int rev_seg)
+{
+    if(overlap)
+    {
+        f /= ((double)(N - curr_win_size) * (curr_win_size - 1));
+    }
+    else
+    {
+        f /= ((rev_seg ? 2.0 : 1.0) * (N / curr_win_size) * curr_win_size);
+    }
+
+    return abs_vals ? sqrt(f) : f;
+}
+
+//fluctuation of DCCA for segments of size curr_win_size, using absolute values if abs_vals is set;
+//segments are overlapping if overlap is set, otherwise the segments starting from the end of
+//the arrays y1 and y2 are added if rev_seg is set
+double dccaWindowFluc(double *y1, double *y2, double *t, int N, int curr_win_size, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method)
+{
+    //the sliding fits of FIT_DIRECT on overlapping segments do not need the projection matrix
+    fitWorkspace basis;
+    fitWorkspaceAlloc(&basis, (overlap && (fit_method == FIT_DIRECT)) ? FIT_GSL : fit_method, overlap ? curr_win_size + 1 : curr_win_size, pol_ord);
+    double f = dccaSegmentsFluc(&basis, y1, y2, t, N, curr_win_size, pol_ord, abs_vals, overlap, rev_seg, fit_method, 0, dccaWindowSegs(N, curr_win_size, overlap));
+    fitWorkspaceFree(&basis);
+
+    return dccaWindowNorm(f, N, curr_win_size, abs_vals, overlap, rev_seg);
+}
+
+//sum of the squared residuals of DFA of the segments from v_lo to v_hi - 1 using cumulative sums (pol_ord <= 2)
+double dfaSegmentsFlucFast(prefixTable *pt, int N, int curr_win_size, int rev_seg, int v_lo, int v_hi)
+{
+    int N_s = N / curr_win_size;
+    double f = 0.0;
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        f += segmentCovFast(pt, v * curr_win_size, curr_win_size);
+        if(rev_seg)
+        {
+            f += segmentCovFast(pt, v * curr_win_size + (N - N_s * curr_win_size), curr_win_size);
+        }
+    }
+
+    return f;
+}
+
+//fluctuation of DFA using cumulative sums (pol_ord <= 2)
+double dfaWindowFlucFast(prefixTable *pt, int N, int curr_win_size, int rev_seg)
+{
+    int N_s = N / curr_win_size;
+
+    return sqrt(dfaSegmentsFlucFast(pt, N, curr_win_size, rev_seg, 0, N_s) / ((rev_seg ? 2.0 : 1.0) * N_s * curr_win_size));
+}
+
+//variances of the segments from v_lo to v_hi - 1 used by MFDFA using cumulative sums (pol_ord <= 2),
+//the segments starting from the end of the array follow the ones starting from the beginning
+void mfdfaSegmentsVarFast(prefixTable *pt, int N, int curr_win_size, int v_lo, int v_hi, double *var)
+{
+    int N_s = N / curr_win_size;
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
+        var[v] = fmax(segmentCovFast(pt, start_lim, curr_win_size), 0.0) / (double)curr_win_size;
+    }
+}
+
+//variances of the segments used by MFDFA using cumulative sums (pol_ord <= 2)
+int mfdfaWindowVarFast(prefixTable *pt, int N, int curr_win_size, int rev_seg, double *var)
+{
+    int n_segs = rev_seg ? 2 * (N / curr_win_size) : N / curr_win_size;
+    mfdfaSegmentsVarFast(pt, N, curr_win_size, 0, n_segs, var);
+
+    return n_segs;
+}
+
+//sum of the products of the residuals of DCCA of the segments from v_lo to v_hi - 1 using
+//cumulative sums (pol_ord <= 2, no absolute values)
+double dccaSegmentsFlucFast(prefixTable *pt, int N, int curr_win_size, int overlap, int rev_seg, int v_lo, int v_hi)
+{
+    double f = 0.0;
+
+    if(overlap)
+    {
+        for(int v = v_lo; v < v_hi; v++)
+        {
+            f += segmentCovFast(pt, v, curr_win_size + 1);
+        }
+
+        return f;
+    }
+
+    int N_s = N / curr_win_size;
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        f += segmentCovFast(pt, v * curr_win_size, curr_win_size);
+        if(rev_seg)
+        {
+            f += segmentCovFast(pt, v * curr_win_size + (N - N_s * curr_win_size), curr_win_size);
+        }
+    }
+
+    return f;
+}
+
+//fluctuation of DCCA using cumulative sums (pol_ord <= 2, no absolute values)
+double dccaWindowFlucFast(prefixTable *pt, int N, int curr_win_size, int overlap, int rev_seg)
+{
+    double f = dccaSegmentsFlucFast(pt, N, curr_win_size, overlap, rev_seg, 0, dccaWindowSegs(N, curr_win_size, overlap));
+
+    return dccaWindowNorm(f, N, curr_win_size, 0, overlap, rev_seg);
+}
+
+//main loop for unbiased DFA, the segments of each window are split in tasks computed in parallel
+void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    segTasks st;
+    segTasksInit(&st, num_wins);
+    for(int i = 0; i < num_wins; i++)
+    {
+        int s = wins_vec[i];
+        if(fit_method == FIT_DIRECT)
+        {
+            segTasksAdd(&st, i, y_len - s + 1, SEG_SLIDE_COST, s);
+        }
+        else
+        {
+            segTasksAdd(&st, i, y_len - s + 1, s, 1);
+        }
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins_vec, num_wins, 0, pol, fit_method, 0);
+    double *part = countedMalloc(st.n_tasks * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < st.n_tasks; k++)
+#else
+    for(int k = 0; k < st.n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        int i = st.win[k];
+        if(fit_method == FIT_DIRECT)
+        {
+            part[k] = udfaSegmentsFluc(NULL, y_vec, t_vec, wins_vec[i], pol, fit_method, st.lo[k], st.hi[k]);
+        }
+        else
+        {
+            part[k] = udfaSegmentsFluc(fitBasesGet(&fb, i), y_vec, t_vec, wins_vec[i], pol, fit_method, st.lo[k], st.hi[k]);
+            fitBasesDone(&fb, i);
+        }
+        profileTask(rp, i, st.hi[k] - st.lo[k], start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    for(int i = 0; i < num_wins; i++)
+    {
+        int s = wins_vec[i];
+        f_vec[i] = sqrt(segTasksSum(&st, part, 1, i) * sqrt((s - 1) / (double)s) / (double)(y_len - s + 1));
+    }
+
+    free(part);
+    fitBasesFree(&fb, num_wins);
+    segTasksFree(&st);
+}
+
+//main loop for DFA, the segments of each window are split in tasks computed in parallel; the
+//fluctuations of the segments starting from the end of the array y are added if rev_seg is set
+//(t is not used by FIT_FAST)
+void flucDFATasksCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y, y, N, pol_ord);
+    }
+
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    for(int i = 0; i < n_wins; i++)
+    {
+        int seg_cost = (fit_method == FIT_FAST) ? SEG_FAST_COST : wins[i];
+        segTasksAdd(&st, i, N / wins[i], (rev_seg ? 2 : 1) * seg_cost, 1);
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, 0, pol_ord, fit_method, 0);
+    double *part = countedMalloc(st.n_tasks * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < st.n_tasks; k++)
+#else
+    for(int k = 0; k < st.n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        if(fit_method == FIT_FAST)
+        {
+            part[k] = dfaSegmentsFlucFast(&pt, N, wins[st.win[k]], rev_seg, st.lo[k], st.hi[k]);
+        }
+        else
+        {
+            part[k] = dfaSegmentsFluc(fitBasesGet(&fb, st.win[k]), y, t, N, rev_seg, st.lo[k], st.hi[k]);
+            fitBasesDone(&fb, st.win[k]);
+        }
+        profileTask(rp, st.win[k], (rev_seg ? 2 : 1) * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    for(int i = 0; i < n_wins; i++)
+    {
+        f_vec[i] = sqrt(segTasksSum(&st, part, 1, i) / ((rev_seg ? 2.0 : 1.0) * (N / wins[i]) * wins[i]));
+    }
+
+    free(part);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
+    }
+}
+
+//main loop for DFA (computes fluctuations starting from the beginning of the array y)
+void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDFATasksCompute(y, t, N, wins, n_wins, pol_ord, 0, fit_method, f_vec);
+}
+
+//main loop for DFA (computes fluctuations starting from the beginning of the array y
+//and then computes fluctuations again starting from the end of the array y)
+void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDFATasksCompute(y, t, N, wins, n_wins, pol_ord, 1, fit_method, f_vec);
+}
+
+//main loop for MFDFA (y2 is the same array as y1) and MFDCCA, the variances of the segments of
+//each window are computed in tasks in parallel and then the q-order fluctuations of each window;
+//the segments starting from the end of the arrays are added if rev_seg is set (t is not used by FIT_FAST)
+void flucMFTasksCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y1, y2, N, pol_ord);
+    }
+
+    //the variances do not depend on q, so the segments are detrended only once
+    size_t *var_off = countedMalloc((n_wins + 1) * sizeof(size_t));
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    var_off[0] = 0;
+    for(int i = 0; i < n_wins; i++)
+    {
+        int n_segs = (rev_seg ? 2 : 1) * (N / wins[i]);
+        int seg_cost = (fit_method == FIT_FAST) ? SEG_FAST_COST : ((y2 == y1) ? 1 : 2) * wins[i];
+        segTasksAdd(&st, i, n_segs, seg_cost, 1);
+        var_off[i + 1] = var_off[i] + n_segs;
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, 0, pol_ord, fit_method, 0);
+    double *var = countedMalloc(var_off[n_wins] * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < st.n_tasks; k++)
+#else
+    for(int k = 0; k < st.n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        int i = st.win[k];
+        if(fit_method == FIT_FAST)
+        {
+            mfdfaSegmentsVarFast(&pt, N, wins[i], st.lo[k], st.hi[k], var + var_off[i]);
+        }
+        else
+        {
+            mfdfaSegmentsVar(fitBasesGet(&fb, i), y1, y2, t, N, st.lo[k], st.hi[k], var + var_off[i]);
+            fitBasesDone(&fb, i);
+        }
+        profileTask(rp, i, ((y2 == y1) ? 1 : 2) * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
+
+#ifdef _WIN64
+    int i = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(i = 0; i < n_wins; i++)
+#else
+    for(int i = 0; i < n_wins; i++)
+#endif
+    {
+        qOrderFluc(var + var_off[i], (int)(var_off[i + 1] - var_off[i]), qs, n_q, i, n_wins, f_vec);
+    }
+
+    free(var);
+    free(var_off);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
+    }
+}
+
+//main loop for MFDFA (computes fluctuations starting from the beginning of the array y)
+void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+{
+    flucMFTasksCompute(y, y, t, N, wins, n_wins, qs, n_q, pol_ord, 0, fit_method, f_vec);
+}
+
+//main loop for MFDFA (computes fluctuations starting from the beginning of the array y
+//and then computes fluctuations again starting from the end of the array y)
+void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+{
+    flucMFTasksCompute(y, y, t, N, wins, n_wins, qs, n_q, pol_ord, 1, fit_method, f_vec);
+}
+
+//main loop for DCCA, the segments of each window are split in tasks computed in parallel; absolute
+//values are used if abs_vals is set, segments are overlapping if overlap is set, otherwise the segments
+//starting from the end of the arrays y1 and y2 are added if rev_seg is set (t is not used by FIT_FAST,
+//which does not use absolute values)
+void flucDCCATasksCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y1, y2, N, pol_ord);
+    }
+
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    for(int i = 0; i < n_wins; i++)
+    {
+        int s = wins[i];
+        int n_segs = dccaWindowSegs(N, s, overlap);
+        if(fit_method == FIT_FAST)
+        {
+            segTasksAdd(&st, i, n_segs, SEG_FAST_COST, 1);
+        }
+        else if(overlap && (fit_method == FIT_DIRECT))
+        {
+            segTasksAdd(&st, i, n_segs, abs_vals ? 2 * s : SEG_SLIDE_COST, s + 1);
+        }
+        else
+        {
+            segTasksAdd(&st, i, n_segs, ((!overlap && rev_seg) ? 4 : 2) * s, 1);
+        }
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, overlap ? 1 : 0, pol_ord, fit_method, 0);
+    double *part = countedMalloc(st.n_tasks * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < st.n_tasks; k++)
+#else
+    for(int k = 0; k < st.n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        if(fit_method == FIT_FAST)
+        {
+            part[k] = dccaSegmentsFlucFast(&pt, N, wins[st.win[k]], overlap, rev_seg, st.lo[k], st.hi[k]);
+        }
+        else if(overlap && (fit_method == FIT_DIRECT))
+        {
+            part[k] = dccaSegmentsFluc(NULL, y1, y2, t, N, wins[st.win[k]], pol_ord, abs_vals, overlap, rev_seg, fit_method, st.lo[k], st.hi[k]);
+        }
+        else
+        {
+            part[k] = dccaSegmentsFluc(fitBasesGet(&fb, st.win[k]), y1, y2, t, N, wins[st.win[k]], pol_ord, abs_vals, overlap, rev_seg, fit_method, st.lo[k], st.hi[k]);
+            fitBasesDone(&fb, st.win[k]);
+        }
+        profileTask(rp, st.win[k], ((!overlap && rev_seg) ? 4 : 2) * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    for(int i = 0; i < n_wins; i++)
+    {
+        f_vec[i] = dccaWindowNorm(segTasksSum(&st, part, 1, i), N, wins[i], abs_vals, overlap, rev_seg);
+    }
+
+    free(part);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
+    }
+}
+
+//main loop for DCCA (computes fluctuations using absolute values)
+void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 1, 1, 0, fit_method, f_vec);
+}
+
+//main loop for DCCA (computes fluctuations without using absolute values)
+void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 0, 1, 0, fit_method, f_vec);
+}
+
+//blocks of consecutive shifts of HT computed as separate tasks, task k covers the shifts of
+//scales[task_scale[k]] from task_start[k] (returns the number of tasks)
+int htTasksAlloc(int N, int *scales, int n_scales, int **task_scale, int **task_start)
+{
+    int n_tasks = 0;
+    for(int i = 0; i < n_scales; i++)
+    {
+        int block = (scales[i] > HT_BLOCK) ? scales[i] : HT_BLOCK;
+        n_tasks += (N - scales[i] + block) / block;
+    }
+
+    *task_scale = countedMalloc(n_tasks * sizeof(int));
+    *task_start = countedMalloc(n_tasks * sizeof(int));
+    n_tasks = 0;
+    for(int i = 0; i < n_scales; i++)
+    {
+        int block = (scales[i] > HT_BLOCK) ? scales[i] : HT_BLOCK;
+        for(int v = 0; v < (N - scales[i] + 1); v += block)
+        {
+            (*task_scale)[n_tasks] = i;
+            (*task_start)[n_tasks] = v;
+            n_tasks++;
+        }
+    }
+
+    return n_tasks;
+}
+
+//main loop for HT (computes fluctuations of each segment of size scales[i] shifted by one point),
+//the fluctuations of scales[i] are stored in the row i of f_vec, of length row_len; the shifts of
+//all the scales are split in blocks of consecutive shifts that are computed in parallel
+void flucHTCompute(double *y, double *t, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    int *task_scale, *task_start;
+    int n_tasks = htTasksAlloc(N, scales, n_scales, &task_scale, &task_start);
+
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y, y, N, pol_ord);
+    }
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#pragma omp parallel for schedule(dynamic)
+    for(k = 0; k < n_tasks; k++)
+#else
+#pragma omp parallel for schedule(dynamic)
+    for(int k = 0; k < n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        int scale = scales[task_scale[k]];
+        int block = (scale > HT_BLOCK) ? scale : HT_BLOCK;
+        int v_start = task_start[k];
+        int v_end = (v_start + block < N - scale + 1) ? v_start + block : N - scale + 1;
+        double *f_row = f_vec + task_scale[k] * row_len;
+
+        if(fit_method == FIT_FAST)
+        {
+            for(int v = v_start; v < v_end; v++)
+            {
+                f_row[v] = sqrt(fmax(segmentCovFast(&pt, v, scale), 0.0) / (double)scale);
+            }
+        }
+        else if(fit_method == FIT_DIRECT)
+        {
+            //running sums are recomputed from scratch every scale shifts to bound round-off drift
+            slidingFit sf;
+            slidingFitAlloc(&sf, scale, pol_ord);
+            double *mom = countedMalloc((pol_ord + 1) * sizeof(double));
+            double *c = countedMalloc((pol_ord + 1) * sizeof(double));
+            double y_ref = 0.0, sq_sum = 0.0;
+            for(int v = v_start; v < v_end; v++)
+            {
+                if((v - v_start) % scale == 0)
+                {
+                    y_ref = y[v];
+                    slidingMomentsInit(&sf, y + v, y_ref, mom);
+                    sq_sum = 0.0;
+                    for(int j = 0; j < scale; j++)
+                    {
+                        sq_sum += (y[v + j] - y_ref) * (y[v + j] - y_ref);
+                    }
+                }
+                else
+                {
+                    double dy_out = y[v - 1] - y_ref;
+                    double dy_in = y[v + scale - 1] - y_ref;
+                    slidingMomentsNext(&sf, y + v - 1, y_ref, mom);
+                    sq_sum += dy_in * dy_in - dy_out * dy_out;
+                }
+                slidingCoeffs(&sf, mom, c);
+
+                double f = sq_sum;
+                for(int j = 0; j <= pol_ord; j++)
+                {
+                    f -= c[j] * mom[j];
+                }
+                f_row[v] = sqrt(fmax(f, 0.0) / (double)scale);
+            }
+
+            free(mom);
+            free(c);
+            slidingFitFree(&sf);
+        }
+        else
+        {
+            fitWorkspace ws;
+            fitWorkspaceAlloc(&ws, fit_method, scale, pol_ord);
+            double *res = countedMalloc(scale * sizeof(double));
+            for(int v = v_start; v < v_end; v++)
+            {
+                double f = 0.0;
+                detrendSegment(&ws, t + v, y + v, res);
+                f += sumSquares(res, scale);
+
+                f_row[v] = sqrt(f / (double)scale);
+            }
+
+            free(res);
+            fitWorkspaceFree(&ws);
+        }
+        profileTask(rp, task_scale[k], v_end - v_start, start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
+    }
+    free(task_scale);
+    free(task_start);
+}
+
+//single precision loops: the time series are stored in single precision and the segments are
+//detrended in single precision with FIT_DIRECT or FIT_ORTHO (see detrendSegmentF), while the
+//sums over the residuals and the fluctuations are computed in double precision
+
+//single precision version of dfaSegmentsFluc
+double dfaSegmentsFlucF(fitWorkspace *basis, float *y, int N, int rev_seg, int v_lo, int v_hi)
+{
+    int curr_win_size = basis->win_size;
+    int N_s = N / curr_win_size;
+    double f = 0.0;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    float *res = countedMalloc(curr_win_size * sizeof(float));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = v * curr_win_size;
+        detrendSegmentF(&ws, y + start_lim, res);
+        f += sumSquaresF(res, curr_win_size);
+
+        if(rev_seg)
+        {
+            start_lim = v * curr_win_size + (N - N_s * curr_win_size);
+            detrendSegmentF(&ws, y + start_lim, res);
+            f += sumSquaresF(res, curr_win_size);
+        }
+    }
+
+    free(res);
+    fitWorkspaceFree(&ws);
+
+    return f;
+}
+
+//single precision version of mfdfaSegmentsVar for MFDFA
+void mfdfaSegmentsVarF(fitWorkspace *basis, float *y, int N, int v_lo, int v_hi, double *var)
+{
+    int curr_win_size = basis->win_size;
+    int N_s = N / curr_win_size;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    float *res = countedMalloc(curr_win_size * sizeof(float));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
+        detrendSegmentF(&ws, y + start_lim, res);
+        var[v] = sumSquaresF(res, curr_win_size) / (double)curr_win_size;
+    }
+
+    free(res);
+    fitWorkspaceFree(&ws);
+}
+
+//single precision version of dccaSegmentsFluc, the overlapping segments are detrended one by one
+double dccaSegmentsFlucF(fitWorkspace *basis, float *y1, float *y2, int N, int curr_win_size, int abs_vals, int overlap, int rev_seg, int v_lo, int v_hi)
+{
+    int N_s = N / curr_win_size;
+    int seg_len = basis->win_size;
+    double f = 0.0;
+    fitWorkspace ws;
+    fitWorkspaceShare(&ws, basis);
+    float *res_1 = countedMalloc(seg_len * sizeof(float));
+    float *res_2 = countedMalloc(seg_len * sizeof(float));
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = overlap ? v : v * curr_win_size;
+        for(int dir = 0; dir < ((!overlap && rev_seg) ? 2 : 1); dir++)
+        {
+            if(dir == 1)
+            {
+                start_lim = v * curr_win_size + (N - N_s * curr_win_size);
+            }
+            detrendSegmentF(&ws, y1 + start_lim, res_1);
+            detrendSegmentF(&ws, y2 + start_lim, res_2);
+
+            f += abs_vals ? sumAbsProductsF(res_1, res_2, seg_len) : sumProductsF(res_1, res_2, seg_len);
+        }
+    }
 
-//main loop for unbiased DFA
-void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, double *f_vec)
+    free(res_1);
+    free(res_2);
+    fitWorkspaceFree(&ws);
+
+    return f;
+}
+
+//single precision main loop for DFA, the segments starting from the end of the array y are added if rev_seg is set
+void flucDFAComputeF(float *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec)
 {
+    profilePhase(PROF_SETUP);
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    for(int i = 0; i < n_wins; i++)
+    {
+        segTasksAdd(&st, i, N / wins[i], (rev_seg ? 2 : 1) * wins[i], 1);
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, 0, pol_ord, fit_method, 1);
+    double *part = countedMalloc(st.n_tasks * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
 #ifdef _WIN64
-    int i = 0;
+    int k = 0;
 #endif
 
-#pragma omp parallel for
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-    for(i = 0; i < num_wins; i++)
+    for(k = 0; k < st.n_tasks; k++)
 #else
-    for(int i = 0; i < num_wins; i++)
+    for(int k = 0; k < st.n_tasks; k++)
 #endif
     {
-        int s = wins_vec[i];
-        int n_wins = y_len - s + 1;
+        double start = profileClock(rp);
+        part[k] = dfaSegmentsFlucF(fitBasesGet(&fb, st.win[k]), y, N, rev_seg, st.lo[k], st.hi[k]);
+        fitBasesDone(&fb, st.win[k]);
+        profileTask(rp, st.win[k], (rev_seg ? 2 : 1) * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
 
-        double *fit_coeffs = malloc((pol + 1) * sizeof(double));
-        double *df = malloc(s * sizeof(double));
+    for(int i = 0; i < n_wins; i++)
+    {
+        f_vec[i] = sqrt(segTasksSum(&st, part, 1, i) / ((rev_seg ? 2.0 : 1.0) * (N / wins[i]) * wins[i]));
+    }
 
-        double f = 0.0;
+    free(part);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+}
+
+//single precision main loop for MFDFA, the segments starting from the end of the array y are added if rev_seg is set
+void flucMFDFAComputeF(float *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    size_t *var_off = countedMalloc((n_wins + 1) * sizeof(size_t));
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    var_off[0] = 0;
+    for(int i = 0; i < n_wins; i++)
+    {
+        int n_segs = (rev_seg ? 2 : 1) * (N / wins[i]);
+        segTasksAdd(&st, i, n_segs, wins[i], 1);
+        var_off[i + 1] = var_off[i] + n_segs;
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, 0, pol_ord, fit_method, 1);
+    double *var = countedMalloc(var_off[n_wins] * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#ifdef _WIN64
+    int k = 0;
+#endif
+
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-        int start = 0;
-        for(start = 0; start < n_wins; start++)
+    for(k = 0; k < st.n_tasks; k++)
 #else
-        for(int start = 0; start < n_wins; start++)
+    for(int k = 0; k < st.n_tasks; k++)
 #endif
-        {
-            polynomialFit(s, pol + 1, t_vec + start, y_vec + start, fit_coeffs);
-            for(int j = 0; j < s; j++)
-            {
-                df[j] = y_vec[start + j];
-                for(int k = 0; k < (pol + 1); k++)
-                {
-                    df[j] -= fit_coeffs[k] * pow(t_vec[start + j], k);
-                }
-            }
-        
-            double df_sum = 0.0, df_2_sum = 0.0, df_even_sum = 0.0, df_odd_sum = 0.0, df_shift_sum = 0.0;
-            for(int j = 0; j < s; j++)
-            {
-                df_sum += df[j];
-                df_2_sum += df[j] * df[j];
-            }
-            for(int j = 0; j < s; j += 2)
-            {
-                df_odd_sum += df[j];
-            }
-            for(int j = 1; j < s; j += 2)
-            {
-                df_even_sum += df[j];
-            }
-            for(int j = 0; j < (s - 1); j++)
-            {
-                df_shift_sum += (df[j] * df[j + 1]);
-            }
-    
-            double df_neg_mean = (df_odd_sum - df_even_sum) / (double)s;
-            double df_neg_var = df_2_sum / (double)s - df_neg_mean * df_neg_mean;
-            double df_pos_mean = df_sum / (double)s;
-            double df_pos_var = df_2_sum / (double)s - df_pos_mean * df_pos_mean;
-        
-            double df_pos_shift = (df_shift_sum + df_pos_mean * (df[0] + df[s - 1] - df_pos_mean * (s + 1))) / df_pos_var;
-            double df_neg_shift = (-df_shift_sum + df_neg_mean * (df[0] + pow(-1.0, s + 1) * df[s - 1] - df_neg_mean * (s + 1))) / df_neg_var;
-            double rho_A = (s + df_pos_shift) / (double)(2 * s - 1);
-            double rho_B = (s + df_neg_shift) / (double)(2 * s - 1);
-        
-            double rho_A_star = rho_A + (1 + 3 * rho_A) / (double)(2 * s);
-            double rho_B_star = rho_B + (1 + 3 * rho_B) / (double)(2 * s);
-            f += ((rho_A_star + rho_B_star) * (1 - 1.0 / (double)(2 * s)) * df_pos_var);
-        }
-        f_vec[i] = sqrt(f * sqrt((s - 1) / (double)s) / (double)(n_wins));
-
-        free(fit_coeffs);
-        free(df);
+    {
+        double start = profileClock(rp);
+        int i = st.win[k];
+        mfdfaSegmentsVarF(fitBasesGet(&fb, i), y, N, st.lo[k], st.hi[k], var + var_off[i]);
+        fitBasesDone(&fb, i);
+        profileTask(rp, i, st.hi[k] - st.lo[k], start);
     }
-}
+    profilePhase(PROF_REDUCE);
 
-//main loop for DFA (computes fluctuations starting from the beginning of the array y)
-void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-{
 #ifdef _WIN64
     int i = 0;
 #endif
 
-#pragma omp parallel for
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
     for(i = 0; i < n_wins; i++)
 #else
     for(int i = 0; i < n_wins; i++)
 #endif
     {
-        int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
-#ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
-#else
-        for(int v = 0; v < N_s; v++)
-#endif
-        {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var = y[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                }
-                f += pow(var, 2.0);
-            }
-    
-            free(fit_coeffs);
-        }
-    
-        f_vec[i] = sqrt(f / (N_s * curr_win_size));
+        qOrderFluc(var + var_off[i], (int)(var_off[i + 1] - var_off[i]), qs, n_q, i, n_wins, f_vec);
     }
+
+    free(var);
+    free(var_off);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
 }
 
-//main loop for DFA (computes fluctuations starting from the beginning of the array y
-//and then computes fluctuations again starting from the end of the array y)
-void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//single precision main loop for DCCA, absolute values are used if abs_vals is set, segments are
+//overlapping if overlap is set, otherwise the segments starting from the end of the arrays y1
+//and y2 are added if rev_seg is set
+void flucDCCAComputeF(float *y1, float *y2, int N, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec)
 {
+    profilePhase(PROF_SETUP);
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    for(int i = 0; i < n_wins; i++)
+    {
+        segTasksAdd(&st, i, dccaWindowSegs(N, wins[i], overlap), ((!overlap && rev_seg) ? 4 : 2) * wins[i], 1);
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, overlap ? 1 : 0, pol_ord, fit_method, 1);
+    double *part = countedMalloc(st.n_tasks * sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
 #ifdef _WIN64
-    int i = 0;
+    int k = 0;
 #endif
 
-#pragma omp parallel for
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
+    for(k = 0; k < st.n_tasks; k++)
 #else
-    for(int i = 0; i < n_wins; i++)
+    for(int k = 0; k < st.n_tasks; k++)
 #endif
     {
-        int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
+        double start = profileClock(rp);
+        part[k] = dccaSegmentsFlucF(fitBasesGet(&fb, st.win[k]), y1, y2, N, wins[st.win[k]], abs_vals, overlap, rev_seg, st.lo[k], st.hi[k]);
+        fitBasesDone(&fb, st.win[k]);
+        profileTask(rp, st.win[k], ((!overlap && rev_seg) ? 4 : 2) * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    for(int i = 0; i < n_wins; i++)
+    {
+        f_vec[i] = dccaWindowNorm(segTasksSum(&st, part, 1, i), N, wins[i], abs_vals, overlap, rev_seg);
+    }
+
+    free(part);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+}
+
+//single precision main loop for HT, each shift of each scale is detrended on its own
+void flucHTComputeF(float *y, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec)
+{
+    profilePhase(PROF_SETUP);
+    int *task_scale, *task_start;
+    int n_tasks = htTasksAlloc(N, scales, n_scales, &task_scale, &task_start);
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
 #ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
+    int k = 0;
+#pragma omp parallel for schedule(dynamic)
+    for(k = 0; k < n_tasks; k++)
 #else
-        for(int v = 0; v < N_s; v++)
+#pragma omp parallel for schedule(dynamic)
+    for(int k = 0; k < n_tasks; k++)
 #endif
-        {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var_1 = y[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_1 -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                }
-                f += pow(var_1, 2.0);
-            }
+    {
+        double start = profileClock(rp);
+        int scale = scales[task_scale[k]];
+        int block = (scale > HT_BLOCK) ? scale : HT_BLOCK;
+        int v_start = task_start[k];
+        int v_end = (v_start + block < N - scale + 1) ? v_start + block : N - scale + 1;
+        double *f_row = f_vec + task_scale[k] * row_len;
 
-            start_lim = v * curr_win_size + (N - N_s * curr_win_size);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var_2 = y[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_2 -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                }
-                f += pow(var_2, 2.0);
-            }
-    
-            free(fit_coeffs);
+        fitWorkspace ws;
+        fitWorkspaceAllocF(&ws, fit_method, scale, pol_ord);
+        float *res = countedMalloc(scale * sizeof(float));
+        for(int v = v_start; v < v_end; v++)
+        {
+            detrendSegmentF(&ws, y + v, res);
+            f_row[v] = sqrt(sumSquaresF(res, scale) / (double)scale);
         }
-    
-        f_vec[i] = sqrt(f / (2.0 * N_s * curr_win_size));
+
+        free(res);
+        fitWorkspaceFree(&ws);
+        profileTask(rp, task_scale[k], v_end - v_start, start);
     }
+    profilePhase(PROF_REDUCE);
+
+    free(task_scale);
+    free(task_start);
 }
 
-//main loop for MFDFA (computes fluctuations starting from the beginning of the array y)
-void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+//main loop for DCCA without overlap (computes fluctuations starting from the beginning
+// of the array y and using absolute values)
+void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
 {
-#ifdef _WIN64
-    int iq = 0;
-#endif
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 1, 0, 0, fit_method, f_vec);
+}
 
-#ifdef _WIN64
-#pragma omp parallel for
-    for(iq = 0; iq < n_q; iq++)
-    {
-        int i = 0;
-        for(i = 0; i < n_wins; i++)
-#else
-#pragma omp parallel for collapse(2)
-    for(int iq = 0; iq < n_q; iq++)
+//main loop for DCCA without overlap (ccomputes fluctuations starting from the beginning of the array y
+//and then computes fluctuations again starting from the end of the arrays y1 and y2, and using absolute values)
+void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 1, 0, 1, fit_method, f_vec);
+}
+
+//main loop for DCCA without overlap (computes fluctuations starting from the beginning
+// of the array y)
+void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 0, 0, 0, fit_method, f_vec);
+}
+
+//main loop for DCCA without overlap (computes fluctuations starting from the beginning of the array y
+//and then computes fluctuations again starting from the end of the arrays y1 and y2)
+void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, t, N, wins, n_wins, pol_ord, 0, 0, 1, fit_method, f_vec);
+}
+
+//sums of the products of the residuals of y1 with y2, y1 with itself and y2 with itself, added to
+//f[0], f[1] and f[2], of the segments from v_lo to v_hi - 1 of size curr_win_size; each segment of y1
+//and y2 is detrended only once; segments are overlapping if overlap is set, otherwise the segments
+//starting from the end of the arrays follow the ones starting from the beginning if rev_seg is set.
+//The segments are detrended with the workspace basis, of size curr_win_size + 1 if overlap is set
+//(not used by FIT_DIRECT on overlapping segments)
+void rhoSegmentsCompute(fitWorkspace *basis, double *y1, double *y2, double *t, int N, int curr_win_size, int pol_ord, int overlap, int fit_method, int v_lo, int v_hi, double *f)
+{
+    double f_xy = 0.0, f_xx = 0.0, f_yy = 0.0;
+
+    if(overlap && (fit_method == FIT_DIRECT))
     {
-        for(int i = 0; i < n_wins; i++)
-#endif
-        {
-            double q = qs[iq];
-            int curr_win_size = wins[i];
-            int N_s = N / curr_win_size;
-            double f = 0.0;
+        int seg_len = curr_win_size + 1;
+        slidingFit sf;
+        slidingFitAlloc(&sf, seg_len, pol_ord);
+        double *mom_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *mom_2 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *c_1 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double *c_2 = countedMalloc((pol_ord + 1) * sizeof(double));
+        double ref_1 = 0.0, ref_2 = 0.0, sq_1 = 0.0, sq_2 = 0.0, cross = 0.0;
 #ifdef _WIN64
-            int v = 0;
-            for(v = 0; v < N_s; v++)
+        int v = 0;
+        for(v = v_lo; v < v_hi; v++)
 #else
-            for(int v = 0; v < N_s; v++)
+        for(int v = v_lo; v < v_hi; v++)
 #endif
+        {
+            if((v - v_lo) % seg_len == 0)
             {
-                double rms = 0.0;
-                int start_lim = v * curr_win_size;
-                double *fit_coeffs = malloc((pol_ord + 1) * sizeof(double));
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-        
-                for(int j = 0; j < curr_win_size; j++)
+                ref_1 = y1[v];
+                ref_2 = y2[v];
+                slidingMomentsInit(&sf, y1 + v, ref_1, mom_1);
+                slidingMomentsInit(&sf, y2 + v, ref_2, mom_2);
+                sq_1 = 0.0;
+                sq_2 = 0.0;
+                cross = 0.0;
+                for(int j = 0; j < seg_len; j++)
                 {
-                    double var = y[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                    }
-                    rms += pow(var, 2.0);
-                }
-        
-                if((q >= LQ) && (q <= HQ))
-                {
-                    f += log(rms / (double)curr_win_size);
+                    double dy_1 = y1[v + j] - ref_1;
+                    double dy_2 = y2[v + j] - ref_2;
+                    sq_1 += dy_1 * dy_1;
+                    sq_2 += dy_2 * dy_2;
+                    cross += dy_1 * dy_2;
                 }
-                else
-                {
-                    f += pow(rms / (double)curr_win_size, 0.5 * q);
-                }
-        
-                free(fit_coeffs);
             }
-    
-            if((q >= LQ) && (q <= HQ))
+            else
+            {
+                double out_1 = y1[v - 1] - ref_1, out_2 = y2[v - 1] - ref_2;
+                double in_1 = y1[v + curr_win_size] - ref_1, in_2 = y2[v + curr_win_size] - ref_2;
+                slidingMomentsNext(&sf, y1 + v - 1, ref_1, mom_1);
+                slidingMomentsNext(&sf, y2 + v - 1, ref_2, mom_2);
+                sq_1 += in_1 * in_1 - out_1 * out_1;
+                sq_2 += in_2 * in_2 - out_2 * out_2;
+                cross += in_1 * in_2 - out_1 * out_2;
+            }
+            slidingCoeffs(&sf, mom_1, c_1);
+            slidingCoeffs(&sf, mom_2, c_2);
+
+            f_xy += cross;
+            f_xx += sq_1;
+            f_yy += sq_2;
+            for(int k = 0; k <= pol_ord; k++)
             {
-                f_vec[iq * n_wins + i] = exp(f / (double)(2 * N_s));
+                f_xy -= c_1[k] * mom_2[k];
+                f_xx -= c_1[k] * mom_1[k];
+                f_yy -= c_2[k] * mom_2[k];
             }
-            else
+        }
+
+        free(mom_1);
+        free(mom_2);
+        free(c_1);
+        free(c_2);
+        slidingFitFree(&sf);
+    }
+    else
+    {
+        int seg_len = overlap ? curr_win_size + 1 : curr_win_size;
+        int N_s = overlap ? N - curr_win_size : N / curr_win_size;
+        fitWorkspace ws;
+        fitWorkspaceShare(&ws, basis);
+        double *res_1 = countedMalloc(seg_len * sizeof(double));
+        double *res_2 = countedMalloc(seg_len * sizeof(double));
+#ifdef _WIN64
+        int v = 0;
+        for(v = v_lo; v < v_hi; v++)
+#else
+        for(int v = v_lo; v < v_hi; v++)
+#endif
+        {
+            int start_lim = v;
+            if(!overlap)
             {
-                f_vec[iq * n_wins + i] = pow(f / (double)N_s, 1 / (double)q);
+                start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
             }
+            detrendSegment(&ws, t + start_lim, y1 + start_lim, res_1);
+            detrendSegment(&ws, t + start_lim, y2 + start_lim, res_2);
+
+            f_xy += sumProducts(res_1, res_2, seg_len);
+            f_xx += sumSquares(res_1, seg_len);
+            f_yy += sumSquares(res_2, seg_len);
         }
+
+        free(res_1);
+        free(res_2);
+        fitWorkspaceFree(&ws);
     }
+
+    f[0] += f_xy;
+    f[1] += f_xx;
+    f[2] += f_yy;
 }
 
-//main loop for MFDFA (computes fluctuations starting from the beginning of the array y
-//and then computes fluctuations again starting from the end of the array y)
-void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+//number of segments of size curr_win_size of the cross-correlation index
+int rhoWindowSegs(int N, int curr_win_size, int overlap, int rev_seg)
+{
+    return overlap ? N - curr_win_size : (rev_seg ? 2 : 1) * (N / curr_win_size);
+}
+
+//cross-correlation index of y1 and y2 for segments of size curr_win_size, each segment
+//of y1 and y2 is detrended only once and the fluctuations of y1 with y2, y1 with itself
+//and y2 with itself are accumulated together; segments are overlapping if overlap is set,
+//otherwise the segments starting from the end of the arrays are added if rev_seg is set (see
+//rhoSegmentsCompute for the workspace basis)
+double rhoWindowCompute(fitWorkspace *basis, double *y1, double *y2, double *t, int N, int curr_win_size, int pol_ord, int overlap, int rev_seg, int fit_method)
+{
+    double f[3] = {0.0, 0.0, 0.0};
+    rhoSegmentsCompute(basis, y1, y2, t, N, curr_win_size, pol_ord, overlap, fit_method, 0, rhoWindowSegs(N, curr_win_size, overlap, rev_seg), f);
+
+    //the normalisations of the three fluctuations cancel out
+    return f[0] / sqrt(f[1] * f[2]);
+}
+
+//same as rhoSegmentsCompute using the cumulative sums of the series (pol_ord <= 2)
+void rhoSegmentsFast(prefixTable *pt, int N, int curr_win_size, int overlap, int v_lo, int v_hi, double *f)
+{
+    double f_xy = 0.0, f_xx = 0.0, f_yy = 0.0;
+    int seg_len = overlap ? curr_win_size + 1 : curr_win_size;
+    int N_s = overlap ? N - curr_win_size : N / curr_win_size;
+
+    for(int v = v_lo; v < v_hi; v++)
+    {
+        int start_lim = v;
+        if(!overlap)
+        {
+            start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
+        }
+        f_xy += segmentCovFast(&pt[0], start_lim, seg_len);
+        f_xx += segmentCovFast(&pt[1], start_lim, seg_len);
+        f_yy += segmentCovFast(&pt[2], start_lim, seg_len);
+    }
+
+    f[0] += f_xy;
+    f[1] += f_xx;
+    f[2] += f_yy;
+}
+
+//same as rhoWindowCompute using the cumulative sums of the series (pol_ord <= 2)
+double rhoWindowFast(prefixTable *pt, int N, int curr_win_size, int overlap, int rev_seg)
+{
+    double f[3] = {0.0, 0.0, 0.0};
+    rhoSegmentsFast(pt, N, curr_win_size, overlap, 0, rhoWindowSegs(N, curr_win_size, overlap, rev_seg), f);
+
+    return f[0] / sqrt(fmax(f[1], 0.0) * fmax(f[2], 0.0));
+}
+
+//main loop for the DCCA cross-correlation index, the segments of each window are split in
+//tasks computed in parallel, each task accumulating its three sums of products of residuals
+void flucDCCARhoCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_vec)
 {
+    profilePhase(PROF_SETUP);
+    prefixTable pt[3];
+    if(fit_method == FIT_FAST)
+    {
+        rhoTablesAlloc(pt, y1, y2, N, pol_ord);
+    }
+
+    segTasks st;
+    segTasksInit(&st, n_wins);
+    for(int i = 0; i < n_wins; i++)
+    {
+        int s = wins[i];
+        int n_segs = rhoWindowSegs(N, s, overlap, rev_seg);
+        if(fit_method == FIT_FAST)
+        {
+            segTasksAdd(&st, i, n_segs, 3 * SEG_FAST_COST, 1);
+        }
+        else if(overlap && (fit_method == FIT_DIRECT))
+        {
+            segTasksAdd(&st, i, n_segs, 3 * SEG_SLIDE_COST, s + 1);
+        }
+        else
+        {
+            segTasksAdd(&st, i, n_segs, 3 * s, 1);
+        }
+    }
+    fitBases fb;
+    fitBasesInit(&fb, &st, wins, n_wins, overlap ? 1 : 0, pol_ord, fit_method, 0);
+    double *part = countedCalloc(3 * (size_t)st.n_tasks, sizeof(double));
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
 #ifdef _WIN64
-    int iq = 0;
+    int k = 0;
 #endif
 
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-#pragma omp parallel for
-    for(iq = 0; iq < n_q; iq++)
-    {
-        int i = 0;
-        for(i = 0; i < n_wins; i++)
+    for(k = 0; k < st.n_tasks; k++)
 #else
-#pragma omp parallel for collapse(2)
-    for(int iq = 0; iq < n_q; iq++)
+    for(int k = 0; k < st.n_tasks; k++)
+#endif
+    {
+        double start = profileClock(rp);
+        if(fit_method == FIT_FAST)
+        {
+            rhoSegmentsFast(pt, N, wins[st.win[k]], overlap, st.lo[k], st.hi[k], part + 3 * k);
+        }
+        else if(overlap && (fit_method == FIT_DIRECT))
+        {
+            rhoSegmentsCompute(NULL, y1, y2, t, N, wins[st.win[k]], pol_ord, overlap, fit_method, st.lo[k], st.hi[k], part + 3 * k);
+        }
+        else
+        {
+            rhoSegmentsCompute(fitBasesGet(&fb, st.win[k]), y1, y2, t, N, wins[st.win[k]], pol_ord, overlap, fit_method, st.lo[k], st.hi[k], part + 3 * k);
+            fitBasesDone(&fb, st.win[k]);
+        }
+        profileTask(rp, st.win[k], 2 * (st.hi[k] - st.lo[k]), start);
+    }
+    profilePhase(PROF_REDUCE);
+
+    for(int i = 0; i < n_wins; i++)
+    {
+        double f_xy = segTasksSum(&st, part, 3, i);
+        double f_xx = segTasksSum(&st, part + 1, 3, i);
+        double f_yy = segTasksSum(&st, part + 2, 3, i);
+        if(fit_method == FIT_FAST)
+        {
+            rho_vec[i] = f_xy / sqrt(fmax(f_xx, 0.0) * fmax(f_yy, 0.0));
+        }
+        else
+        {
+            //the normalisations of the three fluctuations cancel out
+            rho_vec[i] = f_xy / sqrt(f_xx * f_yy);
+        }
+    }
+
+    free(part);
+    fitBasesFree(&fb, n_wins);
+    segTasksFree(&st);
+    if(fit_method == FIT_FAST)
+    {
+        rhoTablesFree(pt);
+    }
+}
+
+//main loop for the confidence levels of the DCCA cross-correlation index, the cross-correlation
+//index of n_sim couples of random walks of length L is computed in parallel over the simulations,
+//the random walks of each simulation are drawn from their own stream of the generator
+void rhoThresholdsCompute(int L, int *wins, int n_wins, int pol_ord, int n_sim, unsigned long long seed, int fit_method, double *rho_all)
+{
+    profilePhase(PROF_SETUP);
+    //the workspaces of the windows are shared by all the simulations
+    fitWorkspace *bases = NULL;
+    if(fit_method != FIT_FAST)
     {
+        bases = countedMalloc(n_wins * sizeof(fitWorkspace));
         for(int i = 0; i < n_wins; i++)
-#endif
         {
-            double q = qs[iq];
-            int curr_win_size = wins[i];
-            int N_s = N / curr_win_size;
-            double f = 0.0;
+            fitWorkspaceAlloc(&bases[i], fit_method, wins[i], pol_ord);
+        }
+    }
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
+#pragma omp parallel
+    {
+        double *ran_1 = countedMalloc(L * sizeof(double));
+        double *ran_2 = countedMalloc(L * sizeof(double));
+        double *t = countedMalloc(L * sizeof(double));
+        for(int j = 0; j < L; j++)
+        {
+            t[j] = (double)j + 1.0;
+        }
 #ifdef _WIN64
-            int v = 0;
-            for(v = 0; v < N_s; v++)
+        int sim = 0;
+#pragma omp for
+        for(sim = 0; sim < n_sim; sim++)
 #else
-            for(int v = 0; v < N_s; v++)
+#pragma omp for
+        for(int sim = 0; sim < n_sim; sim++)
 #endif
+        {
+            rngState rng;
+            rngSeed(&rng, (uint64_t)seed, (uint64_t)sim);
+            rngRandomWalk(&rng, ran_1, L);
+            rngRandomWalk(&rng, ran_2, L);
+
+            if(fit_method == FIT_FAST)
             {
-                double rms1 = 0.0;
-                double rms2 = 0.0;
-                int start_lim = v * curr_win_size;
-                double *fit_coeffs = malloc((pol_ord + 1) * sizeof(double));
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-        
-                for(int j = 0; j < curr_win_size; j++)
-                {
-                    double var_1 = y[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var_1 -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                    }
-                    rms1 += pow(var_1, 2.0);
-                }
-        
-                start_lim = v * curr_win_size + (N - N_s * curr_win_size);
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y + start_lim, fit_coeffs);
-        
-                for(int j = 0; j < curr_win_size; j++)
-                {
-                    double var_2 = y[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var_2 -= fit_coeffs[k] * pow(t[start_lim + j], k);
-                    }
-                    rms2 += pow(var_2, 2.0);
-                }
-        
-                if((q >= LQ) && (q <= HQ))
-                {
-                    f += (log(rms1 / (double)curr_win_size) + log(rms2 / (double)curr_win_size));
-                }
-                else
+                prefixTable pt[3];
+                rhoTablesAlloc(pt, ran_1, ran_2, L, pol_ord);
+                for(int i = 0; i < n_wins; i++)
                 {
-                    f += (pow(rms1 / (double)curr_win_size, 0.5 * q) + pow(rms2 / (double)curr_win_size, 0.5 * q));
+                    double start = profileClock(rp);
+                    rho_all[sim * n_wins + i] = rhoWindowFast(pt, L, wins[i], 0, 0);
+                    profileTask(rp, i, 2 * (L / wins[i]), start);
                 }
-        
-                free(fit_coeffs);
-            }
-        
-            if((q >= LQ) && (q <= HQ))
-            {
-                f_vec[iq * n_wins + i] = exp(f / (double)(4 * N_s));
+                rhoTablesFree(pt);
             }
             else
             {
-                f_vec[iq * n_wins + i] = pow(f / (double)(2 * N_s), 1 / (double)q);
+                for(int i = 0; i < n_wins; i++)
+                {
+                    double start = profileClock(rp);
+                    rho_all[sim * n_wins + i] = rhoWindowCompute(&bases[i], ran_1, ran_2, t, L, wins[i], pol_ord, 0, 0, fit_method);
+                    profileTask(rp, i, 2 * (L / wins[i]), start);
+                }
             }
         }
+
+        free(ran_1);
+        free(ran_2);
+        free(t);
+    }
+    profilePhase(PROF_REDUCE);
+
+    if(fit_method != FIT_FAST)
+    {
+        for(int i = 0; i < n_wins; i++)
+        {
+            fitWorkspaceFree(&bases[i]);
+        }
+        free(bases);
     }
 }
 
-//main loop for DCCA (computes fluctuations using absolute values)
-void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//accumulates in acc[i * k + j], for j >= i, the cross products of the residuals of the k series
+//stored in the rows of res (row stride stride, used columns width); rows are taken in blocks
+//of RHO_MAT_ROWS and columns in tiles of RHO_MAT_TILE so that both blocks stay in cache.
+//To be called from inside a parallel region
+void residualCrossAccumulate(double *res, int k, size_t stride, size_t width, double *acc)
 {
+    int n_blocks = (k + RHO_MAT_ROWS - 1) / RHO_MAT_ROWS;
+    int n_pairs = n_blocks * (n_blocks + 1) / 2;
 #ifdef _WIN64
-    int i = 0;
-#endif
-
-#pragma omp parallel for
-#ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
+    int p = 0;
+#pragma omp for schedule(dynamic)
+    for(p = 0; p < n_pairs; p++)
 #else
-    for(int i = 0; i < n_wins; i++)
+#pragma omp for schedule(dynamic)
+    for(int p = 0; p < n_pairs; p++)
 #endif
     {
-        int curr_win_size = wins[i];
-        int N_s = N - curr_win_size;
-        double f = 0.0;
-#ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
-#else
-        for(int v = 0; v < N_s; v++)
-#endif
+        int ib = 0, jb = p;
+        while(jb >= n_blocks - ib)
         {
-            double *fit_coeffs1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size + 1, pol_ord + 1, t + v, y1 + v, fit_coeffs1);
-            polynomialFit(curr_win_size + 1, pol_ord + 1, t + v, y2 + v, fit_coeffs2);
-    
-            for(int j = 0; j <= curr_win_size; j++)
+            jb -= n_blocks - ib;
+            ib++;
+        }
+        jb += ib;
+        int i_end = (ib + 1) * RHO_MAT_ROWS < k ? (ib + 1) * RHO_MAT_ROWS : k;
+        int j_end = (jb + 1) * RHO_MAT_ROWS < k ? (jb + 1) * RHO_MAT_ROWS : k;
+
+        for(size_t c_start = 0; c_start < width; c_start += RHO_MAT_TILE)
+        {
+            size_t c_end = (c_start + RHO_MAT_TILE < width) ? c_start + RHO_MAT_TILE : width;
+            for(int i = ib * RHO_MAT_ROWS; i < i_end; i++)
             {
-                double var_1 = y1[v + j];
-                double var_2 = y2[v + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
+                double *res_i = res + (size_t)i * stride;
+                for(int j = (ib == jb) ? i : jb * RHO_MAT_ROWS; j < j_end; j++)
                 {
-                    var_1 -= fit_coeffs1[k] * pow(t[v + j], k);
-                    var_2 -= fit_coeffs2[k] * pow(t[v + j], k);
+                    double *res_j = res + (size_t)j * stride;
+                    acc[(size_t)i * k + j] += sumProducts(res_i + c_start, res_j + c_start, (int)(c_end - c_start));
                 }
-                f += fabs(var_1 * var_2);
             }
-    
-            free(fit_coeffs1);
-            free(fit_coeffs2);
         }
-
-        f_vec[i] = sqrt(f / (N_s * (curr_win_size - 1)));
     }
 }
 
-//main loop for DCCA (computes fluctuations without using absolute values)
-void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//DCCA cross-correlation index of all the couples of the k series of length N stored in the rows
+//of y; the segments of each series are detrended once, in chunks whose residuals take at most
+//about RHO_MAT_BUF doubles, and rho_mat is filled with one k x k matrix for each window
+void rhoMatrixCompute(double *y, int k, int N, double *t, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_mat)
 {
-#ifdef _WIN64
-    int i = 0;
-#endif
+    double *acc = countedMalloc((size_t)k * k * sizeof(double));
 
-#pragma omp parallel for
-#ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
-#else
     for(int i = 0; i < n_wins; i++)
-#endif
     {
         int curr_win_size = wins[i];
-        int N_s = N - curr_win_size;
-        double f = 0.0;
+        int seg_len = overlap ? curr_win_size + 1 : curr_win_size;
+        int N_s = overlap ? N - curr_win_size : N / curr_win_size;
+        int n_segs = (!overlap && rev_seg) ? 2 * N_s : N_s;
+        int chunk = (int)(RHO_MAT_BUF / ((size_t)k * seg_len));
+        chunk = (chunk < 1) ? 1 : chunk;
+        chunk = (chunk > n_segs) ? n_segs : chunk;
+        size_t stride = (size_t)chunk * seg_len;
+        double *res = countedMalloc((size_t)k * stride * sizeof(double));
+        double *rho_win = rho_mat + (size_t)i * k * k;
+
+        for(size_t j = 0; j < (size_t)k * k; j++)
+        {
+            acc[j] = 0.0;
+        }
+
+#pragma omp parallel
+        {
+            fitWorkspace ws;
+            fitWorkspaceAlloc(&ws, fit_method, seg_len, pol_ord);
+
+            for(int v_start = 0; v_start < n_segs; v_start += chunk)
+            {
+                int n_v = (n_segs - v_start < chunk) ? n_segs - v_start : chunk;
 #ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
+                int task = 0;
+#pragma omp for
+                for(task = 0; task < k * n_v; task++)
 #else
-        for(int v = 0; v < N_s; v++)
+#pragma omp for
+                for(int task = 0; task < k * n_v; task++)
+#endif
+                {
+                    int ser = task / n_v;
+                    int v = v_start + task % n_v;
+                    int start_lim = v;
+                    if(!overlap)
+                    {
+                        start_lim = (v < N_s) ? v * curr_win_size : (v - N_s) * curr_win_size + (N - N_s * curr_win_size);
+                    }
+                    detrendSegment(&ws, t + start_lim, y + (size_t)ser * N + start_lim, res + (size_t)ser * stride + (size_t)(task % n_v) * seg_len);
+                }
+
+                residualCrossAccumulate(res, k, stride, (size_t)n_v * seg_len, acc);
+            }
+
+            fitWorkspaceFree(&ws);
+
+            //the normalisations of the fluctuations cancel out
+#ifdef _WIN64
+            int i_1 = 0;
+#pragma omp for
+            for(i_1 = 0; i_1 < k; i_1++)
+#else
+#pragma omp for
+            for(int i_1 = 0; i_1 < k; i_1++)
 #endif
-        {
-            double *fit_coeffs1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size + 1, pol_ord + 1, t + v, y1 + v, fit_coeffs1);
-            polynomialFit(curr_win_size + 1, pol_ord + 1, t + v, y2 + v, fit_coeffs2);
-    
-            for(int j = 0; j <= curr_win_size; j++)
             {
-                double var_1 = y1[v + j];
-                double var_2 = y2[v + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
+                for(int i_2 = i_1; i_2 < k; i_2++)
                 {
-                    var_1 -= fit_coeffs1[k] * pow(t[v + j], k);
-                    var_2 -= fit_coeffs2[k] * pow(t[v + j], k);
+                    double rho = acc[(size_t)i_1 * k + i_2] / sqrt(acc[(size_t)i_1 * k + i_1] * acc[(size_t)i_2 * k + i_2]);
+                    rho_win[(size_t)i_1 * k + i_2] = rho;
+                    rho_win[(size_t)i_2 * k + i_1] = rho;
                 }
-                f += var_1 * var_2;
             }
-    
-            free(fit_coeffs1);
-            free(fit_coeffs2);
         }
 
-        f_vec[i] = f / (N_s * (curr_win_size - 1));
+        free(res);
     }
+
+    free(acc);
 }
 
-//main loop for HT (computes fluctuations)
-double HTCompute(double *y, double *t, int scale, int N, int pol_ord, int v)
+//main loop for MFDCCA (computes fluctuations starting from the beginning of the array y)
+void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
 {
-    double f = 0.0;
-    double *fit_coeffs = malloc((pol_ord + 1) * sizeof(double));
-    polynomialFit(scale, pol_ord + 1, t + v, y + v, fit_coeffs);
+    flucMFTasksCompute(y1, y2, t, N, wins, n_wins, qs, n_q, pol_ord, 0, fit_method, f_vec);
+}
 
-    for(int j = 0; j < scale; j++)
-    {
-        double var = y[v + j];
-        for(int k = 0; k < (pol_ord + 1); k++)
-        {
-            var -= fit_coeffs[k] * pow(t[v + j], k);
-        }
-        f += pow(var, 2.0);
-    }
+//main loop for MFDCCA (computes fluctuations starting from the beginning of the array y
+//and then computes fluctuations again starting from the end of the array y)
+void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+{
+    flucMFTasksCompute(y1, y2, t, N, wins, n_wins, qs, n_q, pol_ord, 1, fit_method, f_vec);
+}
 
-    f = sqrt(f / (double)scale);
+//main loop for DFA using cumulative sums (pol_ord <= 2), the fluctuations of the
+//segments starting from the end of the array y are added if rev_seg is set
+void flucDFAFastCompute(double *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, double *f_vec)
+{
+    flucDFATasksCompute(y, NULL, N, wins, n_wins, pol_ord, rev_seg, FIT_FAST, f_vec);
+}
 
-    free(fit_coeffs);
+//main loop for MFDFA using cumulative sums (pol_ord <= 2), the fluctuations of the
+//segments starting from the end of the array y are added if rev_seg is set
+void flucMFDFAFastCompute(double *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, double *f_vec)
+{
+    flucMFTasksCompute(y, y, NULL, N, wins, n_wins, qs, n_q, pol_ord, rev_seg, FIT_FAST, f_vec);
+}
 
-    return f;
+//main loop for DCCA using cumulative sums (pol_ord <= 2, no absolute values), segments
+//are overlapping if overlap is set, otherwise the fluctuations of the segments
+//starting from the end of the arrays y1 and y2 are added if rev_seg is set
+void flucDCCAFastCompute(double *y1, double *y2, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, double *f_vec)
+{
+    flucDCCATasksCompute(y1, y2, NULL, N, wins, n_wins, pol_ord, 0, overlap, rev_seg, FIT_FAST, f_vec);
 }
 
-//main loop for DCCA without overlap (computes fluctuations starting from the beginning
-// of the array y and using absolute values)
-void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//update of the sums of the squared residuals f_sum of a DFA computed on a growing series:
+//y[0:N] holds the last samples of the series, t their abscissa, and n_new[i] new segments of
+//window i start at y + starts[i]; segments are summed in the same order of flucDFAForwCompute
+void flucDFAStreamUpdate(double *y, double *t, int N, int *starts, int *n_new, int *wins, int n_wins, int pol_ord, int fit_method, double *f_sum)
 {
+    profilePhase(PROF_SETUP);
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y, y, N, pol_ord);
+    }
+    profilePhase(PROF_SEGMENTS);
+    runProfile *rp = profileCurrent();
+
 #ifdef _WIN64
     int i = 0;
 #endif
 
-#pragma omp parallel for
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
     for(i = 0; i < n_wins; i++)
 #else
     for(int i = 0; i < n_wins; i++)
 #endif
     {
-        int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
-#ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
-#else
-        for(int v = 0; v < N_s; v++)
-#endif
+        double start = profileClock(rp);
+        double f = f_sum[i];
+        if(fit_method == FIT_FAST)
         {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
+            for(int v = 0; v < n_new[i]; v++)
             {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                }
-                f += fabs(var_1 * var_2);
+                f += segmentCovFast(&pt, starts[i] + v * wins[i], wins[i]);
+            }
+        }
+        else if(n_new[i] > 0)
+        {
+            fitWorkspace ws;
+            fitWorkspaceAlloc(&ws, fit_method, wins[i], pol_ord);
+            double *res = countedMalloc(wins[i] * sizeof(double));
+            for(int v = 0; v < n_new[i]; v++)
+            {
+                int start_lim = starts[i] + v * wins[i];
+                detrendSegment(&ws, t + start_lim, y + start_lim, res);
+                f += sumSquares(res, wins[i]);
             }
-    
-            free(fit_coeffs_1);
-            free(fit_coeffs_2);
+            free(res);
+            fitWorkspaceFree(&ws);
         }
+        f_sum[i] = f;
+        profileTask(rp, i, n_new[i], start);
+    }
+    profilePhase(PROF_REDUCE);
 
-        f_vec[i] = sqrt(f / (N_s * curr_win_size));
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
     }
 }
 
-//main loop for DCCA without overlap (ccomputes fluctuations starting from the beginning of the array y
-//and then computes fluctuations again starting from the end of the arrays y1 and y2, and using absolute values)
-void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//greatest common divisor
+int gcdInt(int a, int b)
 {
-#ifdef _WIN64
-    int i = 0;
-#endif
+    while(b != 0)
+    {
+        int r = a % b;
+        a = b;
+        b = r;
+    }
+
+    return a;
+}
+
+//DFA of the sub-series y[k * step:k * step + win_len] for k < n_pos, the fluctuations of position k
+//are stored in the row k of f_vec. The segments of a window of size s shared by different positions
+//are detrended once: all their starts are multiples of gcd(step, s) (plus the offset of the backward
+//segments), so the sums of the squared residuals are stored on that grid, and only the needed ones
+//are computed. Every segment is fitted on the abscissa 1, ..., s; the direct method computes the
+//whole grid with fits updated point by point, whose cost does not depend on s
+void flucDFARollingCompute(double *y, int N, int win_len, int step, int n_pos, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+{
+    int max_win = wins[n_wins - 1];
+    double *t = countedMalloc(max_win * sizeof(double));
+    for(int j = 0; j < max_win; j++)
+    {
+        t[j] = (double)j + 1.0;
+    }
+    prefixTable pt;
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableAlloc(&pt, y, y, N, pol_ord);
+    }
 
-#pragma omp parallel for
-#ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
-#else
     for(int i = 0; i < n_wins; i++)
-#endif
     {
         int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
-#ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
-#else
-        for(int v = 0; v < N_s; v++)
-#endif
+        int N_s = win_len / curr_win_size;
+        int g = gcdInt(step, curr_win_size);
+        int n_slots = ((n_pos - 1) * step + (N_s - 1) * curr_win_size) / g + 1;
+        char *needed = countedMalloc(n_slots * sizeof(char));
+        double *rss = countedMalloc(n_slots * sizeof(double));
+
+        for(int pass = 0; pass < (rev_seg ? 2 : 1); pass++)
         {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
+            int offset = pass ? win_len - N_s * curr_win_size : 0;
+            for(int slot = 0; slot < n_slots; slot++)
             {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                }
-                f += fabs(var_1 * var_2);
+                needed[slot] = 0;
             }
-    
-            start_lim = v * curr_win_size + (N - N_s * curr_win_size);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
+            for(int k = 0; k < n_pos; k++)
+            {
+                for(int v = 0; v < N_s; v++)
                 {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
+                    needed[(k * step + v * curr_win_size) / g] = 1;
                 }
-                f += fabs(var_1 * var_2);
             }
-    
-            free(fit_coeffs_1);
-            free(fit_coeffs_2);
-        }
-
-        f_vec[i] = sqrt(f / (2.0 * N_s * curr_win_size));
-    }
-}
 
-//main loop for DCCA without overlap (computes fluctuations starting from the beginning
-// of the array y)
-void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-{
+#pragma omp parallel
+            {
+                if(fit_method == FIT_DIRECT)
+                {
+                    //the grid is covered by chunks of curr_win_size starts, each one
+                    //beginning with fresh running sums to bound round-off drift
+                    int n_chunks = ((n_slots - 1) * g + curr_win_size) / curr_win_size;
+                    slidingFit sf;
+                    slidingFitAlloc(&sf, curr_win_size, pol_ord);
+                    double *mom = countedMalloc((pol_ord + 1) * sizeof(double));
+                    double *c = countedMalloc((pol_ord + 1) * sizeof(double));
 #ifdef _WIN64
-    int i = 0;
+                    int chunk = 0;
+#pragma omp for schedule(dynamic, 16)
+                    for(chunk = 0; chunk < n_chunks; chunk++)
+#else
+#pragma omp for schedule(dynamic, 16)
+                    for(int chunk = 0; chunk < n_chunks; chunk++)
 #endif
+                    {
+                        int first = chunk * curr_win_size;
+                        int last = (first + curr_win_size < (n_slots - 1) * g + 1) ? first + curr_win_size : (n_slots - 1) * g + 1;
+                        double *y_chunk = y + offset + first;
+                        double y_ref = y_chunk[0], sq_sum = 0.0;
+                        slidingMomentsInit(&sf, y_chunk, y_ref, mom);
+                        for(int j = 0; j < curr_win_size; j++)
+                        {
+                            sq_sum += (y_chunk[j] - y_ref) * (y_chunk[j] - y_ref);
+                        }
+                        for(int start = first; start < last; start++)
+                        {
+                            if(start > first)
+                            {
+                                double dy_out = y[offset + start - 1] - y_ref;
+                                double dy_in = y[offset + start + curr_win_size - 1] - y_ref;
+                                slidingMomentsNext(&sf, y + offset + start - 1, y_ref, mom);
+                                sq_sum += dy_in * dy_in - dy_out * dy_out;
+                            }
+                            if((start % g == 0) && needed[start / g])
+                            {
+                                double f = sq_sum;
+                                slidingCoeffs(&sf, mom, c);
+                                for(int m = 0; m <= pol_ord; m++)
+                                {
+                                    f -= c[m] * mom[m];
+                                }
+                                rss[start / g] = f;
+                            }
+                        }
+                    }
 
-#pragma omp parallel for
+                    free(mom);
+                    free(c);
+                    slidingFitFree(&sf);
+                }
+                else
+                {
+                    fitWorkspace ws;
+                    double *res = NULL;
+                    if(fit_method != FIT_FAST)
+                    {
+                        fitWorkspaceAlloc(&ws, fit_method, curr_win_size, pol_ord);
+                        res = countedMalloc(curr_win_size * sizeof(double));
+                    }
 #ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
+                    int slot = 0;
+#pragma omp for schedule(dynamic, 64)
+                    for(slot = 0; slot < n_slots; slot++)
 #else
-    for(int i = 0; i < n_wins; i++)
+#pragma omp for schedule(dynamic, 64)
+                    for(int slot = 0; slot < n_slots; slot++)
 #endif
-    {
-        int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
+                    {
+                        if(!needed[slot])
+                        {
+                            continue;
+                        }
+                        int start_lim = offset + slot * g;
+                        if(fit_method == FIT_FAST)
+                        {
+                            rss[slot] = segmentCovFast(&pt, start_lim, curr_win_size);
+                        }
+                        else
+                        {
+                            double f = 0.0;
+                            detrendSegment(&ws, t, y + start_lim, res);
+                            f += sumSquares(res, curr_win_size);
+                            rss[slot] = f;
+                        }
+                    }
+
+                    if(fit_method != FIT_FAST)
+                    {
+                        free(res);
+                        fitWorkspaceFree(&ws);
+                    }
+                }
+
 #ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
+                int k = 0;
+#pragma omp for
+                for(k = 0; k < n_pos; k++)
 #else
-        for(int v = 0; v < N_s; v++)
+#pragma omp for
+                for(int k = 0; k < n_pos; k++)
 #endif
-        {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
                 {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
+                    double f = pass ? f_vec[k * n_wins + i] : 0.0;
+                    for(int v = 0; v < N_s; v++)
+                    {
+                        f += rss[(k * step + v * curr_win_size) / g];
+                    }
+                    f_vec[k * n_wins + i] = f;
                 }
-                f += var_1 * var_2;
             }
-    
-            free(fit_coeffs_1);
-            free(fit_coeffs_2);
         }
 
-        f_vec[i] = f / (N_s * curr_win_size);
+        for(int k = 0; k < n_pos; k++)
+        {
+            f_vec[k * n_wins + i] = sqrt(f_vec[k * n_wins + i] / ((rev_seg ? 2.0 : 1.0) * N_s * curr_win_size));
+        }
+
+        free(needed);
+        free(rss);
     }
+
+    if(fit_method == FIT_FAST)
+    {
+        prefixTableFree(&pt);
+    }
+    free(t);
 }
 
-//main loop for DCCA without overlap (computes fluctuations starting from the beginning of the array y
-//and then computes fluctuations again starting from the end of the arrays y1 and y2)
-void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+//main loop for DFA on a batch of series, the series k is y[offsets[k]:offsets[k] + lens[k]]
+//and its fluctuations are stored in the row k of f_vec; all the couples of series and windows
+//are computed in the same parallel loop (the fast method runs in parallel over the series)
+void flucDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int rev_seg, int unbiased, int fit_method, double *f_vec)
 {
 #ifdef _WIN64
-    int i = 0;
+    int k = 0;
 #endif
 
-#pragma omp parallel for
-#ifdef _WIN64
-    for(i = 0; i < n_wins; i++)
-#else
-    for(int i = 0; i < n_wins; i++)
-#endif
+    if(fit_method == FIT_FAST)
     {
-        int curr_win_size = wins[i];
-        int N_s = N / curr_win_size;
-        double f = 0.0;
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-        int v = 0;
-        for(v = 0; v < N_s; v++)
+        for(k = 0; k < n_series; k++)
 #else
-        for(int v = 0; v < N_s; v++)
+        for(int k = 0; k < n_series; k++)
 #endif
         {
-            int start_lim = v * curr_win_size;
-            double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-            double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
+            prefixTable pt;
+            prefixTableAlloc(&pt, y + offsets[k], y + offsets[k], lens[k], pol_ord);
+            for(int i = 0; i < n_wins; i++)
             {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                }
-                f += var_1 * var_2;
-            }
-    
-            start_lim = v * curr_win_size + (N - N_s * curr_win_size);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-            polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-    
-            for(int j = 0; j < curr_win_size; j++)
-            {
-                double var_1 = y1[start_lim + j];
-                double var_2 = y2[start_lim + j];
-                for(int k = 0; k < (pol_ord + 1); k++)
-                {
-                    var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                    var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                }
-                f += var_1 * var_2;
+                f_vec[k * n_wins + i] = dfaWindowFlucFast(&pt, lens[k], wins[i], rev_seg);
             }
-    
-            free(fit_coeffs_1);
-            free(fit_coeffs_2);
+            prefixTableFree(&pt);
         }
 
-        f_vec[i] = f / (2.0 * N_s * curr_win_size);
+        return;
+    }
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < n_series * n_wins; k++)
+#else
+    for(int k = 0; k < n_series * n_wins; k++)
+#endif
+    {
+        int ser = k / n_wins;
+        int i = k % n_wins;
+        if(unbiased)
+        {
+            f_vec[k] = udfaWindowFluc(y + offsets[ser], t, lens[ser], wins[i], pol_ord, fit_method);
+        }
+        else
+        {
+            f_vec[k] = dfaWindowFluc(y + offsets[ser], t, lens[ser], wins[i], pol_ord, rev_seg, fit_method);
+        }
     }
 }
 
-//main loop for MFDCCA (computes fluctuations starting from the beginning of the array y)
-void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+//main loop for MFDFA on a batch of series (see flucDFABatchCompute), the fluctuations of
+//the series k are stored in the block k of f_vec, with n_q rows and n_wins columns
+void flucMFDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec)
 {
 #ifdef _WIN64
-    int iq = 0;
+    int k = 0;
 #endif
 
-#ifdef _WIN64
-#pragma omp parallel for
-    for(iq = 0; iq < n_q; iq++)
+    if(fit_method == FIT_FAST)
     {
-        int i = 0;
-        for(i = 0; i < n_wins; i++)
-#else
-#pragma omp parallel for collapse(2)
-    for(int iq = 0; iq < n_q; iq++)
-    {
-        for(int i = 0; i < n_wins; i++)
-#endif
-        {
-            double q = qs[iq];
-            int curr_win_size = wins[i];
-            int N_s = N / curr_win_size;
-            double f = 0.0;
+#pragma omp parallel for schedule(dynamic)
 #ifdef _WIN64
-            int v = 0;
-            for(v = 0; v < N_s; v++)
+        for(k = 0; k < n_series; k++)
 #else
-            for(int v = 0; v < N_s; v++)
+        for(int k = 0; k < n_series; k++)
 #endif
+        {
+            prefixTable pt;
+            prefixTableAlloc(&pt, y + offsets[k], y + offsets[k], lens[k], pol_ord);
+            for(int i = 0; i < n_wins; i++)
             {
-                double rms = 0.0;
-                int start_lim = v * curr_win_size;
-                double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-                double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-        
-                for(int j = 0; j < curr_win_size; j++)
-                {
-                    double var_1 = y1[start_lim + j];
-                    double var_2 = y2[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                        var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                    }
-                    rms += fabs(var_1 * var_2);
-                }
-        
-                if((q >= LQ) && (q <= HQ))
-                {
-                    f += log(rms / (double)curr_win_size);
-                }
-                else
-                {
-                    f += pow(rms / (double)curr_win_size, 0.5 * q);
-                }
-        
-                free(fit_coeffs_1);
-                free(fit_coeffs_2);
-            }
-        
-            if((q >= LQ) && (q <= HQ))
-            {
-                f_vec[iq * n_wins + i] = exp(f / (double)(2 * N_s));
-            }
-            else
-            {
-                f_vec[iq * n_wins + i] = pow(f / (double)N_s, 1 / (double)q);
+                double *var = countedMalloc((rev_seg ? 2 : 1) * (lens[k] / wins[i]) * sizeof(double));
+                int n_segs = mfdfaWindowVarFast(&pt, lens[k], wins[i], rev_seg, var);
+                qOrderFluc(var, n_segs, qs, n_q, i, n_wins, f_vec + k * n_q * n_wins);
+                free(var);
             }
+            prefixTableFree(&pt);
         }
+
+        return;
+    }
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < n_series * n_wins; k++)
+#else
+    for(int k = 0; k < n_series * n_wins; k++)
+#endif
+    {
+        int ser = k / n_wins;
+        int i = k % n_wins;
+        double *y_ser = y + offsets[ser];
+        double *var = countedMalloc((rev_seg ? 2 : 1) * (lens[ser] / wins[i]) * sizeof(double));
+        int n_segs = mfdfaWindowVar(y_ser, y_ser, t, lens[ser], wins[i], pol_ord, rev_seg, fit_method, var);
+        qOrderFluc(var, n_segs, qs, n_q, i, n_wins, f_vec + ser * n_q * n_wins);
+        free(var);
     }
 }
 
-//main loop for MFDCCA (computes fluctuations starting from the beginning of the array y
-//and then computes fluctuations again starting from the end of the array y)
-void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+//main loop for DCCA on a batch of couples of series (see flucDFABatchCompute), the series of
+//the couple k have the same offset and length in y1 and y2
+void flucDCCABatchCompute(double *y1, double *y2, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec)
 {
 #ifdef _WIN64
-    int iq = 0;
+    int k = 0;
 #endif
 
-#ifdef _WIN64
-#pragma omp parallel for
-    for(iq = 0; iq < n_q; iq++)
+    if(fit_method == FIT_FAST)
     {
-        int i = 0;
-        for(i = 0; i < n_wins; i++)
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+        for(k = 0; k < n_series; k++)
 #else
-#pragma omp parallel for collapse(2)
-    for(int iq = 0; iq < n_q; iq++)
-    {
-        for(int i = 0; i < n_wins; i++)
+        for(int k = 0; k < n_series; k++)
 #endif
         {
-            double q = qs[iq];
-            int curr_win_size = wins[i];
-            int N_s = N / curr_win_size;
-            double f = 0.0;
-#ifdef _WIN64
-            int v = 0;
-            for(v = 0; v < N_s; v++)
-#else
-            for(int v = 0; v < N_s; v++)
-#endif
-            {
-                double rms1 = 0.0;
-                double rms2 = 0.0;
-                int start_lim = v * curr_win_size;
-                double *fit_coeffs_1 = malloc((pol_ord + 1) * sizeof(double));
-                double *fit_coeffs_2 = malloc((pol_ord + 1) * sizeof(double));
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-        
-                for(int j = 0; j < curr_win_size; j++)
-                {
-                    double var_1 = y1[start_lim + j];
-                    double var_2 = y2[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                        var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                    }
-                    rms1 += fabs(var_1 * var_2);
-                }
-        
-                start_lim = v * curr_win_size + (N - N_s * curr_win_size);
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y1 + start_lim, fit_coeffs_1);
-                polynomialFit(curr_win_size, pol_ord + 1, t + start_lim, y2 + start_lim, fit_coeffs_2);
-        
-                for(int j = 0; j < curr_win_size; j++)
-                {
-                    double var_1 = y1[start_lim + j];
-                    double var_2 = y2[start_lim + j];
-                    for(int k = 0; k < (pol_ord + 1); k++)
-                    {
-                        var_1 -= fit_coeffs_1[k] * pow(t[start_lim + j], k);
-                        var_2 -= fit_coeffs_2[k] * pow(t[start_lim + j], k);
-                    }
-                    rms2 += fabs(var_1 * var_2);
-                }
-        
-                if((q >= LQ) && (q <= HQ))
-                {
-                    f += (log(rms1 / (double)curr_win_size) + log(rms2 / (double)curr_win_size));
-                }
-                else
-                {
-                    f += (pow(rms1 / (double)curr_win_size, 0.5 * q) + pow(rms2 / (double)curr_win_size, 0.5 * q));
-                }
-        
-                free(fit_coeffs_1);
-                free(fit_coeffs_2);
-            }
-        
-            if((q >= LQ) && (q <= HQ))
+            prefixTable pt;
+            prefixTableAlloc(&pt, y1 + offsets[k], y2 + offsets[k], lens[k], pol_ord);
+            for(int i = 0; i < n_wins; i++)
             {
-                f_vec[iq * n_wins + i] = exp(f / (double)(4 * N_s));
-            }
-            else
-            {
-                f_vec[iq * n_wins + i] = pow(f / (double)(2 * N_s), 1 / (double)q);
+                f_vec[k * n_wins + i] = dccaWindowFlucFast(&pt, lens[k], wins[i], overlap, rev_seg);
             }
+            prefixTableFree(&pt);
         }
+
+        return;
+    }
+
+#pragma omp parallel for schedule(dynamic)
+#ifdef _WIN64
+    for(k = 0; k < n_series * n_wins; k++)
+#else
+    for(int k = 0; k < n_series * n_wins; k++)
+#endif
+    {
+        int ser = k / n_wins;
+        int i = k % n_wins;
+        f_vec[k] = dccaWindowFluc(y1 + offsets[ser], y2 + offsets[ser], t, lens[ser], wins[i], pol_ord, abs_vals, overlap, rev_seg, fit_method);
+    }
+}
+
+//sets the number of threads of the next parallel regions started by the calling thread,
+//if n_threads is positive, and returns the previous number
+int setNumThreads(int n_threads)
+{
+    int prev = omp_get_max_threads();
+    if(n_threads > 0)
+    {
+        omp_set_num_threads(n_threads);
     }
+
+    return prev;
 }
@@ -14,18 +14,51 @@
 //    You should have received a copy of the GNU General Public License
 //    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+#include <stddef.h>
 
-extern void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, double *f_vec);
-extern void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec);
-extern void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec);
-extern void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern double HTCompute(double *y, double *t, int scale, int N, int pol_ord, int v);
-extern void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec);
-extern void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec);
-extern void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec);
+#define FIT_GSL 0
+#define FIT_DIRECT 1
+#define FIT_FAST 2
+#define FIT_ORTHO 3
+
+#define PROF_INPUT 0
+#define PROF_SETUP 1
+#define PROF_SEGMENTS 2
+#define PROF_REDUCE 3
+#define PROF_N_PHASES 4
+
+extern void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, int fit_method, double *f_vec);
+extern void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec);
+extern void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucHTCompute(double *y, double *t, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec);
+extern void flucDFAComputeF(float *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec);
+extern void flucMFDFAComputeF(float *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec);
+extern void flucDCCAComputeF(float *y1, float *y2, int N, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec);
+extern void flucHTComputeF(float *y, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec);
+extern void flucDCCARhoCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_vec);
+extern void rhoThresholdsCompute(int L, int *wins, int n_wins, int pol_ord, int n_sim, unsigned long long seed, int fit_method, double *rho_all);
+extern void rhoMatrixCompute(double *y, int k, int N, double *t, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_mat);
+extern void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec);
+extern void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec);
+extern void flucDFAFastCompute(double *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, double *f_vec);
+extern void flucMFDFAFastCompute(double *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, double *f_vec);
+extern void flucDCCAFastCompute(double *y1, double *y2, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, double *f_vec);
+extern void flucDFAStreamUpdate(double *y, double *t, int N, int *starts, int *n_new, int *wins, int n_wins, int pol_ord, int fit_method, double *f_sum);
+extern void flucDFARollingCompute(double *y, int N, int win_len, int step, int n_pos, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec);
+extern void flucDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int rev_seg, int unbiased, int fit_method, double *f_vec);
+extern void flucMFDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec);
+extern void flucDCCABatchCompute(double *y1, double *y2, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec);
+extern int setNumThreads(int n_threads);
+extern int simdLevel(void);
+extern int simdSelfTest(int level);
+extern int profileStart(int n_wins);
+extern void profileStop(double *phases, long long *counts, double *thread_busy, double *win_cost);
+extern void countBytes(size_t n_bytes);
@@ -21,16 +21,33 @@ cimport numpy as np
 cimport cython
 from cython.parallel import prange
 import ctypes
-import pickle
 import warnings
+from . import fathonUtils as fu
 
 cdef extern from "cLoops.h" nogil:
-    void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
+    void flucDCCAAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCANoAbsCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCAForwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCAForwBackwAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCAForwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCAForwBackwNoAbsComputeNoOverlap(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDCCARhoCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_vec)
+    void rhoThresholdsCompute(int L, int *wins, int n_wins, int pol_ord, int n_sim, unsigned long long seed, int fit_method, double *rho_all)
+    void rhoMatrixCompute(double *y, int k, int N, double *t, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, int fit_method, double *rho_mat)
+    void flucDCCAFastCompute(double *y1, double *y2, int N, int *wins, int n_wins, int pol_ord, int overlap, int rev_seg, double *f_vec)
+    void flucDCCABatchCompute(double *y1, double *y2, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec)
+    void flucDCCAComputeF(float *y1, float *y2, int N, int *wins, int n_wins, int pol_ord, int abs_vals, int overlap, int rev_seg, int fit_method, double *f_vec)
+    int setNumThreads(int n_threads)
+    void countBytes(size_t n_bytes)
+    enum: FIT_FAST
+    enum: FIT_DIRECT
+
+include "profile.pxi"
+
+# confidence levels of rho only depend on the parameters of the simulations,
+# so they are kept for seeded calls of `DCCA.rhoThresholds`
+_rhoThrCache = {}
+_RHO_THR_CACHE_SIZE = 32
 
 cdef class DCCA:
     """Detrended Cross-Correlation Analysis class.
@@ -43,6 +60,22 @@ cdef class DCCA:
         First time series used for the analysis.
     tsVec2 : iterable
         Second time series used for the analysis.
+    nanPolicy : str, optional
+        Handling of NaNs in the input, 'omit' removes them, 'raise' raises an
+        error, 'propagate' keeps them (default : 'omit'). Contiguous float
+        arrays, including numpy memmaps, are used without being copied, so
+        they must not be modified while in use.
+    dtype : numpy dtype, optional
+        Precision of the stored time series, numpy.float64 or numpy.float32
+        (default : numpy.float64). Single precision halves the memory used by
+        the time series; in `computeFlucVec` with methods 'direct' (not with
+        `overlap`) and 'ortho' the segments are detrended in single precision and
+        the sums of the products of the residuals are accumulated in double
+        precision, the other methods and computations use double precision
+        copies of the time series. On the time series in `tests/mat`, `F` differs
+        from the one of the double precision time series by less than 1e-6
+        relative with `absVals`, and by less than 1e-5 of the largest absolute
+        value of `F` without, for `polOrd` up to 3.
     F : numpy ndarray
         Array containing the values of the fluctuations in each window.
     nRho : numpy ndarray
@@ -58,20 +91,24 @@ cdef class DCCA:
     isComputed : bool
         Boolean value to know if `F` has been computed in order to prevent the
         computation of other functions that need `F`.
+    lastRunStats : dict
+        Statistics of the last computation, None if it was not profiled (see
+        `fathonUtils.setProfiling`).
     """
 
     cdef:
         np.ndarray n, nRho, nThr
         np.ndarray tsVec1, tsVec2, F, rho, confUp, confDown
         bint isComputed
+        str tsHash
+        dict flucParams
+    cdef readonly dict lastRunStats
 
-    def __init__(self, tsVec1=[], tsVec2=[]):
-        if (isinstance(tsVec1, list) or isinstance(tsVec1, np.ndarray)) and (isinstance(tsVec2, list) or isinstance(tsVec2, np.ndarray)):
+    def __init__(self, tsVec1=[], tsVec2=[], nanPolicy='omit', dtype=np.float64):
+        if fu._isSeries(tsVec1) and fu._isSeries(tsVec2):
             if len(tsVec1) != 0 and len(tsVec2) != 0:
-                self.tsVec1 = np.array(tsVec1, dtype=float)
-                self.tsVec1 = self.tsVec1[~np.isnan(self.tsVec1)]
-                self.tsVec2 = np.array(tsVec2, dtype=float)
-                self.tsVec2 = self.tsVec2[~np.isnan(self.tsVec2)]
+                self.tsVec1 = fu._inputSeries(tsVec1, nanPolicy, dtype)
+                self.tsVec2 = fu._inputSeries(tsVec2, nanPolicy, dtype)
                 if len(self.tsVec1) != len(self.tsVec2):
                     warnings.warn("Warning: Input vectors have different length. The longest vector has been reduced to the size of the shortest one.")
                     self.tsVec1 = self.tsVec1[0:np.min([len(self.tsVec1), len(self.tsVec2)])]
@@ -79,14 +116,14 @@ cdef class DCCA:
             self.isComputed = False
         elif isinstance(tsVec1, str) and len(tsVec2) == 0:
             if len(tsVec1.split('.')) > 1 and tsVec1.split('.')[-1] == 'fathon':
-                f = open(tsVec1, 'rb')
-                data = pickle.load(f)
-                f.close()
+                data = fu._loadObject(tsVec1)
                 if data['kind'] != 'dcca':
                     raise ValueError('Error: Loaded object is not a DCCA object.')
                 else:
-                    self.tsVec1 = np.array(data['tsVec1'], dtype=float)
-                    self.tsVec2 = np.array(data['tsVec2'], dtype=float)
+                    self.tsVec1 = fu._storedSeries(data.get('tsVec1', []))
+                    self.tsVec2 = fu._storedSeries(data.get('tsVec2', []))
+                    self.tsHash = data.get('tsHash')
+                    self.flucParams = data.get('flucParams')
                     self.n = np.array(data['n'], dtype=ctypes.c_int)
                     self.F = np.array(data['F'], dtype=ctypes.c_double)
                     self.isComputed = data['isComputed']
@@ -98,40 +135,61 @@ cdef class DCCA:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef cy_flucCompute(self, np.ndarray[np.float64_t, ndim=1, mode='c'] vects1, np.ndarray[np.float64_t, ndim=1, mode='c'] vects2, np.ndarray[int, ndim=1, mode='c'] vecn, np.ndarray[np.float64_t, ndim=1, mode='c'] vecf, int polOrd, bint absVals, bint overlap, bint revSeg):
+    cdef cy_flucCompute(self, np.ndarray[int, ndim=1, mode='c'] vecn, np.ndarray[np.float64_t, ndim=1, mode='c'] vecf, int polOrd, bint absVals, bint overlap, bint revSeg, int fitMethod):
         cdef int nLen, tsLen
         cdef Py_ssize_t i, j
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t, vects1, vects2
+        cdef np.ndarray[np.float32_t, ndim=1, mode='c'] vectsF1, vectsF2
 
         nLen = len(vecn)
-        tsLen = len(vects1)
+        tsLen = len(self.tsVec1)
+
+        # the overlapping windows of `direct` are updated point by point in double precision
+        if fu._singlePrecision((self.tsVec1, self.tsVec2), fitMethod) and not (overlap and fitMethod == FIT_DIRECT):
+            vectsF1 = self.tsVec1
+            vectsF2 = self.tsVec2
+            with nogil:
+                flucDCCAComputeF(&vectsF1[0], &vectsF2[0], tsLen, &vecn[0], nLen, polOrd, absVals, overlap, revSeg, fitMethod, &vecf[0])
+            return
+
+        vects1 = np.ascontiguousarray(self.tsVec1, dtype=ctypes.c_double)
+        vects2 = np.ascontiguousarray(self.tsVec2, dtype=ctypes.c_double)
+        if vects1 is not self.tsVec1:
+            countBytes(vects1.nbytes + vects2.nbytes)
         
         t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        countBytes(t.nbytes)
         for j in prange(tsLen, nogil=True):
             t[j] = float(j) + 1.0
         
         with nogil:
-            if absVals:
+            if fitMethod == FIT_FAST:
+                flucDCCAFastCompute(&vects1[0], &vects2[0], tsLen, &vecn[0], nLen, polOrd, overlap, revSeg, &vecf[0])
+            elif absVals:
                 if overlap:
-                    flucDCCAAbsCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                    flucDCCAAbsCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
                 else:
                     if revSeg:
-                        flucDCCAForwBackwAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                        flucDCCAForwBackwAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
                     else:
-                        flucDCCAForwAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                        flucDCCAForwAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
             else:
                 if overlap:
-                    flucDCCANoAbsCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                    flucDCCANoAbsCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
                 else:
                     if revSeg:
-                        flucDCCAForwBackwNoAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                        flucDCCAForwBackwNoAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
                     else:
-                        flucDCCAForwNoAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                        flucDCCAForwNoAbsComputeNoOverlap(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
+
+        # `fast` has no absolute values, they are only requested for a series with itself
+        if fitMethod == FIT_FAST and absVals:
+            np.sqrt(vecf, out=vecf)
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef computeFlucVec(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint absVals=True, bint overlap=False, bint revSeg=False):
+    cpdef computeFlucVec(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint absVals=True, bint overlap=False, bint revSeg=False, str method='gsl', nJobs=None):
         """Computation of the fluctuations in each window.
 
         Parameters
@@ -148,6 +206,18 @@ cdef class DCCA:
         revSeg : bool, optional
             If True, the computation of `F` is repeated starting from the end of
             the time series, ignored if `overlap` is True (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size and updated point by point when `overlap` is True, 'ortho'
+            projects each window onto an orthonormal polynomial basis shared by
+            all the windows of the same size and stays accurate at high
+            `polOrd`, 'fast' computes the fluctuations from cumulative sums of
+            the time series and requires `polOrd` not greater than 2 and
+            `absVals` False (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -157,6 +227,10 @@ cdef class DCCA:
             Array `F` containing the values of the fluctuations in each window.
         """
         cdef int tsLen = len(self.tsVec1)
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -167,43 +241,95 @@ cdef class DCCA:
             raise ValueError('Error: `winSizes[-1]` must be smaller than the input vector length.')
         if winSizes[0] < (polOrd + 2):
             raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
-
-        self.n = np.array(winSizes, dtype=ctypes.c_int)
-        self.F = np.zeros((len(self.n), ), dtype=ctypes.c_double)
-        self.cy_flucCompute(np.array(self.tsVec1, dtype=ctypes.c_double), np.array(self.tsVec2, dtype=ctypes.c_double),
-                            self.n, self.F, polOrd, absVals, overlap, revSeg)
+        if absVals and fitMethod == FIT_FAST:
+            raise ValueError('Error: Method `fast` cannot be used with absolute values of the fluctuations.')
+
+        cacheKey = fu._cacheKey('dcca', (self.tsVec1, self.tsVec2), {'winSizes': tuple(winSizes.tolist()), 'polOrd': polOrd, 'absVals': absVals,
+                                                                    'overlap': overlap, 'revSeg': revSeg, 'method': method})
+        cached = fu._cacheGet(cacheKey)
+        counters = None
+        if cached is not None:
+            self.n, self.F = cached
+        else:
+            self.n = np.array(winSizes, dtype=ctypes.c_int)
+            self.F = np.zeros((len(self.n), ), dtype=ctypes.c_double)
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(self.n))
+            try:
+                self.cy_flucCompute(self.n, self.F, polOrd, absVals, overlap, revSeg, fitMethod)
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(self.n))
+            fu._cachePut(cacheKey, (self.n, self.F))
         self.isComputed = True
+        self.flucParams = {'polOrd': polOrd, 'absVals': absVals, 'overlap': overlap, 'revSeg': revSeg, 'method': method}
+        self.lastRunStats = fu._runStats(profStart, self.n, counters, cached is not None)
         
         return self.n, self.F
 
+    def extendFlucVec(self, moreWinSizes, nJobs=None):
+        """Computation of the fluctuations in additional windows, using the parameters
+        of the last call to `computeFlucVec`. Window's sizes already in `n` are not
+        computed again, and the new ones are merged into `n` and `F`.
+
+        Parameters
+        ----------
+        moreWinSizes : numpy ndarray
+            Array of window's sizes to be added.
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Sorted array `n` of window's sizes.
+        numpy ndarray
+            Array `F` containing the values of the fluctuations in each window.
+        """
+        cdef int tsLen = len(self.tsVec1)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
+        newN = fu._missingWinSizes(self.isComputed, self.flucParams, self.n, moreWinSizes, tsLen)
+
+        counters = None
+        if len(newN) > 0:
+            p = self.flucParams
+            newF = np.zeros((len(newN), ), dtype=ctypes.c_double)
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(newN))
+            try:
+                self.cy_flucCompute(newN.astype(ctypes.c_int), newF, p['polOrd'], p['absVals'], p['overlap'], p['revSeg'],
+                                    fu._fitMethodCode(p['method'], p['polOrd']))
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(newN))
+            self.n, self.F = fu._mergeFluc(self.n, self.F, newN, newF)
+        self.lastRunStats = fu._runStats(profStart, newN, counters)
+
+        return self.n, self.F
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef computeFlucVecSameTs(self, np.ndarray[np.float64_t, ndim=1, mode='c'] vec, np.ndarray[int, ndim=1, mode='c'] wins, int polOrd, bint overlap, bint revSeg):
-        cdef int nLen, tsLen = len(vec)
-        cdef Py_ssize_t i, j
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] F_same
-        cdef np.ndarray[int, ndim=1, mode='c'] vecn
+    cdef cy_rhoCompute(self, np.ndarray[np.float64_t, ndim=1, mode='c'] vects1, np.ndarray[np.float64_t, ndim=1, mode='c'] vects2, np.ndarray[int, ndim=1, mode='c'] vecn, np.ndarray[np.float64_t, ndim=1, mode='c'] vecrho, int polOrd, bint overlap, bint revSeg, int fitMethod):
+        cdef int nLen, tsLen
+        cdef Py_ssize_t j
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
 
-        vecn = np.array(wins, dtype=ctypes.c_int)
         nLen = len(vecn)
-        F_same = np.zeros((nLen, ), dtype=ctypes.c_double)
-        
+        tsLen = len(vects1)
+        if vects1 is not self.tsVec1:
+            countBytes(vects1.nbytes + vects2.nbytes)
+
         t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        countBytes(t.nbytes)
         for j in prange(tsLen, nogil=True):
             t[j] = float(j) + 1.0
-        
+
         with nogil:
-            if overlap:
-                flucDCCAAbsCompute(&vec[0], &vec[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &F_same[0])
-            else:
-                if revSeg:
-                    flucDCCAForwBackwAbsComputeNoOverlap(&vec[0], &vec[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &F_same[0])
-                else:
-                    flucDCCAForwAbsComputeNoOverlap(&vec[0], &vec[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &F_same[0])
-                
-        return F_same
+            flucDCCARhoCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, polOrd, overlap, revSeg, fitMethod, &vecrho[0])
 
     @cython.boundscheck(False)
     @cython.nonecheck(False)
@@ -261,7 +387,7 @@ cdef class DCCA:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef multiFitFlucVec(self, np.ndarray[np.int_t, ndim=2, mode='c'] limitsList, float logBase=np.e, bint verbose=False):
+    cpdef multiFitFlucVec(self, np.ndarray[np.int_t, ndim=2, mode='c'] limitsList, float logBase=np.e, bint verbose=False, bint rSquared=False):
         """Fit of the fluctuations values in different intervals at the same time.
 
         Parameters
@@ -272,6 +398,8 @@ cdef class DCCA:
             Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
         verbose : bool, optional
             Verbosity (default : False).
+        rSquared : bool, optional
+            If True, the coefficients of determination of the fits are returned too (default : False).
 
         Returns
         -------
@@ -279,24 +407,24 @@ cdef class DCCA:
             Slopes of the fits.
         numpy ndarray
             Intercepts of the fits.
+        numpy ndarray
+            Coefficients of determination of the fits, only if `rSquared` is True.
         """
         cdef Py_ssize_t i
-        cdef int limLen = len(limitsList)
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] list_H_intercept, list_H
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] list_H, list_H_intercept, list_R2
 
         if self.isComputed:
-            list_H = np.zeros((limLen, ), dtype=float)
-            list_H_intercept = np.zeros((limLen, ), dtype=float)
-            
-            for i in range(limLen):
-                if verbose:
-                    print('----------')
-                list_H[i], list_H_intercept[i] = self.fitFlucVec(nStart=limitsList[i][0], nEnd=limitsList[i][1],
-                                                                 logBase=logBase, verbose=verbose)
-            
+            list_H, list_H_intercept, list_R2 = fu._multiFit(self.n, self.F, limitsList, logBase)
+
             if verbose:
+                for i in range(len(limitsList)):
+                    print('----------')
+                    print('Fit limits: [{}, {}]'.format(limitsList[i][0], limitsList[i][1]))
+                    print('Fit result: H intercept = {:.2f}, H = {:.2f}'.format(list_H_intercept[i], list_H[i]))
                 print('----------')
-                
+
+            if rSquared:
+                return list_H, list_H_intercept, list_R2
             return list_H, list_H_intercept
         else:
             print('Nothing to fit, fluctuations vector has not been computed yet.')
@@ -304,7 +432,41 @@ cdef class DCCA:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef computeRho(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint verbose=False, bint overlap=False, bint revSeg=False):
+    cpdef findCrossovers(self, int nRegimes=2, int minPoints=3, float logBase=np.e, bint verbose=False):
+        """Piecewise-linear fit of the fluctuations values in log-log scale, with the crossovers
+        between the scaling regimes chosen to minimise the squared residuals of the fits.
+
+        Parameters
+        ----------
+        nRegimes : int, optional
+            Number of scaling regimes, if 0 it is chosen with the Bayesian information criterion (default : 2).
+        minPoints : int, optional
+            Minimum number of window's sizes in each regime (default : 3).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        verbose : bool, optional
+            Verbosity (default : False).
+
+        Returns
+        -------
+        numpy ndarray
+            Sizes of the first window of each regime after the first one.
+        numpy ndarray
+            Slopes of the fits in each regime.
+        numpy ndarray
+            Intercepts of the fits in each regime.
+        """
+        if self.isComputed:
+            nCross, H, H_intercept = fu._piecewiseFit(self.n, self.F, nRegimes, minPoints, logBase, verbose)
+
+            return nCross, H[0], H_intercept[0]
+        else:
+            print('Nothing to fit, fluctuations vector has not been computed yet.')
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    cpdef computeRho(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint verbose=False, bint overlap=False, bint revSeg=False, str method='gsl', nJobs=None):
         """Computation of the cross-correlation index in each window.
 
         Parameters
@@ -320,6 +482,16 @@ cdef class DCCA:
         revSeg : bool, optional
             If True, the computation of `F` is repeated starting from the end of
             the time series, ignored if `overlap` is True (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial basis
+            shared by all the windows of the same size and stays accurate at high
+            `polOrd`, 'fast' computes the fluctuations from cumulative sums of the
+            time series and requires `polOrd` not greater than 2 (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -328,9 +500,11 @@ cdef class DCCA:
         numpy ndarray
             Array containing the cross-correlation index.
         """
-        cdef Py_ssize_t i
         cdef int nLen, tsLen = len(self.tsVec1)
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] Fxy, Fxx, Fyy
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -344,31 +518,119 @@ cdef class DCCA:
 
         self.nRho = np.array(winSizes, dtype=ctypes.c_int)
         nLen = len(self.nRho)
-        Fxy = np.zeros((nLen, ), dtype=ctypes.c_double)
+        self.rho = np.zeros((nLen, ), dtype=ctypes.c_double)
 
-        self.cy_flucCompute(np.array(self.tsVec1, dtype=ctypes.c_double), np.array(self.tsVec2,
-                            dtype=ctypes.c_double), self.nRho, Fxy, polOrd, False, overlap, revSeg)
-        if verbose:
-            print('DCCA between series 1 and 2 computed.')
-            
-        Fxx = self.computeFlucVecSameTs(self.tsVec1, self.nRho, polOrd, overlap, revSeg)
-        if verbose:
-            print('DCCA between series 1 and 1 computed.')
-            
-        Fyy = self.computeFlucVecSameTs(self.tsVec2, self.nRho, polOrd, overlap, revSeg)
+        prevThreads = setNumThreads(nThreads)
+        profThreads = _profileStart(profStart, nLen)
+        try:
+            self.cy_rhoCompute(np.ascontiguousarray(self.tsVec1, dtype=ctypes.c_double), np.ascontiguousarray(self.tsVec2,
+                               dtype=ctypes.c_double), self.nRho, self.rho, polOrd, overlap, revSeg, fitMethod)
+        finally:
+            setNumThreads(prevThreads)
+            counters = _profileStop(profStart, profThreads, nLen)
+        self.lastRunStats = fu._runStats(profStart, self.nRho, counters)
         if verbose:
-            print('DCCA between series 2 and 2 computed.')
-
-        self.rho = np.zeros((nLen, ), dtype=float)
-        for i in range(nLen):
-            self.rho[i] = Fxy[i] / (Fxx[i] * Fyy[i])
+            print('DCCA between series 1 and 2, 1 and 1, 2 and 2 computed.')
 
         return self.nRho, self.rho
 
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def rhoMatrix(panel, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint overlap=False, bint revSeg=False, str method='gsl', outFileName=None, nJobs=None):
+        """Computation of the cross-correlation index of all the couples of
+        time series of a panel in each window.
+
+        Parameters
+        ----------
+        panel : numpy ndarray
+            kxN array with a time series in each row.
+        winSizes : numpy ndarray
+            Array of window's sizes.
+        polOrd : int, optional
+            Order of the polynomial to be fitted in each window (default : 1).
+        overlap : bool, optional
+            If True, computes `rho` using overlapping segments (default : False).
+        revSeg : bool, optional
+            If True, the computation of `rho` is repeated starting from the end of
+            the time series, ignored if `overlap` is True (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial
+            basis shared by all the windows of the same size and stays accurate
+            at high `polOrd` (default : 'gsl').
+        outFileName : str, optional
+            If given, the result is written to this `.npy` file through a
+            memory map, to be reloaded with `numpy.load(outFileName, mmap_mode='r')`
+            (default : None).
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Array of window's sizes.
+        numpy ndarray
+            nxkxk array containing the cross-correlation index of each couple
+            of time series in each window (a numpy memmap if `outFileName` is given).
+        """
+        cdef int nLen, nSeries, tsLen
+        cdef Py_ssize_t j
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        cdef np.ndarray[np.float64_t, ndim=2, mode='c'] vects
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
+        cdef np.ndarray[np.float64_t, ndim=3, mode='c'] rhoMat
+        cdef np.ndarray[int, ndim=1, mode='c'] vecn
+
+        vects = np.ascontiguousarray(panel, dtype=ctypes.c_double)
+        nSeries = vects.shape[0]
+        tsLen = vects.shape[1]
+
+        if nSeries < 2:
+            raise ValueError('Error: `panel` must contain at least two time series.')
+        if np.isnan(vects).any():
+            raise ValueError('Error: `panel` must not contain NaN values.')
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[len(winSizes)-1] > tsLen:
+            raise ValueError('Error: `winSizes[-1]` must be smaller than the input vector length.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if fitMethod == FIT_FAST:
+            raise ValueError('Error: Method `fast` cannot be used to compute the matrix of the cross-correlation index.')
+
+        vecn = np.array(winSizes, dtype=ctypes.c_int)
+        nLen = len(vecn)
+        if outFileName is None:
+            rhoMat = np.zeros((nLen, nSeries, nSeries), dtype=ctypes.c_double)
+        else:
+            rhoMat = np.lib.format.open_memmap(outFileName, mode='w+', dtype=ctypes.c_double, shape=(nLen, nSeries, nSeries))
+
+        t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        for j in prange(tsLen, nogil=True):
+            t[j] = float(j) + 1.0
+
+        with nogil:
+            prevThreads = setNumThreads(nThreads)
+            rhoMatrixCompute(&vects[0, 0], nSeries, tsLen, &t[0], &vecn[0], nLen, polOrd, overlap, revSeg, fitMethod, &rhoMat[0, 0, 0])
+            setNumThreads(prevThreads)
+
+        if outFileName is not None:
+            rhoMat.flush()
+
+        return vecn, rhoMat
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef rhoThresholds(self, int L, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int nSim, double confLvl, int polOrd=1, bint verbose=False):
+    cpdef rhoThresholds(self, int L, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int nSim, double confLvl, int polOrd=1, bint verbose=False, str method='gsl', seed=None, nJobs=None):
         """Computation of the cross-correlation index's confidence levels in each window.
 
         Parameters
@@ -386,6 +648,20 @@ cdef class DCCA:
             Order of the polynomial to be fitted in each window (default : 1).
         verbose : bool, optional
             Verbosity (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial basis
+            shared by all the windows of the same size and stays accurate at high
+            `polOrd`, 'fast' computes the fluctuations from cumulative sums of the
+            time series and requires `polOrd` not greater than 2 (default : 'gsl').
+        seed : int, optional
+            Non-negative seed of the random walks, results obtained with the same
+            seed are cached and reused; if None, the seed is drawn from numpy's
+            global random generator (default : None).
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -397,8 +673,12 @@ cdef class DCCA:
             Array containing the second confidence interval.
         """
         cdef np.ndarray[np.float64_t, ndim=2, mode='c'] rho_all
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] ran1, ran2, vecfx, vecfy, vecfxy
+        cdef np.ndarray[int, ndim=1, mode='c'] wins
         cdef int nLen
+        cdef unsigned long long cSeed
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        profStart = fu._profileBegin()
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -413,79 +693,171 @@ cdef class DCCA:
             raise ValueError('Error: Number of simulations must be greater than 0.')
         if confLvl < 0 or confLvl > 1:
             raise ValueError('Error: Confidence level must be included in the interval [0,1].')
+        if seed is not None and seed < 0:
+            raise ValueError('Error: `seed` must be a non-negative integer.')
 
         self.nThr = np.array(winSizes, dtype=ctypes.c_int)
+        wins = self.nThr
         nLen = len(self.nThr)
-        self.confUp = np.zeros((nLen, ), dtype=ctypes.c_double)
-        self.confDown = np.zeros((nLen, ), dtype=ctypes.c_double)
+
+        cacheKey = None
+        if seed is not None:
+            cacheKey = (L, tuple(winSizes.tolist()), polOrd, nSim, confLvl, int(seed), fitMethod)
+            if cacheKey in _rhoThrCache:
+                if verbose:
+                    print('Confidence levels read from cache.')
+                self.confUp, self.confDown = [np.copy(c) for c in _rhoThrCache[cacheKey]]
+                self.lastRunStats = fu._runStats(profStart, self.nThr, None, True)
+                return self.nThr, self.confUp, self.confDown
+            cSeed = seed
+        else:
+            cSeed = np.random.randint(0, np.iinfo(np.int64).max, dtype=np.int64)
+
         rho_all = np.zeros((nSim, nLen), dtype=ctypes.c_double)
-        
-        for i in range(nSim):
-            if verbose:
-                print('Simulation number {}'.format(i + 1))
-                
-            ran1 = np.random.randn(L)
-            ran1 = np.cumsum(ran1 - np.mean(ran1))
-            ran2 = np.random.randn(L)
-            ran2 = np.cumsum(ran2 - np.mean(ran2))
-            vecfx = np.zeros((nLen, ), dtype=ctypes.c_double)
-            vecfy = np.zeros((nLen, ), dtype=ctypes.c_double)
-            vecfxy = np.zeros((nLen, ), dtype=ctypes.c_double)
-            
-            self.cy_flucCompute(ran1, ran2, self.nThr, vecfxy, polOrd, False, False, False)
-            self.cy_flucCompute(ran1, ran1, self.nThr, vecfx, polOrd, True, False, False)
-            self.cy_flucCompute(ran2, ran2, self.nThr, vecfy, polOrd, True, False, False)
-            
-            for j in range(nLen):
-                rho_all[i, j] = vecfxy[j] / (vecfx[j] * vecfy[j])
-                
+        prevThreads = setNumThreads(nThreads)
+        profThreads = _profileStart(profStart, nLen)
+        countBytes(rho_all.nbytes)
+        try:
+            with nogil:
+                rhoThresholdsCompute(L, &wins[0], nLen, polOrd, nSim, cSeed, fitMethod, &rho_all[0, 0])
+        finally:
+            setNumThreads(prevThreads)
+            counters = _profileStop(profStart, profThreads, nLen)
+        self.lastRunStats = fu._runStats(profStart, self.nThr, counters)
+        if verbose:
+            print('{} simulations computed.'.format(nSim))
+
         self.confUp = np.quantile(rho_all, confLvl, axis=0)
         self.confDown = np.quantile(rho_all, 1 - confLvl, axis=0)
-        
+
+        if cacheKey is not None:
+            if len(_rhoThrCache) >= _RHO_THR_CACHE_SIZE:
+                del _rhoThrCache[next(iter(_rhoThrCache))]
+            _rhoThrCache[cacheKey] = (np.copy(self.confUp), np.copy(self.confDown))
+
         return self.nThr, self.confUp, self.confDown
 
-    def saveObject(self, outFileName):
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def batch(tsVecs1, tsVecs2, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint absVals=True, bint overlap=False, bint revSeg=False, str method='gsl', int nStart=-999, int nEnd=-999, float logBase=np.e, nJobs=None):
+        """Computation and fit of the fluctuations of many couples of time
+        series at the same time.
+
+        Parameters
+        ----------
+        tsVecs1 : numpy ndarray or iterable
+            2-D array with a time series in each row, or list of time series
+            of different lengths.
+        tsVecs2 : numpy ndarray or iterable
+            Time series to be paired with the ones of `tsVecs1`. The longest
+            time series of each couple is reduced to the size of the shortest one.
+        winSizes : numpy ndarray
+            Array of window's sizes.
+        polOrd : int, optional
+            Order of the polynomial to be fitted in each window (default : 1).
+        absVals : bool, optional
+            If True, the computation of `F` is performed using the abolute values of
+            the fluctuations of both time series (default : True).
+        overlap : bool, optional
+            If True, computes `F` using overlapping segments (default : False).
+        revSeg : bool, optional
+            If True, the computation of `F` is repeated starting from the end of
+            the time series, ignored if `overlap` is True (default : False).
+        method : str, optional
+            Detrending method, same as in `computeFlucVec` (default : 'gsl').
+        nStart : int, optional
+            Size of the smaller window used to fit `F` (default : first value
+            of `winSizes`).
+        nEnd : int, optional
+            Size of the bigger window used to fit `F` (default : last value of
+            `winSizes`).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F`
+            (default : e).
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Array `n` of window's sizes.
+        numpy ndarray
+            Array `F` with the values of the fluctuations in each window, one
+            row for each couple of time series.
+        numpy ndarray
+            Slopes of the fits, one for each couple of time series.
+        numpy ndarray
+            Intercepts of the fits, one for each couple of time series.
+        """
+        cdef int nLen, nSeries, maxLen
+        cdef Py_ssize_t j
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects1, vects2, t, vecf
+        cdef np.ndarray[int, ndim=1, mode='c'] offsets, lens, vecn
+
+        seriesList1 = fu._toSeriesList(tsVecs1)
+        seriesList2 = fu._toSeriesList(tsVecs2)
+        if len(seriesList1) != len(seriesList2):
+            raise ValueError('Error: `tsVecs1` and `tsVecs2` must contain the same number of time series.')
+        for j in range(len(seriesList1)):
+            if len(seriesList1[j]) != len(seriesList2[j]):
+                minLen = np.min([len(seriesList1[j]), len(seriesList2[j])])
+                seriesList1[j] = seriesList1[j][0:minLen]
+                seriesList2[j] = seriesList2[j][0:minLen]
+        vects1, offsets, lens = fu._packSeries(seriesList1)
+        vects2, offsets, lens = fu._packSeries(seriesList2)
+
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[len(winSizes)-1] > np.min(lens):
+            raise ValueError('Error: `winSizes[-1]` must be smaller than the length of the shortest time series.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if absVals and fitMethod == FIT_FAST:
+            raise ValueError('Error: Method `fast` cannot be used with absolute values of the fluctuations.')
+
+        vecn = np.array(winSizes, dtype=ctypes.c_int)
+        nLen = len(vecn)
+        nSeries = len(lens)
+        maxLen = np.max(lens)
+        vecf = np.zeros((nSeries * nLen, ), dtype=ctypes.c_double)
+
+        t = np.empty((maxLen, ), dtype=ctypes.c_double)
+        for j in prange(maxLen, nogil=True):
+            t[j] = float(j) + 1.0
+
+        with nogil:
+            prevThreads = setNumThreads(nThreads)
+            flucDCCABatchCompute(&vects1[0], &vects2[0], &t[0], &offsets[0], &lens[0], nSeries, &vecn[0], nLen, polOrd, absVals, overlap, revSeg, fitMethod, &vecf[0])
+            setNumThreads(prevThreads)
+
+        F = np.reshape(vecf, (nSeries, nLen))
+        H, H_intercept = fu._batchFit(vecn, F, nStart, nEnd, logBase)
+
+        return vecn, F, H, H_intercept
+
+    def saveObject(self, outFileName, saveTs=True):
         """Save current object state to binary file.
         
         Parameters
         ----------
         outFileName : str
             Output binary file. `.fathon` extension will be appended to the file name.
+        saveTs : bool, optional
+            If False, only the results are saved and the time series is replaced by its
+            hash (see `fathonUtils.seriesHash`); the object loaded from the file can fit
+            the saved results but cannot compute new ones (default : True).
         """
-        saveDict = {}
-        saveDict['kind'] = 'dcca'
-        saveDict['tsVec1'] = self.tsVec1.tolist()
-        saveDict['tsVec2'] = self.tsVec2.tolist()
-        try:
-            saveDict['n'] = self.n.tolist()
-        except:
-            saveDict['n'] = []
-        try:
-            saveDict['F'] = self.F.tolist()
-        except:
-            saveDict['F'] = []
-        try:
-            saveDict['nRho'] = self.nRho.tolist()
-        except:
-            saveDict['nRho'] = []
-        try:
-            saveDict['rho'] = self.rho.tolist()
-        except:
-            saveDict['rho'] = []
-        try:
-            saveDict['nThr'] = self.nThr.tolist()
-        except:
-            saveDict['nThr'] = []
-        try:
-            saveDict['confUp'] = self.confUp.tolist()
-        except:
-            saveDict['confUp'] = []
-        try:
-            saveDict['confDown'] = self.confDown.tolist()
-        except:
-            saveDict['confDown'] = []
-        saveDict['isComputed'] = self.isComputed
-
-        f = open(outFileName + '.fathon', 'wb')
-        pickle.dump(saveDict, f)
-        f.close()
+        arrays, scalars = fu._seriesMembers(saveTs, self.tsHash, {'tsVec1': self.tsVec1, 'tsVec2': self.tsVec2})
+        arrays.update({'n': self.n, 'F': self.F, 'nRho': self.nRho, 'rho': self.rho,
+                       'nThr': self.nThr, 'confUp': self.confUp, 'confDown': self.confDown})
+        scalars['isComputed'] = self.isComputed
+        scalars['flucParams'] = self.flucParams
+        fu._saveObject(outFileName + '.fathon', 'dcca', arrays, scalars)
@@ -21,12 +21,29 @@ cimport numpy as np
 cimport cython
 from cython.parallel import prange
 import ctypes
-import pickle
+from . import fathonUtils as fu
 
 cdef extern from "cLoops.h" nogil:
-    void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, double *f_vec)
-    void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, double *f_vec)
+    void flucDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, int pol_ord, int fit_method, double *f_vec)
+    void flucUDFACompute(double *y_vec, double *t_vec, int y_len, int *wins_vec, int num_wins, int pol, int fit_method, double *f_vec)
+    void flucDFAFastCompute(double *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, double *f_vec)
+    void flucDFAStreamUpdate(double *y, double *t, int N, int *starts, int *n_new, int *wins, int n_wins, int pol_ord, int fit_method, double *f_sum)
+    void flucDFARollingCompute(double *y, int N, int win_len, int step, int n_pos, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+    void flucDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, int pol_ord, int rev_seg, int unbiased, int fit_method, double *f_vec)
+    void flucDFAComputeF(float *y, int N, int *wins, int n_wins, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+    int setNumThreads(int n_threads)
+    int simdLevel()
+    int simdSelfTest(int level)
+    void countBytes(size_t n_bytes)
+    enum: FIT_FAST
+
+def _simdKernels():
+    """Level of the residual kernels in use and result of the self-test of each level,
+    as returned by the C loops (see `fathonUtils.simdInfo`)."""
+    return simdLevel(), [simdSelfTest(level) for level in range(len(fu._simdLevels))]
+
+include "profile.pxi"
 
 cdef class DFA:
     """Detrended Fluctuation Analysis class.
@@ -37,66 +54,99 @@ cdef class DFA:
         Array of window's sizes used for the computation.
     tsVec : iterable
         Time series used for the analysis.
+    nanPolicy : str, optional
+        Handling of NaNs in the input, 'omit' removes them, 'raise' raises an
+        error, 'propagate' keeps them (default : 'omit'). Contiguous float
+        arrays, including numpy memmaps, are used without being copied, so
+        they must not be modified while in use.
+    dtype : numpy dtype, optional
+        Precision of the stored time series, numpy.float64 or numpy.float32
+        (default : numpy.float64). Single precision halves the memory used by
+        the time series; with methods 'direct' and 'ortho' (not `unbiased`) the
+        segments are detrended in single precision and the sums of the residuals
+        are accumulated in double precision, the other methods use a double
+        precision copy of the time series. On the time series in `tests/mat`, `F`
+        differs from the one of the double precision time series by less than 1e-6
+        relative for `polOrd` up to 3.
     F : numpy ndarray
         Array containing the values of the fluctuations in each window.
     isComputed : bool
         Boolean value to know if `F` has been computed in order to prevent the
         computation of other functions that need `F`.
+    lastRunStats : dict
+        Statistics of the last computation, None if it was not profiled (see
+        `fathonUtils.setProfiling`).
     """
 
     cdef:
         np.ndarray n
         np.ndarray tsVec, F
         bint isComputed
+        str tsHash
+        dict flucParams
+    cdef readonly dict lastRunStats
 
-    def __init__(self, tsVec):
+    def __init__(self, tsVec, nanPolicy='omit', dtype=np.float64):
         if isinstance(tsVec, str):
             if len(tsVec.split('.')) > 1 and tsVec.split('.')[-1] == 'fathon':
-                f = open(tsVec, 'rb')
-                data = pickle.load(f)
-                f.close()
+                data = fu._loadObject(tsVec)
                 if data['kind'] != 'dfa':
                     raise ValueError('Error: Loaded object is not a DFA object.')
                 else:
-                    self.tsVec = np.array(data['tsVec'], dtype=float)
+                    self.tsVec = fu._storedSeries(data.get('tsVec', []))
+                    self.tsHash = data.get('tsHash')
+                    self.flucParams = data.get('flucParams')
                     self.n = np.array(data['n'], dtype=ctypes.c_int)
                     self.F = np.array(data['F'], dtype=ctypes.c_double)
                     self.isComputed = data['isComputed']
             else:
                 raise ValueError('Error: Not recognized extension.')
         else:
-            self.tsVec = np.array(tsVec, dtype=float)
-            self.tsVec = self.tsVec[~np.isnan(self.tsVec)]
+            self.tsVec = fu._inputSeries(tsVec, nanPolicy, dtype)
             self.isComputed = False
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef cy_flucCompute(self, np.ndarray[np.float64_t, ndim=1, mode='c'] vects, np.ndarray[int, ndim=1, mode='c'] vecn, np.ndarray[np.float64_t, ndim=1, mode='c'] vecf, int polOrd, bint revSeg, bint unbiased):
+    cdef cy_flucCompute(self, np.ndarray[int, ndim=1, mode='c'] vecn, np.ndarray[np.float64_t, ndim=1, mode='c'] vecf, int polOrd, bint revSeg, bint unbiased, int fitMethod):
         cdef int nLen, tsLen
         cdef Py_ssize_t i, j
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t, vects
+        cdef np.ndarray[np.float32_t, ndim=1, mode='c'] vectsF
 
         nLen = len(vecn)
-        tsLen = len(vects)
+        tsLen = len(self.tsVec)
+
+        if not unbiased and fu._singlePrecision((self.tsVec, ), fitMethod):
+            vectsF = self.tsVec
+            with nogil:
+                flucDFAComputeF(&vectsF[0], tsLen, &vecn[0], nLen, polOrd, revSeg, fitMethod, &vecf[0])
+            return
+
+        vects = np.ascontiguousarray(self.tsVec, dtype=ctypes.c_double)
+        if vects is not self.tsVec:
+            countBytes(vects.nbytes)
         
         t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        countBytes(t.nbytes)
         for j in prange(tsLen, nogil=True):
             t[j] = float(j) + 1.0
         
         with nogil:
-            if unbiased:
-                flucUDFACompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+            if fitMethod == FIT_FAST:
+                flucDFAFastCompute(&vects[0], tsLen, &vecn[0], nLen, polOrd, revSeg, &vecf[0])
+            elif unbiased:
+                flucUDFACompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
             else:
                 if revSeg:
-                    flucDFAForwBackwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                    flucDFAForwBackwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
                 else:
-                    flucDFAForwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, &vecf[0])
+                    flucDFAForwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, polOrd, fitMethod, &vecf[0])
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef computeFlucVec(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint revSeg=False, bint unbiased=False):
+    cpdef computeFlucVec(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint revSeg=False, bint unbiased=False, str method='gsl', nJobs=None):
         """Computation of the fluctuations in each window.
 
         Parameters
@@ -109,6 +159,11 @@ cdef class DFA:
             If True, the computation of `F` is repeated starting from the end of the time series (default : False).
         unbiased : bool, optional
             If True, the unbiased version of DFA is computed, and `revSeg` is ignored. To be used on short time series (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares, 'direct' uses a closed-form fit precomputed once for each window's size and updated point by point on the overlapping windows of `unbiased`, 'ortho' projects each window onto an orthonormal polynomial basis shared by all the windows of the same size and stays accurate at high `polOrd`, 'fast' computes the fluctuations from cumulative sums of the time series and requires `polOrd` not greater than 2 and `unbiased` False (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -118,6 +173,10 @@ cdef class DFA:
             Array `F` containing the values of the fluctuations in each window.
         """
         cdef int tsLen = len(self.tsVec)
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -128,14 +187,74 @@ cdef class DFA:
             raise ValueError('Error: `winSizes[-1]` must be smaller than the input vector length.')
         if winSizes[0] < (polOrd + 2):
             raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if unbiased and fitMethod == FIT_FAST:
+            raise ValueError('Error: Method `fast` cannot be used to compute the unbiased DFA.')
 
-        self.n = np.array(winSizes, dtype=ctypes.c_int)
-        self.F = np.zeros((len(self.n), ), dtype=ctypes.c_double)
-        self.cy_flucCompute(np.array(self.tsVec, dtype=ctypes.c_double), self.n, self.F, polOrd, revSeg, unbiased)
+        cacheKey = fu._cacheKey('dfa', (self.tsVec, ), {'winSizes': tuple(winSizes.tolist()), 'polOrd': polOrd, 'revSeg': revSeg,
+                                                        'unbiased': unbiased, 'method': method})
+        cached = fu._cacheGet(cacheKey)
+        counters = None
+        if cached is not None:
+            self.n, self.F = cached
+        else:
+            self.n = np.array(winSizes, dtype=ctypes.c_int)
+            self.F = np.zeros((len(self.n), ), dtype=ctypes.c_double)
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(self.n))
+            try:
+                self.cy_flucCompute(self.n, self.F, polOrd, revSeg, unbiased, fitMethod)
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(self.n))
+            fu._cachePut(cacheKey, (self.n, self.F))
         self.isComputed = True
+        self.flucParams = {'polOrd': polOrd, 'revSeg': revSeg, 'unbiased': unbiased, 'method': method}
+        self.lastRunStats = fu._runStats(profStart, self.n, counters, cached is not None)
         
         return self.n, self.F
 
+    def extendFlucVec(self, moreWinSizes, nJobs=None):
+        """Computation of the fluctuations in additional windows, using the parameters
+        of the last call to `computeFlucVec`. Window's sizes already in `n` are not
+        computed again, and the new ones are merged into `n` and `F`.
+
+        Parameters
+        ----------
+        moreWinSizes : numpy ndarray
+            Array of window's sizes to be added.
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Sorted array `n` of window's sizes.
+        numpy ndarray
+            Array `F` containing the values of the fluctuations in each window.
+        """
+        cdef int tsLen = len(self.tsVec)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
+        newN = fu._missingWinSizes(self.isComputed, self.flucParams, self.n, moreWinSizes, tsLen)
+
+        counters = None
+        if len(newN) > 0:
+            p = self.flucParams
+            newF = np.zeros((len(newN), ), dtype=ctypes.c_double)
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(newN))
+            try:
+                self.cy_flucCompute(newN.astype(ctypes.c_int), newF, p['polOrd'], p['revSeg'], p['unbiased'], fu._fitMethodCode(p['method'], p['polOrd']))
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(newN))
+            self.n, self.F = fu._mergeFluc(self.n, self.F, newN, newF)
+        self.lastRunStats = fu._runStats(profStart, newN, counters)
+
+        return self.n, self.F
+
     @cython.boundscheck(False)
     @cython.nonecheck(False)
     cpdef fitFlucVec(self, int nStart=-999, int nEnd=-999, float logBase=np.e, bint verbose=False):
@@ -192,7 +311,7 @@ cdef class DFA:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cpdef multiFitFlucVec(self, np.ndarray[np.int_t, ndim=2, mode='c'] limitsList, float logBase=np.e, bint verbose=False):
+    cpdef multiFitFlucVec(self, np.ndarray[np.int_t, ndim=2, mode='c'] limitsList, float logBase=np.e, bint verbose=False, bint rSquared=False):
         """Fit of the fluctuations values in different intervals at the same time.
 
         Parameters
@@ -203,6 +322,8 @@ cdef class DFA:
             Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
         verbose : bool, optional
             Verbosity (default : False).
+        rSquared : bool, optional
+            If True, the coefficients of determination of the fits are returned too (default : False).
 
         Returns
         -------
@@ -210,50 +331,422 @@ cdef class DFA:
             Slopes of the fits.
         numpy ndarray
             Intercepts of the fits.
+        numpy ndarray
+            Coefficients of determination of the fits, only if `rSquared` is True.
         """
         cdef Py_ssize_t i
-        cdef int limLen = len(limitsList)
-        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] list_H, list_H_intercept
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] list_H, list_H_intercept, list_R2
 
         if self.isComputed:
-            list_H = np.zeros((limLen, ), dtype=float)
-            list_H_intercept = np.zeros((limLen, ), dtype=float)
-            
-            for i in range(limLen):
-                if verbose:
-                    print('----------')
-                list_H[i], list_H_intercept[i] = self.fitFlucVec(nStart=limitsList[i][0], nEnd=limitsList[i][1],
-                                                                 logBase=logBase, verbose=verbose)
-                
+            list_H, list_H_intercept, list_R2 = fu._multiFit(self.n, self.F, limitsList, logBase)
+
             if verbose:
+                for i in range(len(limitsList)):
+                    print('----------')
+                    print('Fit limits: [{}, {}]'.format(limitsList[i][0], limitsList[i][1]))
+                    print('Fit result: H intercept = {:.2f}, H = {:.2f}'.format(list_H_intercept[i], list_H[i]))
                 print('----------')
-                
+
+            if rSquared:
+                return list_H, list_H_intercept, list_R2
             return list_H, list_H_intercept
         else:
             print('Nothing to fit, fluctuations vector has not been computed yet.')
 
-    def saveObject(self, outFileName):
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    cpdef findCrossovers(self, int nRegimes=2, int minPoints=3, float logBase=np.e, bint verbose=False):
+        """Piecewise-linear fit of the fluctuations values in log-log scale, with the crossovers
+        between the scaling regimes chosen to minimise the squared residuals of the fits.
+
+        Parameters
+        ----------
+        nRegimes : int, optional
+            Number of scaling regimes, if 0 it is chosen with the Bayesian information criterion (default : 2).
+        minPoints : int, optional
+            Minimum number of window's sizes in each regime (default : 3).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        verbose : bool, optional
+            Verbosity (default : False).
+
+        Returns
+        -------
+        numpy ndarray
+            Sizes of the first window of each regime after the first one.
+        numpy ndarray
+            Slopes of the fits in each regime.
+        numpy ndarray
+            Intercepts of the fits in each regime.
+        """
+        if self.isComputed:
+            nCross, H, H_intercept = fu._piecewiseFit(self.n, self.F, nRegimes, minPoints, logBase, verbose)
+
+            return nCross, H[0], H_intercept[0]
+        else:
+            print('Nothing to fit, fluctuations vector has not been computed yet.')
+
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def batch(tsVecs, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint revSeg=False, bint unbiased=False, str method='gsl', int nStart=-999, int nEnd=-999, float logBase=np.e, nJobs=None):
+        """Computation and fit of the fluctuations of many time series at the same time.
+
+        Parameters
+        ----------
+        tsVecs : numpy ndarray or iterable
+            2-D array with a time series in each row, or list of time series of different lengths.
+        winSizes : numpy ndarray
+            Array of window's sizes.
+        polOrd : int, optional
+            Order of the polynomial to be fitted in each window (default : 1).
+        revSeg : bool, optional
+            If True, the computation of `F` is repeated starting from the end of the time series (default : False).
+        unbiased : bool, optional
+            If True, the unbiased version of DFA is computed, and `revSeg` is ignored (default : False).
+        method : str, optional
+            Detrending method, same as in `computeFlucVec` (default : 'gsl').
+        nStart : int, optional
+            Size of the smaller window used to fit `F` (default : first value of `winSizes`).
+        nEnd : int, optional
+            Size of the bigger window used to fit `F` (default : last value of `winSizes`).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Array `n` of window's sizes.
+        numpy ndarray
+            Array `F` with the values of the fluctuations in each window, one row for each time series.
+        numpy ndarray
+            Slopes of the fits, one for each time series.
+        numpy ndarray
+            Intercepts of the fits, one for each time series.
+        """
+        cdef int nLen, nSeries, maxLen
+        cdef Py_ssize_t j
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects, t, vecf
+        cdef np.ndarray[int, ndim=1, mode='c'] offsets, lens, vecn
+
+        seriesList = fu._toSeriesList(tsVecs)
+        vects, offsets, lens = fu._packSeries(seriesList)
+
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[len(winSizes)-1] > np.min(lens):
+            raise ValueError('Error: `winSizes[-1]` must be smaller than the length of the shortest time series.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if unbiased and fitMethod == FIT_FAST:
+            raise ValueError('Error: Method `fast` cannot be used to compute the unbiased DFA.')
+
+        vecn = np.array(winSizes, dtype=ctypes.c_int)
+        nLen = len(vecn)
+        nSeries = len(lens)
+        maxLen = np.max(lens)
+        vecf = np.zeros((nSeries * nLen, ), dtype=ctypes.c_double)
+
+        t = np.empty((maxLen, ), dtype=ctypes.c_double)
+        for j in prange(maxLen, nogil=True):
+            t[j] = float(j) + 1.0
+
+        with nogil:
+            prevThreads = setNumThreads(nThreads)
+            flucDFABatchCompute(&vects[0], &t[0], &offsets[0], &lens[0], nSeries, &vecn[0], nLen, polOrd, revSeg, unbiased, fitMethod, &vecf[0])
+            setNumThreads(prevThreads)
+
+        F = np.reshape(vecf, (nSeries, nLen))
+        H, H_intercept = fu._batchFit(vecn, F, nStart, nEnd, logBase)
+
+        return vecn, F, H, H_intercept
+
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def rollingH(tsVec, int windowLen, int step, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, bint revSeg=False, str method='gsl', int nStart=-999, int nEnd=-999, float logBase=np.e, str nanPolicy='omit', nJobs=None):
+        """Hurst exponent of a window sliding over a time series.
+
+        For each position, the result is the one of a DFA of the `windowLen` samples
+        of the window, but the segments shared by different positions are detrended once.
+
+        Parameters
+        ----------
+        tsVec : iterable
+            Time series used for the analysis.
+        windowLen : int
+            Number of samples of the sliding window.
+        step : int
+            Number of samples between two consecutive positions of the sliding window.
+        winSizes : numpy ndarray
+            Array of window's sizes used for the DFA in each position.
+        polOrd : int, optional
+            Order of the polynomial to be fitted in each window (default : 1).
+        revSeg : bool, optional
+            If True, the computation of `F` is repeated starting from the end of the sliding window (default : False).
+        method : str, optional
+            Detrending method, same as in `computeFlucVec` (default : 'gsl').
+        nStart : int, optional
+            Size of the smaller window used to fit `F` (default : first value of `winSizes`).
+        nEnd : int, optional
+            Size of the bigger window used to fit `F` (default : last value of `winSizes`).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        nanPolicy : str, optional
+            Handling of NaNs in the input, same as in `DFA` (default : 'omit').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Index of the last sample of the sliding window in each position.
+        numpy ndarray
+            Array `F` with the values of the fluctuations in each window, one row for each position.
+        numpy ndarray
+            Slopes of the fits, one for each position.
+        numpy ndarray
+            Intercepts of the fits, one for each position.
+        """
+        cdef int nLen, nPos, tsLen
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects, vecf
+        cdef np.ndarray[int, ndim=1, mode='c'] vecn
+
+        vects = fu._inputSeries(tsVec, nanPolicy)
+        tsLen = len(vects)
+
+        if windowLen > tsLen:
+            raise ValueError('Error: `windowLen` must be smaller than the input vector length.')
+        if step < 1:
+            raise ValueError('Error: `step` must be greater than 0.')
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[len(winSizes)-1] > windowLen:
+            raise ValueError('Error: `winSizes[-1]` must be smaller than `windowLen`.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+
+        vecn = np.array(winSizes, dtype=ctypes.c_int)
+        nLen = len(vecn)
+        nPos = (tsLen - windowLen) // step + 1
+        vecf = np.zeros((nPos * nLen, ), dtype=ctypes.c_double)
+
+        with nogil:
+            prevThreads = setNumThreads(nThreads)
+            flucDFARollingCompute(&vects[0], tsLen, windowLen, step, nPos, &vecn[0], nLen, polOrd, revSeg, fitMethod, &vecf[0])
+            setNumThreads(prevThreads)
+
+        F = np.reshape(vecf, (nPos, nLen))
+        H, H_intercept = fu._batchFit(vecn, F, nStart, nEnd, logBase)
+
+        return np.arange(nPos, dtype=np.int64) * step + windowLen - 1, F, H, H_intercept
+
+    def saveObject(self, outFileName, saveTs=True):
         """Save current object state to binary file.
         
         Parameters
         ----------
         outFileName : str
             Output binary file. `.fathon` extension will be appended to the file name.
+        saveTs : bool, optional
+            If False, only the results are saved and the time series is replaced by its
+            hash (see `fathonUtils.seriesHash`); the object loaded from the file can fit
+            the saved results but cannot compute new ones (default : True).
         """
-        saveDict = {}
-        saveDict['kind'] = 'dfa'
-        saveDict['tsVec'] = self.tsVec.tolist()
-        try:
-            saveDict['n'] = self.n.tolist()
-        except:
-            saveDict['n'] = []
+        arrays, scalars = fu._seriesMembers(saveTs, self.tsHash, {'tsVec': self.tsVec})
+        arrays.update({'n': self.n, 'F': self.F})
+        scalars['isComputed'] = self.isComputed
+        scalars['flucParams'] = self.flucParams
+        fu._saveObject(outFileName + '.fathon', 'dfa', arrays, scalars)
+
+cdef class StreamDFA:
+    """Detrended Fluctuation Analysis class for a time series growing over time.
+
+    Only the segments completed by the new samples are detrended at each update,
+    and the fluctuations are computed from the segments starting from the beginning
+    of the time series, as in `DFA.computeFlucVec` with `revSeg` and `unbiased` False.
+
+    Parameters
+    ----------
+    winSizes : numpy ndarray
+        Array of window's sizes.
+    polOrd : int, optional
+        Order of the polynomial to be fitted in each window (default : 1).
+    method : str, optional
+        Detrending method, same as in `DFA.computeFlucVec` (default : 'gsl').
+    aggregate : bool, optional
+        If True, the samples are integrated as they arrive, giving the same results
+        of a DFA of `fathonUtils.toAggregated` of the whole time series, since the
+        subtraction of the mean only adds a linear trend removed by the fits (default : False).
+    nanPolicy : str, optional
+        Handling of NaNs in the new samples, same as in `DFA` (default : 'omit').
+    lastRunStats : dict
+        Statistics of the last update, None if it was not profiled (see
+        `fathonUtils.setProfiling`).
+    """
+
+    cdef:
+        np.ndarray n, tail, nSegs, fSum
+        int polOrd, fitMethod
+        bint aggregate
+        str nanPolicy
+        long long tsLen, tailStart
+        double lastSample
+    cdef readonly dict lastRunStats
+
+    def __init__(self, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, int polOrd=1, str method='gsl', bint aggregate=False, str nanPolicy='omit'):
+        self.fitMethod = fu._fitMethodCode(method, polOrd)
+
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if nanPolicy not in fu._nanPolicies:
+            raise ValueError('Error: Unknown nanPolicy `{}`. Expected one of {}.'.format(nanPolicy, ', '.join(fu._nanPolicies)))
+
+        self.n = np.array(winSizes, dtype=ctypes.c_int)
+        self.polOrd = polOrd
+        self.aggregate = aggregate
+        self.nanPolicy = nanPolicy
+        self.tsLen = 0
+        self.tailStart = 0
+        self.lastSample = 0.0
+        self.tail = np.zeros((0, ), dtype=ctypes.c_double)
+        self.nSegs = np.zeros((len(self.n), ), dtype=np.int64)
+        self.fSum = np.zeros((len(self.n), ), dtype=ctypes.c_double)
+
+    def __len__(self):
+        return self.tsLen
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def append(self, samples):
+        """Update of the fluctuations with new samples of the time series.
+
+        Parameters
+        ----------
+        samples : float or iterable
+            New samples of the time series.
+
+        Returns
+        -------
+        numpy ndarray
+            Array `n` of window's sizes.
+        numpy ndarray
+            Array `F` containing the values of the fluctuations in each window,
+            NaN for the windows without completed segments.
+        """
+        cdef int nLen = len(self.n)
+        cdef int tailLen
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects, t, vecf
+        cdef np.ndarray[int, ndim=1, mode='c'] starts, nNew, vecn = self.n
+
+        profStart = fu._profileBegin()
+        newVec = fu._inputSeries(np.atleast_1d(samples), self.nanPolicy)
+        if len(newVec) == 0:
+            self.lastRunStats = fu._runStats(profStart, self.n)
+            return self.getFlucVec()
+
+        profThreads = _profileStart(profStart, nLen)
         try:
-            saveDict['F'] = self.F.tolist()
-        except:
-            saveDict['F'] = []
-        saveDict['isComputed'] = self.isComputed
+            if self.aggregate:
+                newVec = np.cumsum(newVec) + self.lastSample
+                self.lastSample = newVec[len(newVec)-1]
+
+            vects = np.concatenate((self.tail, newVec))
+            countBytes(vects.nbytes)
+            tailLen = len(vects)
+            self.tsLen += len(newVec)
+
+            segs = (self.tsLen // self.n).astype(np.int64)
+            nNew = np.array(segs - self.nSegs, dtype=ctypes.c_int)
+            starts = np.array(self.nSegs * self.n - self.tailStart, dtype=ctypes.c_int)
+            if np.any(nNew > 0):
+                t = np.arange(self.tailStart, self.tailStart + tailLen, dtype=ctypes.c_double) + 1.0
+                countBytes(t.nbytes)
+                vecf = self.fSum
+                with nogil:
+                    flucDFAStreamUpdate(&vects[0], &t[0], tailLen, &starts[0], &nNew[0], &vecn[0], nLen, self.polOrd, self.fitMethod, &vecf[0])
+                self.nSegs = segs
+        finally:
+            counters = _profileStop(profStart, profThreads, nLen)
+        self.lastRunStats = fu._runStats(profStart, self.n, counters)
+
+        # only the samples of the segments not completed yet are kept
+        newStart = np.min(self.nSegs * self.n)
+        self.tail = np.array(vects[newStart-self.tailStart:], dtype=ctypes.c_double)
+        self.tailStart = newStart
+
+        return self.getFlucVec()
+
+    def getFlucVec(self):
+        """Current values of the fluctuations in each window.
+
+        Returns
+        -------
+        numpy ndarray
+            Array `n` of window's sizes.
+        numpy ndarray
+            Array `F` containing the values of the fluctuations in each window,
+            NaN for the windows without completed segments.
+        """
+        F = np.full((len(self.n), ), np.nan, dtype=ctypes.c_double)
+        done = self.nSegs > 0
+        F[done] = np.sqrt(self.fSum[done] / (self.nSegs[done] * self.n[done]))
+
+        return self.n, F
+
+    def fitFlucVec(self, int nStart=-999, int nEnd=-999, float logBase=np.e, bint verbose=False):
+        """Fit of the current fluctuations values.
+
+        Parameters
+        ----------
+        nStart : int, optional
+            Size of the smaller window used to fit `F` (default : first value of `n`).
+        nEnd : int, optional
+            Size of the bigger window used to fit `F` (default : last value of `n`).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        verbose : bool, optional
+            Verbosity (default : False).
+
+        Returns
+        -------
+        float
+            Slope of the fit.
+        float
+            Intercept of the fit.
+        """
+        n, F = self.getFlucVec()
+        if nEnd == -999:
+            nEnd = n[-1]
+        if nEnd in n and np.isnan(F[np.where(n==nEnd)[0][0]]):
+            raise ValueError('Error: Window\'s size {} has no completed segments yet.'.format(nEnd))
 
-        f = open(outFileName + '.fathon', 'wb')
-        pickle.dump(saveDict, f)
-        f.close()
+        H, H_intercept = fu._batchFit(n, F, nStart, nEnd, logBase)
+        if verbose:
+            print('Fit limits: [{}, {}]'.format(n[0] if nStart == -999 else nStart, nEnd))
+            print('Fit result: H intercept = {:.2f}, H = {:.2f}'.format(H_intercept, H))
 
+        return float(H), float(H_intercept)
@@ -16,6 +16,38 @@
 
 import numpy as np
 import pickle
+import json
+import struct
+import hashlib
+import os
+import time
+import collections
+
+# detrending methods, codes must match the FIT_* macros in cLoops.h
+_fitMethods = {'gsl': 0, 'direct': 1, 'fast': 2, 'ortho': 3}
+# instruction sets of the residual kernels, in the order of the SIMD_* macros in cFuncs.h
+_simdLevels = ('scalar', 'avx2', 'avx512')
+# policies for NaNs in the input time series
+_nanPolicies = ('omit', 'raise', 'propagate')
+# precisions of the stored time series, single precision has its own loops for these methods
+_seriesDtypes = (np.dtype(np.float64), np.dtype(np.float32))
+_singleMethods = ('direct', 'ortho')
+# elements scanned at once when looking for NaNs
+_NAN_SCAN_BLOCK = 1 << 20
+# binary `.fathon` files: magic string and version, followed by the length of a
+# JSON header and by the raw arrays, each one aligned to _FATHON_ALIGN bytes
+_FATHON_MAGIC = b'\x93FATHON'
+_FATHON_VERSION = 1
+_FATHON_ALIGN = 64
+# opt-in cache of the fluctuations, see `setResultCache`
+_resultCache = collections.OrderedDict()
+_resultCacheConf = {'maxBytes': 0, 'cacheDir': None, 'bytes': 0}
+_RESULT_CACHE_PREFIX = 'fathon-'
+# default number of threads, see `setNumThreads`
+_threadsConf = {'nJobs': None}
+# opt-in profiling of the computations, see `setProfiling`; phases in the order of the PROF_* macros in cLoops.h
+_profileConf = {'enabled': False}
+_profilePhases = ('input', 'setup', 'segments', 'reduce')
 
 def subtractMean(vec):
     """Subtracts mean of a vector.
@@ -134,6 +166,129 @@ def powRangeByCount(start, end, count=-1, base=2):
         
     return np.power(base, exponents, dtype=np.int64)
 
+def seriesHash(tsVec, tsVec2=None):
+    """SHA-256 hash of the content of one or two time series, as stored by objects saved without them.
+
+    Parameters
+    ----------
+    tsVec : iterable
+        Time series, after the removal of NaNs.
+    tsVec2 : iterable, optional
+        Second time series, for two-series objects (default : None).
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the hash.
+    """
+    h = hashlib.sha256()
+    for vec in [tsVec] if tsVec2 is None else [tsVec, tsVec2]:
+        vec = np.ascontiguousarray(vec, dtype='<f8')
+        h.update(struct.pack('<Q', len(vec)))
+        h.update(memoryview(vec).cast('B'))
+
+    return h.hexdigest()
+
+def setNumThreads(nJobs=None):
+    """Set the number of threads used by the computations of fathon.
+
+    It can be overridden in each computation with its `nJobs` argument.
+
+    Parameters
+    ----------
+    nJobs : int, optional
+        Number of threads, negative values are counted back from the number of CPUs
+        (-1 uses all of them), None restores the OpenMP default, which can be set with
+        the `OMP_NUM_THREADS` environment variable (default : None).
+    """
+    _threadsConf['nJobs'] = None if nJobs is None else _numThreads(nJobs)
+
+def simdInfo():
+    """Instruction set used by the residual kernels of the computations of fathon.
+
+    When fathon is imported, the widest instruction set supported by the CPU whose
+    kernels agree with the scalar ones on a self-test is selected. The selection can
+    be capped by setting the `FATHON_SIMD` environment variable to 'scalar', 'avx2'
+    or 'avx512' before importing fathon.
+
+    Returns
+    -------
+    str
+        Instruction set in use, one of 'scalar', 'avx2' and 'avx512'.
+    dict
+        Result of the self-test of each instruction set, True if its kernels agree
+        with the scalar ones, False if they do not, None if it is not available on
+        this CPU or build.
+    """
+    from . import dfa
+
+    level, selfTests = dfa._simdKernels()
+
+    return _simdLevels[level], {name: (None if res < 0 else bool(res)) for name, res in zip(_simdLevels, selfTests)}
+
+def setResultCache(maxBytes=256 * 1024 * 1024, cacheDir=None):
+    """Enable the cache of the fluctuations computed by `DFA`, `MFDFA`, `DCCA` and `MFDCCA`.
+
+    Results are stored by hash of the time series, algorithm and parameters of `computeFlucVec`,
+    so that repeated computations return immediately. The least recently used results are
+    evicted when the cache exceeds its size.
+
+    Parameters
+    ----------
+    maxBytes : int, optional
+        Maximum size of the cache in bytes, 0 disables the cache (default : 256 MiB).
+    cacheDir : str, optional
+        If given, results are also stored in this directory, bounded by the same size,
+        and shared between sessions (default : None).
+    """
+    if maxBytes < 0:
+        raise ValueError('Error: `maxBytes` must not be negative.')
+    if cacheDir is not None:
+        os.makedirs(cacheDir, exist_ok=True)
+
+    _resultCacheConf['maxBytes'] = int(maxBytes)
+    _resultCacheConf['cacheDir'] = cacheDir
+    _evictResults()
+
+def clearResultCache():
+    """Remove all the results from the cache, including the ones stored on disk."""
+    _resultCache.clear()
+    _resultCacheConf['bytes'] = 0
+    for path, _, _ in _diskResults():
+        os.remove(path)
+
+def setProfiling(enabled=True):
+    """Enable the profiling of the computations of fathon.
+
+    While enabled, `computeFlucVec` and `extendFlucVec` of `DFA`, `MFDFA`, `DCCA` and `MFDCCA`,
+    `computeRho` and `rhoThresholds` of `DCCA`, `computeHt` of `HT` and `append` of `StreamDFA`
+    store the statistics of their last call in the `lastRunStats` member of the object, which
+    is None while profiling is disabled. The statistics are a dict with keys:
+
+    - 'wallTime' : wall time of the call, in seconds;
+    - 'phases' : dict of the wall time of each phase, in seconds: 'input' (preparation of the
+      time series), 'setup' (split of the windows in tasks and cumulative sums), 'segments'
+      (parallel detrending of the segments), 'reduce' (fluctuations from the sums of the
+      segments) and 'other' (checks, cache and the rest of the call);
+    - 'fits' : number of polynomial fits, one for each segment of each time series;
+    - 'bytesAllocated' : bytes allocated by the computation, including the temporary arrays of
+      the Python wrappers and not including the internal workspace of GSL fits;
+    - 'threadBusy' : numpy ndarray of the time spent by each thread on the segments, in seconds;
+    - 'winSizes' : numpy ndarray of the window's sizes (scales for `HT`) computed;
+    - 'winCost' : numpy ndarray of the time spent on each window's size, summed over the threads;
+    - 'cached' : True if the result was taken from the cache of `setResultCache`.
+
+    When disabled, the C loops only test a pointer once per task. Each computation has its own
+    counters, so computations running at the same time from different Python threads are
+    profiled apart; the setting is read when a computation starts.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Whether the computations are profiled (default : True).
+    """
+    _profileConf['enabled'] = bool(enabled)
+
 def getObjectMember(fileName, memberName):
     """Return member of a previously saved object. Member's name is the same of the object's member it refers to. Member `isComputed` has no practical use and cannot be retrieved.
 
@@ -147,11 +302,44 @@ def getObjectMember(fileName, memberName):
     Returns
     -------
     numpy ndarray
-        Object's member.
+        Object's member. Arrays of binary files are memory-mapped read-only,
+        so that only the requested member is read from disk.
     """
     if fileName.split('.')[-1] != 'fathon':
         raise ValueError('Error: Not recognized extension.')
 
+    with open(fileName, 'rb') as f:
+        header = _readHeader(f)
+    if header is None:
+        return _getPickledMember(fileName, memberName)
+
+    if memberName == 'isComputed':
+        raise ValueError('Error: Member not present.')
+    if memberName in header['arrays']:
+        info = header['arrays'][memberName]
+        if int(np.prod(info['shape'])) == 0:
+            return np.zeros(info['shape'], dtype=info['dtype'])
+        return np.memmap(fileName, dtype=info['dtype'], mode='r', offset=info['offset'], shape=tuple(info['shape']))
+    if memberName in header['scalars']:
+        return header['scalars'][memberName]
+
+    raise ValueError('Error: Member not present.')
+
+def _getPickledMember(fileName, memberName):
+    """Member of an object saved with the former pickle format.
+
+    Parameters
+    ----------
+    fileName : str
+        Path to a previously saved `.fathon` file.
+    memberName : str
+        Desired member's name.
+
+    Returns
+    -------
+    numpy ndarray
+        Object's member.
+    """
     f = open(fileName, 'rb')
     data = pickle.load(f)
     f.close()
@@ -164,3 +352,842 @@ def getObjectMember(fileName, memberName):
 
     return ret
 
+def _saveObject(fileName, kind, arrays, scalars={}):
+    """Save the members of an object to a binary `.fathon` file.
+
+    Parameters
+    ----------
+    fileName : str
+        Output file.
+    kind : str
+        Kind of the object.
+    arrays : dict
+        Array members of the object, None for the members not computed yet.
+    scalars : dict
+        Boolean, numeric or string members of the object (default : {}).
+    """
+    arrays = {name: np.zeros((0, ), dtype=float) if vec is None else np.ascontiguousarray(vec) for name, vec in arrays.items()}
+    header = {'version': _FATHON_VERSION, 'kind': kind, 'scalars': dict(scalars), 'arrays': {}}
+
+    # offsets depend on the header length, which depends on the offsets,
+    # so the header is padded to a multiple of _FATHON_ALIGN bytes
+    headerLen = 0
+    while True:
+        offset = len(_FATHON_MAGIC) + 1 + 4 + headerLen
+        for name, vec in arrays.items():
+            offset = -(-offset // _FATHON_ALIGN) * _FATHON_ALIGN
+            header['arrays'][name] = {'dtype': vec.dtype.str, 'shape': list(vec.shape), 'offset': offset}
+            offset += vec.nbytes
+        headerBytes = json.dumps(header).encode('utf-8')
+        if len(headerBytes) <= headerLen:
+            break
+        headerLen = -(-len(headerBytes) // _FATHON_ALIGN) * _FATHON_ALIGN
+
+    with open(fileName, 'wb') as f:
+        f.write(_FATHON_MAGIC + struct.pack('<BI', _FATHON_VERSION, headerLen))
+        f.write(headerBytes.ljust(headerLen, b' '))
+        for name, vec in arrays.items():
+            f.write(b'\0' * (header['arrays'][name]['offset'] - f.tell()))
+            vec.tofile(f)
+
+def _seriesMembers(saveTs, tsHash, series):
+    """Members of a saved object describing its time series.
+
+    Parameters
+    ----------
+    saveTs : bool
+        Whether the time series has to be saved.
+    tsHash : str
+        Hash of the time series of an object loaded from a file saved without it, None otherwise.
+    series : dict
+        Time series of the object.
+
+    Returns
+    -------
+    dict
+        Array members, the time series if they are saved.
+    dict
+        Scalar members, the hash of the time series if they are not saved.
+    """
+    if saveTs and tsHash is None:
+        return dict(series), {}
+    if tsHash is None:
+        tsHash = seriesHash(*series.values())
+
+    return {}, {'tsHash': tsHash}
+
+def _readHeader(f):
+    """Header of a binary `.fathon` file.
+
+    Parameters
+    ----------
+    f : file
+        File opened in binary mode at its beginning.
+
+    Returns
+    -------
+    dict
+        Header of the file, None if the file has the former pickle format.
+    """
+    start = f.read(len(_FATHON_MAGIC) + 1 + 4)
+    if start[:len(_FATHON_MAGIC)] != _FATHON_MAGIC:
+        return None
+    version, headerLen = struct.unpack('<BI', start[len(_FATHON_MAGIC):])
+    if version > _FATHON_VERSION:
+        raise ValueError('Error: File version {} is not supported, please update fathon.'.format(version))
+
+    return json.loads(f.read(headerLen).decode('utf-8'))
+
+def _loadObject(fileName):
+    """Load all the members of a previously saved object.
+
+    Parameters
+    ----------
+    fileName : str
+        Path to a `.fathon` file, either binary or with the former pickle format.
+
+    Returns
+    -------
+    dict
+        Members of the object, including its kind.
+    """
+    with open(fileName, 'rb') as f:
+        header = _readHeader(f)
+        if header is None:
+            f.seek(0)
+            return pickle.load(f)
+
+        data = dict(header['scalars'])
+        data['kind'] = header['kind']
+        for name, info in header['arrays'].items():
+            f.seek(info['offset'])
+            count = int(np.prod(info['shape']))
+            data[name] = np.fromfile(f, dtype=info['dtype'], count=count).reshape(info['shape'])
+
+    return data
+
+def _numThreads(nJobs):
+    """Number of threads of a computation.
+
+    Parameters
+    ----------
+    nJobs : int
+        Number of threads of the computation, see `setNumThreads`, None for the default
+        set with `setNumThreads`.
+
+    Returns
+    -------
+    int
+        Number of threads, 0 for the OpenMP default.
+    """
+    if nJobs is None:
+        nJobs = _threadsConf['nJobs']
+        if nJobs is None:
+            return 0
+    if nJobs == 0:
+        raise ValueError('Error: `nJobs` must not be 0.')
+    if nJobs < 0:
+        nJobs = max(os.cpu_count() + 1 + nJobs, 1)
+
+    return int(nJobs)
+
+def _profileBegin():
+    """Start time of a profiled computation.
+
+    Returns
+    -------
+    float
+        Start time, None if profiling is disabled (see `setProfiling`).
+    """
+    return time.perf_counter() if _profileConf['enabled'] else None
+
+def _runStats(start, winSizes, counters=None, cached=False):
+    """Statistics of a profiled computation, see `setProfiling`.
+
+    Parameters
+    ----------
+    start : float
+        Start time of the computation, see `_profileBegin`.
+    winSizes : numpy ndarray
+        Window's sizes computed.
+    counters : tuple, optional
+        Wall time of the phases, numbers of fits and of bytes allocated, busy time of the threads
+        and cost of the windows, as returned by the C loops, None if they did not run (default : None).
+    cached : bool, optional
+        Whether the result was taken from the cache (default : False).
+
+    Returns
+    -------
+    dict
+        Statistics of the computation, None if it was not profiled.
+    """
+    if start is None:
+        return None
+
+    wallTime = time.perf_counter() - start
+    if counters is None:
+        counters = (np.zeros(len(_profilePhases)), np.zeros(2, dtype=np.int64), np.zeros(0), np.zeros(len(winSizes)))
+    phases, counts, threadBusy, winCost = counters
+    phases = dict(zip(_profilePhases, phases.tolist()))
+    phases['other'] = max(wallTime - sum(phases.values()), 0.0)
+
+    return {'wallTime': wallTime, 'phases': phases, 'fits': int(counts[0]), 'bytesAllocated': int(counts[1]),
+            'threadBusy': threadBusy, 'winSizes': np.array(winSizes, dtype=np.int64), 'winCost': winCost, 'cached': cached}
+
+def _cacheKey(kind, series, params):
+    """Key of a result in the cache.
+
+    Parameters
+    ----------
+    kind : str
+        Kind of the object.
+    series : tuple
+        Time series of the object.
+    params : dict
+        Parameters of the computation.
+
+    Returns
+    -------
+    str
+        Key of the result, None if the cache is disabled.
+    """
+    if _resultCacheConf['maxBytes'] == 0:
+        return None
+
+    # hashes do not depend on the precision of the series, while results do
+    dtypes = [str(vec.dtype) for vec in series if vec.dtype != np.float64]
+    if len(dtypes) > 0:
+        params = dict(params, dtype=tuple(dtypes))
+    h = hashlib.sha256(seriesHash(*series).encode('utf-8'))
+    h.update(repr((kind, sorted(params.items()))).encode('utf-8'))
+
+    return h.hexdigest()
+
+def _cacheGet(key):
+    """Result stored in the cache.
+
+    Parameters
+    ----------
+    key : str
+        Key of the result, see `_cacheKey`.
+
+    Returns
+    -------
+    tuple
+        Copies of the arrays of the result, None if it is not in the cache.
+    """
+    if key is None:
+        return None
+    if key in _resultCache:
+        _resultCache.move_to_end(key)
+        return tuple(np.array(vec) for vec in _resultCache[key])
+
+    cacheDir = _resultCacheConf['cacheDir']
+    if cacheDir is not None:
+        path = os.path.join(cacheDir, _RESULT_CACHE_PREFIX + key + '.npz')
+        if os.path.exists(path):
+            with np.load(path) as data:
+                result = tuple(data['arr_{}'.format(i)] for i in range(len(data.files)))
+            os.utime(path)
+            _cachePut(key, result, toDisk=False)
+            return tuple(np.array(vec) for vec in result)
+
+    return None
+
+def _cachePut(key, result, toDisk=True):
+    """Store a result in the cache.
+
+    Parameters
+    ----------
+    key : str
+        Key of the result, see `_cacheKey`.
+    result : tuple
+        Arrays of the result.
+    toDisk : bool, optional
+        Whether the result is also stored on disk, if a directory is set (default : True).
+    """
+    if key is None:
+        return
+
+    result = tuple(np.array(vec) for vec in result)
+    if key in _resultCache:
+        _resultCacheConf['bytes'] -= sum(vec.nbytes for vec in _resultCache.pop(key))
+    _resultCache[key] = result
+    _resultCacheConf['bytes'] += sum(vec.nbytes for vec in result)
+
+    cacheDir = _resultCacheConf['cacheDir']
+    if toDisk and cacheDir is not None:
+        path = os.path.join(cacheDir, _RESULT_CACHE_PREFIX + key + '.npz')
+        tmpPath = path + '.{}.tmp'.format(os.getpid())
+        with open(tmpPath, 'wb') as f:
+            np.savez(f, *result)
+        os.replace(tmpPath, path)
+
+    _evictResults()
+
+def _diskResults():
+    """Results stored on disk, from the least recently used.
+
+    Returns
+    -------
+    list
+        Path, size and modification time of each stored result.
+    """
+    cacheDir = _resultCacheConf['cacheDir']
+    if cacheDir is None or not os.path.isdir(cacheDir):
+        return []
+
+    files = []
+    for name in os.listdir(cacheDir):
+        if name.startswith(_RESULT_CACHE_PREFIX) and name.endswith('.npz'):
+            st = os.stat(os.path.join(cacheDir, name))
+            files.append((os.path.join(cacheDir, name), st.st_size, st.st_mtime))
+
+    return sorted(files, key=lambda x: x[2])
+
+def _evictResults():
+    """Evict the least recently used results until the cache fits its size."""
+    maxBytes = _resultCacheConf['maxBytes']
+    while len(_resultCache) > 0 and _resultCacheConf['bytes'] > maxBytes:
+        _, result = _resultCache.popitem(last=False)
+        _resultCacheConf['bytes'] -= sum(vec.nbytes for vec in result)
+
+    files = _diskResults()
+    diskBytes = sum(size for _, size, _ in files)
+    for path, size, _ in files:
+        if diskBytes <= maxBytes:
+            break
+        os.remove(path)
+        diskBytes -= size
+
+def _missingWinSizes(isComputed, flucParams, n, moreWinSizes, tsLen):
+    """Window's sizes to be added to a computed fluctuations vector.
+
+    Parameters
+    ----------
+    isComputed : bool
+        Whether the fluctuations vector has been computed.
+    flucParams : dict
+        Parameters used to compute the fluctuations vector, None if unknown.
+    n : numpy ndarray
+        Array of window's sizes already computed.
+    moreWinSizes : iterable
+        Array of window's sizes to be added.
+    tsLen : int
+        Length of the time series.
+
+    Returns
+    -------
+    numpy ndarray
+        Sorted array of the window's sizes not in `n`.
+    """
+    if not isComputed:
+        raise ValueError('Error: Fluctuations vector has not been computed yet.')
+    if flucParams is None:
+        raise ValueError('Error: Parameters used to compute the fluctuations vector are not available, call `computeFlucVec` again.')
+
+    newN = np.setdiff1d(np.asarray(moreWinSizes, dtype=np.int64), n)
+    if len(newN) > 0:
+        if newN[-1] > tsLen:
+            raise ValueError('Error: `moreWinSizes` must be smaller than the input vector length.')
+        if newN[0] < (flucParams['polOrd'] + 2):
+            raise ValueError('Error: `moreWinSizes` must be at least equal to {}.'.format(flucParams['polOrd'] + 2))
+
+    return newN
+
+def _mergeFluc(n, F, newN, newF):
+    """Merge of the fluctuations computed in new windows.
+
+    Parameters
+    ----------
+    n : numpy ndarray
+        Array of window's sizes.
+    F : numpy ndarray
+        Fluctuations in the windows of `n`, along the last axis.
+    newN : numpy ndarray
+        Array of new window's sizes.
+    newF : numpy ndarray
+        Fluctuations in the windows of `newN`, along the last axis.
+
+    Returns
+    -------
+    numpy ndarray
+        Sorted array of window's sizes.
+    numpy ndarray
+        Fluctuations in the windows of the sorted array.
+    """
+    idx = np.argsort(np.concatenate((n, newN)), kind='stable')
+    mergedN = np.concatenate((n, newN.astype(n.dtype)))[idx]
+    mergedF = np.concatenate((F, newF), axis=-1)[..., idx]
+
+    return mergedN, np.ascontiguousarray(mergedF)
+
+def _checkSeries(tsLen, tsHash):
+    """Check that the time series of an object is available.
+
+    Parameters
+    ----------
+    tsLen : int
+        Length of the time series of the object.
+    tsHash : str
+        Hash of the time series of an object loaded from a file saved without it, None otherwise.
+    """
+    if tsLen == 0 and tsHash is not None:
+        raise ValueError('Error: Time series not available, the object has been loaded from a file saved without it.')
+
+def _fitMethodCode(method, polOrd):
+    """Code of a detrending method, as expected by the C loops.
+
+    Parameters
+    ----------
+    method : str
+        Name of the detrending method.
+    polOrd : int
+        Order of the polynomial to be fitted in each window.
+
+    Returns
+    -------
+    int
+        Code of the detrending method.
+    """
+    if method not in _fitMethods:
+        raise ValueError('Error: Unknown method `{}`. Expected one of {}.'.format(method, ', '.join(_fitMethods.keys())))
+    if method == 'fast' and polOrd > 2:
+        raise ValueError('Error: Method `fast` requires a polynomial order not greater than 2.')
+
+    return _fitMethods[method]
+
+def _isSeries(vec):
+    """Whether an input can be used as a time series.
+
+    Parameters
+    ----------
+    vec : object
+        Candidate time series.
+
+    Returns
+    -------
+    bool
+        True for lists, tuples and objects exposing the buffer protocol.
+    """
+    if isinstance(vec, (str, bytes)):
+        return False
+    if isinstance(vec, (list, tuple)):
+        return True
+    try:
+        memoryview(vec)
+    except TypeError:
+        return False
+
+    return True
+
+def _hasNan(vec):
+    """Whether an array contains NaNs, scanned in blocks to bound memory usage.
+
+    Parameters
+    ----------
+    vec : numpy ndarray
+        Array to be scanned.
+
+    Returns
+    -------
+    bool
+        True if `vec` contains at least one NaN.
+    """
+    for start in range(0, len(vec), _NAN_SCAN_BLOCK):
+        if np.isnan(vec[start:start+_NAN_SCAN_BLOCK]).any():
+            return True
+
+    return False
+
+def _seriesDtype(dtype):
+    """Precision of the stored time series.
+
+    Parameters
+    ----------
+    dtype : numpy dtype
+        Requested precision, numpy.float64 or numpy.float32.
+
+    Returns
+    -------
+    numpy dtype
+        Precision of the time series.
+    """
+    try:
+        dt = np.dtype(dtype)
+    except TypeError:
+        dt = None
+    if dt not in _seriesDtypes:
+        raise ValueError('Error: Unknown dtype `{}`. Expected one of {}.'.format(dtype, ', '.join(str(d) for d in _seriesDtypes)))
+
+    return dt
+
+def _storedSeries(vec):
+    """Time series loaded from a file, in double precision unless it was saved in single precision.
+
+    Parameters
+    ----------
+    vec : iterable
+        Loaded time series.
+
+    Returns
+    -------
+    numpy ndarray
+        Time series.
+    """
+    vec = np.asarray(vec)
+
+    return vec if vec.dtype == np.float32 else np.asarray(vec, dtype=float)
+
+def _singlePrecision(series, fitMethod):
+    """Whether the single precision loops can be used.
+
+    Parameters
+    ----------
+    series : tuple
+        Time series of the object.
+    fitMethod : int
+        Code of the detrending method.
+
+    Returns
+    -------
+    bool
+        True if all the time series are stored in single precision and the
+        method has single precision loops.
+    """
+    return fitMethod in [_fitMethods[m] for m in _singleMethods] and all(vec.dtype == np.float32 for vec in series)
+
+def _inputSeries(tsVec, nanPolicy, dtype=np.float64):
+    """Time series as a contiguous float array, copied only when needed.
+
+    Parameters
+    ----------
+    tsVec : iterable
+        Input time series. Contiguous float arrays, including numpy memmaps,
+        are used without copying them.
+    nanPolicy : str
+        'omit' removes NaNs (copying the time series only if it contains any),
+        'raise' raises an error if the time series contains NaNs, 'propagate'
+        does not look for NaNs.
+    dtype : numpy dtype, optional
+        Precision of the time series, numpy.float64 or numpy.float32 (default : numpy.float64).
+
+    Returns
+    -------
+    numpy ndarray
+        Time series.
+    """
+    if nanPolicy not in _nanPolicies:
+        raise ValueError('Error: Unknown nanPolicy `{}`. Expected one of {}.'.format(nanPolicy, ', '.join(_nanPolicies)))
+
+    vec = np.ascontiguousarray(tsVec, dtype=_seriesDtype(dtype))
+    if vec.ndim != 1:
+        vec = vec.ravel()
+    if nanPolicy != 'propagate' and _hasNan(vec):
+        if nanPolicy == 'raise':
+            raise ValueError('Error: Input vector contains NaN values.')
+        vec = vec[~np.isnan(vec)]
+
+    return vec
+
+def _toSeriesList(tsVecs):
+    """List of the time series of a batch, without NaNs.
+
+    Parameters
+    ----------
+    tsVecs : numpy ndarray or iterable
+        2-D array with a time series in each row, or list of time series.
+
+    Returns
+    -------
+    list
+        List of float arrays.
+    """
+    if isinstance(tsVecs, np.ndarray):
+        if tsVecs.ndim != 2:
+            raise ValueError('Error: Expected a 2-D array or a list of time series.')
+    elif not isinstance(tsVecs, (list, tuple)):
+        raise ValueError('Error: tsVecs type is {}. Expected 2-D numpy array, list, or tuple.'.format(type(tsVecs)))
+    if len(tsVecs) == 0:
+        raise ValueError('Error: At least one time series is required.')
+
+    seriesList = []
+    for ts in tsVecs:
+        ts = np.array(ts, dtype=float)
+        seriesList.append(ts[~np.isnan(ts)])
+
+    return seriesList
+
+def _packSeries(seriesList):
+    """Concatenation of the time series of a batch, as expected by the C loops.
+
+    Parameters
+    ----------
+    seriesList : list
+        List of float arrays.
+
+    Returns
+    -------
+    numpy ndarray
+        Concatenated time series.
+    numpy ndarray
+        Offset of each time series in the concatenated array.
+    numpy ndarray
+        Length of each time series.
+    """
+    lens = np.array([len(ts) for ts in seriesList], dtype=np.int64)
+    if np.sum(lens) > np.iinfo(np.intc).max:
+        raise ValueError('Error: Total length of the time series exceeds {}.'.format(np.iinfo(np.intc).max))
+    offsets = np.zeros((len(lens), ), dtype=np.int64)
+    offsets[1:] = np.cumsum(lens)[:-1]
+
+    return np.ascontiguousarray(np.concatenate(seriesList), dtype=np.float64), np.array(offsets, dtype=np.intc), np.array(lens, dtype=np.intc)
+
+def _batchFit(n, F, nStart, nEnd, logBase):
+    """Fit of the fluctuations values of a batch of time series.
+
+    Parameters
+    ----------
+    n : numpy ndarray
+        Array of window's sizes.
+    F : numpy ndarray
+        Array of fluctuations, whose last axis runs over the window's sizes.
+    nStart : int
+        Size of the smaller window used to fit `F` (-999 for first value of `n`).
+    nEnd : int
+        Size of the bigger window used to fit `F` (-999 for last value of `n`).
+    logBase : float
+        Base of the logarithm for the log-log fit of `n` vs `F`.
+
+    Returns
+    -------
+    numpy ndarray
+        Slopes of the fits, with the shape of `F` without its last axis.
+    numpy ndarray
+        Intercepts of the fits, with the shape of `F` without its last axis.
+    """
+    if len(n) < 2:
+        raise ValueError('Error: At least two points are required.')
+    if nStart == -999:
+        nStart = n[0]
+    if nEnd == -999:
+        nEnd = n[-1]
+    if nStart > nEnd:
+        raise ValueError('Error: Variable nEnd must be greater than variable nStart.')
+    if (nStart < n[0]) or (nEnd > n[-1]):
+        raise ValueError('Error: Fit limits must be included in interval [{}, {}].'.format(n[0], n[-1]))
+    if (nStart not in n) or (nEnd not in n):
+        raise ValueError('Error: Fit limits must be included in the window\'s sizes vector.')
+
+    start = np.where(n==nStart)[0][0]
+    end = np.where(n==nEnd)[0][0]
+    logF = np.log(F[..., start:end+1]) / np.log(logBase)
+    log_fit = np.polyfit(np.log(n[start:end+1]) / np.log(logBase), logF.reshape(-1, end - start + 1).T, 1)
+
+    return log_fit[0].reshape(F.shape[:-1]), log_fit[1].reshape(F.shape[:-1])
+
+def _segmentCosts(x, Y, minPoints):
+    """Squared residuals of the linear fits of all the segments of a curve.
+
+    Parameters
+    ----------
+    x : numpy ndarray
+        Abscissa of the points.
+    Y : numpy ndarray
+        2-D array with the ordinates of a curve in each row, fitted with the same segments.
+    minPoints : int
+        Minimum number of points of a segment.
+
+    Returns
+    -------
+    numpy ndarray
+        Matrix whose element (i, j) is the sum over the curves of the squared residuals
+        of the fit between points i and j included, inf for segments too short.
+    """
+    m = len(x)
+    i = np.arange(m)[:, None]
+    j = np.arange(m)[None, :]
+    cnt = (j - i + 1).astype(float)
+    valid = cnt >= minPoints
+    cnt[~valid] = 1.0
+
+    # sums over every segment from the prefix sums of x, y, x^2, xy and y^2
+    def prefix(v):
+        return np.concatenate(([0.0], np.cumsum(v)))
+
+    Sx = prefix(x)
+    Sxx = prefix(x * x)
+    sx = Sx[j + 1] - Sx[i]
+    varX = (Sxx[j + 1] - Sxx[i]) - sx * sx / cnt
+    varX[~valid] = 1.0
+
+    cost = np.zeros((m, m))
+    for y in Y:
+        Sy = prefix(y)
+        Sxy = prefix(x * y)
+        Syy = prefix(y * y)
+        sy = Sy[j + 1] - Sy[i]
+        covXY = (Sxy[j + 1] - Sxy[i]) - sx * sy / cnt
+        cost += (Syy[j + 1] - Syy[i]) - sy * sy / cnt - covXY * covXY / varX
+
+    cost = np.maximum(cost, 0.0)
+    cost[~valid] = np.inf
+
+    return cost
+
+def _piecewiseFit(n, F, nRegimes, minPoints, logBase, verbose=False, qList=None):
+    """Piecewise-linear fit of the fluctuations values in log-log scale.
+
+    The crossovers between the scaling regimes minimise the squared residuals of the
+    fits, summed over the rows of `F`, and are found by dynamic programming on the
+    residuals of all the segments.
+
+    Parameters
+    ----------
+    n : numpy ndarray
+        Array of window's sizes.
+    F : numpy ndarray
+        Array of fluctuations, or 2-D array with the fluctuations of a q-order in each row.
+    nRegimes : int
+        Number of scaling regimes, 0 to choose it with the Bayesian information criterion.
+    minPoints : int
+        Minimum number of window's sizes in each regime.
+    logBase : float
+        Base of the logarithm for the log-log fit of `n` vs `F`.
+    verbose : bool, optional
+        Verbosity (default : False).
+    qList : numpy ndarray, optional
+        q-orders of the rows of `F`, only used for verbosity (default : None).
+
+    Returns
+    -------
+    numpy ndarray
+        Sizes of the first window of each regime after the first one.
+    numpy ndarray
+        2-D array with the slopes of the fits in each regime for each row of `F`.
+    numpy ndarray
+        2-D array with the intercepts of the fits in each regime for each row of `F`.
+    """
+    m = len(n)
+    x = np.log(np.asarray(n, dtype=float)) / np.log(logBase)
+    Y = np.log(np.atleast_2d(F)) / np.log(logBase)
+
+    if minPoints < 2:
+        raise ValueError('Error: `minPoints` must be at least equal to 2.')
+    if nRegimes < 0:
+        raise ValueError('Error: `nRegimes` must not be negative.')
+    if max(nRegimes, 1) * minPoints > m:
+        raise ValueError('Error: At least {} window\'s sizes are required.'.format(max(nRegimes, 1) * minPoints))
+    if not np.all(np.isfinite(Y)):
+        raise ValueError('Error: Fluctuations must be positive and finite to be fitted in log-log scale.')
+
+    cost = _segmentCosts(x, Y, minPoints)
+    maxRegimes = nRegimes if nRegimes > 0 else m // minPoints
+
+    # best[k][j]: residuals of the best fit of points 0..j with k+1 regimes,
+    # first[k][j]: first point of the last regime of that fit
+    best = [cost[0]]
+    first = [np.zeros((m, ), dtype=int)]
+    for k in range(1, maxRegimes):
+        tot = best[-1][:-1, None] + cost[1:, :]
+        first.append(np.argmin(tot, axis=0) + 1)
+        best.append(tot[first[-1] - 1, np.arange(m)])
+
+    if nRegimes > 0:
+        numRegimes = nRegimes
+    else:
+        nObs = Y.size
+        sse = np.maximum(np.array([b[-1] for b in best]), np.finfo(float).tiny * nObs)
+        k = np.arange(1, maxRegimes + 1)
+        bic = nObs * np.log(sse / nObs) + (2 * k * len(Y) + k - 1) * np.log(nObs)
+        numRegimes = int(k[np.argmin(bic)])
+
+    starts = [0]
+    end = m - 1
+    for k in range(numRegimes - 1, 0, -1):
+        starts.insert(1, first[k][end])
+        end = starts[1] - 1
+    bounds = starts + [m]
+
+    H = np.zeros((len(Y), numRegimes))
+    H_intercept = np.zeros((len(Y), numRegimes))
+    for r in range(numRegimes):
+        log_fit = np.polyfit(x[bounds[r]:bounds[r+1]], Y[:, bounds[r]:bounds[r+1]].T, 1)
+        H[:, r] = log_fit[0]
+        H_intercept[:, r] = log_fit[1]
+        if verbose:
+            print('Fit limits: [{}, {}]'.format(n[bounds[r]], n[bounds[r+1]-1]))
+            for i in range(len(Y)):
+                qStr = '' if qList is None else ' for q = {:.2f}'.format(qList[i])
+                print('Fit result{}: H intercept = {:.2f}, H = {:.2f}'.format(qStr, H_intercept[i, r], H[i, r]))
+
+    return np.asarray(n)[starts[1:]], H, H_intercept
+
+def _multiFit(n, F, limitsList, logBase):
+    """Fit of the fluctuations values in many intervals, from the cumulative sums of the
+    log-log values.
+
+    Parameters
+    ----------
+    n : numpy ndarray
+        Array of window's sizes.
+    F : numpy ndarray
+        Array of fluctuations.
+    limitsList : numpy ndarray
+        kx2 array with the sizes of k starting and ending windows used to fit `F`.
+    logBase : float
+        Base of the logarithm for the log-log fit of `n` vs `F`.
+
+    Returns
+    -------
+    numpy ndarray
+        Slopes of the fits.
+    numpy ndarray
+        Intercepts of the fits.
+    numpy ndarray
+        Coefficients of determination of the fits.
+    """
+    limits = np.asarray(limitsList).reshape(-1, 2)
+
+    if np.any(limits[:, 0] > limits[:, 1]):
+        raise ValueError('Error: Variable nEnd must be greater than variable nStart.')
+    if np.any(limits[:, 0] < n[0]) or np.any(limits[:, 1] > n[-1]):
+        raise ValueError('Error: Fit limits must be included in interval [{}, {}].'.format(n[0], n[-1]))
+    if not np.all(np.isin(limits, n)):
+        raise ValueError('Error: Fit limits must be included in the window\'s sizes vector.')
+
+    # index of the first occurrence of each limit in n, as np.where in fitFlucVec,
+    # so that the fits use the windows between the limits in the order of n
+    order = np.argsort(n, kind='stable')
+    idx = order[np.searchsorted(n[order], limits)]
+    start = idx[:, 0]
+    end = idx[:, 1]
+    if np.any(end <= start):
+        raise ValueError('Error: At least two points are required.')
+
+    # centred values and extended precision keep the differences
+    # of the cumulative sums accurate on short intervals
+    x = np.log(n) / np.log(logBase)
+    y = np.log(F) / np.log(logBase)
+    x0 = np.mean(x)
+    y0 = np.mean(y)
+    x = (x - x0).astype(np.longdouble)
+    y = (y - y0).astype(np.longdouble)
+
+    def interval(v):
+        cs = np.concatenate(([0.0], np.cumsum(v)))
+        return cs[end + 1] - cs[start]
+
+    cnt = (end - start + 1).astype(float)
+    sx = interval(x)
+    sy = interval(y)
+    varX = interval(x * x) - sx * sx / cnt
+    varY = interval(y * y) - sy * sy / cnt
+    covXY = interval(x * y) - sx * sy / cnt
+
+    slopes = covXY / varX
+    intercepts = y0 + (sy - slopes * sx) / cnt - slopes * x0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rSquared = np.where(varY > 0.0, covXY * covXY / (varX * varY), 1.0)
+
+    return slopes.astype(float), intercepts.astype(float), np.minimum(rSquared, 1.0).astype(float)
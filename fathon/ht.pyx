@@ -21,12 +21,17 @@ cimport numpy as np
 cimport cython
 from cython.parallel import prange
 import ctypes
-import pickle
 from . import mfdfa
 from . import fathonUtils as fu
 	
 cdef extern from "cLoops.h" nogil:
-    double HTCompute(double *y, double *t, int scale, int N, int pol_ord, int v)
+    void flucHTCompute(double *y, double *t, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec)
+    void flucHTComputeF(float *y, int N, int *scales, int n_scales, int row_len, int pol_ord, int fit_method, double *f_vec)
+    int setNumThreads(int n_threads)
+    void countBytes(size_t n_bytes)
+    enum: FIT_DIRECT
+
+include "profile.pxi"
 
 cdef class HT:
     """Time-dependent local Hurst exponent class.
@@ -35,79 +40,117 @@ cdef class HT:
     ----------
     tsVec : iterable
         Time series used for the analysis.
+    nanPolicy : str, optional
+        Handling of NaNs in the input, 'omit' removes them, 'raise' raises an
+        error, 'propagate' keeps them (default : 'omit'). Contiguous float
+        arrays, including numpy memmaps, are used without being copied, so
+        they must not be modified while in use.
+    dtype : numpy dtype, optional
+        Precision of the stored time series, numpy.float64 or numpy.float32
+        (default : numpy.float64). Single precision halves the memory used by
+        the time series; with method 'ortho' the shifted segments are detrended
+        in single precision and the sums of the squared residuals are accumulated
+        in double precision, as well as in the MFDFA used to estimate the global
+        Hurst exponent with methods 'direct' and 'ortho'; the other methods use a
+        double precision copy of the time series. On the time series in
+        `tests/mat`, `ht` differs from the one of the double precision time series
+        by less than 1e-5 at `polOrd` 1.
     ht : numpy ndarray
         Time-dependent local Hurst exponent.
+    lastRunStats : dict
+        Statistics of the last computation, None if it was not profiled (see
+        `fathonUtils.setProfiling`); the statistics of the MFDFA estimating the
+        global Hurst exponent are in its 'mfdfa' key, None if `q0Fit` was given.
     """
 
     cdef:
         np.ndarray tsVec, ht
+        str tsHash
+    cdef readonly dict lastRunStats
 
-    def __init__(self, tsVec):
+    def __init__(self, tsVec, nanPolicy='omit', dtype=np.float64):
         if isinstance(tsVec, str):
             if len(tsVec.split('.')) > 1 and tsVec.split('.')[-1] == 'fathon':
-                f = open(tsVec, 'rb')
-                data = pickle.load(f)
-                f.close()
+                data = fu._loadObject(tsVec)
                 if data['kind'] != 'ht':
                     raise ValueError('Error: Loaded object is not a HT object.')
                 else:
-                    self.tsVec = np.array(data['tsVec'], dtype=float)
+                    self.tsVec = fu._storedSeries(data.get('tsVec', []))
+                    self.tsHash = data.get('tsHash')
                     self.ht = np.array(data['ht'], dtype=ctypes.c_double)
             else:
                 raise ValueError('Error: Not recognized extension.')
         else:
-            self.tsVec = np.array(tsVec, dtype=float)
-            self.tsVec = self.tsVec[~np.isnan(self.tsVec)]
+            self.tsVec = fu._inputSeries(tsVec, nanPolicy, dtype)
 		
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef cy_computeHt(self, np.ndarray[int, ndim=1, mode='c'] scales, int polOrd, int mfdfaPolOrd, np.ndarray[np.float64_t, ndim=1, mode='c'] q0Fit, bint verbose):
-        cdef int htRowLen, tsLen, scale
+    cdef cy_computeHt(self, np.ndarray[int, ndim=1, mode='c'] scales, int polOrd, int mfdfaPolOrd, np.ndarray[np.float64_t, ndim=1, mode='c'] q0Fit, bint verbose, str method, int nThreads, profStart):
+        cdef int htRowLen, tsLen, scale, nScales
         cdef Py_ssize_t i, j
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
         cdef double H0, H0_intercept
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects, vecht
+        cdef np.ndarray[np.float32_t, ndim=1, mode='c'] vectsF
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
         
         tsLen = len(self.tsVec)
+        nScales = len(scales)
         htRowLen = tsLen - min(scales) + 1
-        vects = np.array(self.tsVec, dtype=ctypes.c_double)
-        vecht = np.zeros((htRowLen * len(scales), ), dtype=ctypes.c_double)
+        vecht = np.zeros((htRowLen * nScales, ), dtype=ctypes.c_double)
         
         if len(q0Fit) == 0:
-            pymfdfa = mfdfa.MFDFA(self.tsVec)
+            pymfdfa = mfdfa.MFDFA(self.tsVec, dtype=self.tsVec.dtype)
             _, _ = pymfdfa.computeFlucVec(fu.linRangeByCount(10, int(tsLen / 4), count=20),
-                                          0.0, revSeg=True, polOrd=mfdfaPolOrd)
+                                          0.0, revSeg=True, polOrd=mfdfaPolOrd,
+                                          method='direct' if (method == 'fast' and mfdfaPolOrd > 2) else method,
+                                          nJobs=nThreads if nThreads > 0 else None)
             H0, H0_intercept = pymfdfa.fitFlucVec(verbose=verbose)
+            mfdfaStats = pymfdfa.lastRunStats
         else:
             if verbose:
                 print('Variable q0Fit assigned, variable mfdfaPolOrd will be ignored.')
             H0 = q0Fit[0]
             H0_intercept = q0Fit[1]
+            mfdfaStats = None
             
-        t = np.empty((tsLen, ), dtype=ctypes.c_double)
-        for j in prange(tsLen, nogil=True):
-            t[j] = float(j) + 1.0
-        
         if verbose:
             print('-----')
-        for i, scale in enumerate(scales):
-            if verbose:
-                print('scale = {}'.format(scale))
-                
-            for j in prange(tsLen - scale + 1, nogil=True):
-                vecht[i*htRowLen+j] = HTCompute(&vects[0], &t[0], scale, tsLen, polOrd, j)
-               
-            if verbose:
-                print('-----')
-                
-            for j in range(htRowLen):
-                if vecht[i*htRowLen+j] != 0.0:
-                    vecht[i*htRowLen+j] = (H0_intercept + H0 * np.log(scale) - np.log(vecht[i*htRowLen+j])) / (np.log(tsLen - scale + 1) - np.log(scale)) + H0
-                    
-        return np.reshape(vecht, (len(scales), htRowLen))
+            print('scales = {}'.format(scales.tolist()))
+            print('-----')
+
+        # the profile of the C loops starts after the MFDFA, which has its own statistics
+        profThreads = _profileStart(profStart, nScales)
+        try:
+            # the shifts of `direct` are updated point by point in double precision
+            if fu._singlePrecision((self.tsVec, ), fitMethod) and fitMethod != FIT_DIRECT:
+                vectsF = self.tsVec
+                with nogil:
+                    flucHTComputeF(&vectsF[0], tsLen, &scales[0], nScales, htRowLen, polOrd, fitMethod, &vecht[0])
+            else:
+                vects = np.ascontiguousarray(self.tsVec, dtype=ctypes.c_double)
+                if vects is not self.tsVec:
+                    countBytes(vects.nbytes)
+                t = np.empty((tsLen, ), dtype=ctypes.c_double)
+                countBytes(t.nbytes)
+                for j in prange(tsLen, nogil=True):
+                    t[j] = float(j) + 1.0
+                with nogil:
+                    flucHTCompute(&vects[0], &t[0], tsLen, &scales[0], nScales, htRowLen, polOrd, fitMethod, &vecht[0])
+        finally:
+            counters = _profileStop(profStart, profThreads, nScales)
+
+        ht = np.reshape(vecht, (nScales, htRowLen))
+        for i in range(nScales):
+            scale = scales[i]
+            row = ht[i]
+            mask = row != 0.0
+            row[mask] = (H0_intercept + H0 * np.log(scale) - np.log(row[mask])) / (np.log(tsLen - scale + 1) - np.log(scale)) + H0
+
+        return ht, counters, mfdfaStats
 		
-    def computeHt(self, scales, polOrd=1, mfdfaPolOrd=1, q0Fit=[], verbose=False):
+    def computeHt(self, scales, polOrd=1, mfdfaPolOrd=1, q0Fit=[], verbose=False, method='gsl', nJobs=None):
         """Computation of the time-dependent local Hurst exponent at each scale, using Ihlen's approach.
         
         Parameters
@@ -124,12 +167,25 @@ cdef class HT:
             used to compute the time-dependent local Hurst exponent, ignoring `mfdfaPolOrd` value (default : []).
         verbose : bool, optional
             Verbosity (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial basis
+            shared by all the windows of the same size and stays accurate at high
+            `polOrd`, 'fast' computes the fluctuations from cumulative sums of the
+            time series and requires `polOrd` not greater than 2 (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
         numpy ndarray
             Time-dependent local Hurst exponent.
         """
+        nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(len(self.tsVec), self.tsHash)
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
         if mfdfaPolOrd < 1:
@@ -153,26 +209,29 @@ cdef class HT:
             raise ValueError('Error: scales type is {}. Expected int, list, or numpy array.'.format(type(scales)))
          
         q0Fit = np.array(q0Fit, dtype=ctypes.c_double)
-        self.ht = self.cy_computeHt(scales, polOrd, mfdfaPolOrd, q0Fit, verbose)
+        prevThreads = setNumThreads(nThreads)
+        try:
+            self.ht, counters, mfdfaStats = self.cy_computeHt(scales, polOrd, mfdfaPolOrd, q0Fit, verbose, method, nThreads, profStart)
+        finally:
+            setNumThreads(prevThreads)
+        self.lastRunStats = fu._runStats(profStart, scales, counters)
+        if self.lastRunStats is not None:
+            self.lastRunStats['mfdfa'] = mfdfaStats
         
         return self.ht
 
-    def saveObject(self, outFileName):
+    def saveObject(self, outFileName, saveTs=True):
         """Save current object state to binary file.
         
         Parameters
         ----------
         outFileName : str
             Output binary file. `.fathon` extension will be appended to the file name.
+        saveTs : bool, optional
+            If False, only the results are saved and the time series is replaced by its
+            hash (see `fathonUtils.seriesHash`); the object loaded from the file can fit
+            the saved results but cannot compute new ones (default : True).
         """
-        saveDict = {}
-        saveDict['kind'] = 'ht'
-        saveDict['tsVec'] = self.tsVec.tolist()
-        try:
-            saveDict['ht'] = self.ht.tolist()
-        except:
-            saveDict['ht'] = []
-
-        f = open(outFileName + '.fathon', 'wb')
-        pickle.dump(saveDict, f)
-        f.close()
+        arrays, scalars = fu._seriesMembers(saveTs, self.tsHash, {'tsVec': self.tsVec})
+        arrays.update({'ht': self.ht})
+        fu._saveObject(outFileName + '.fathon', 'ht', arrays, scalars)
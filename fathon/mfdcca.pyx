@@ -21,12 +21,16 @@ cimport numpy as np
 cimport cython
 from cython.parallel import prange
 import ctypes
-import pickle
+from . import fathonUtils as fu
 import warnings
 
 cdef extern from "cLoops.h" nogil:
-    void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
-    void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+    void flucMFDCCAForwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+    void flucMFDCCAForwBackwCompute(double *y1, double *y2, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+    int setNumThreads(int n_threads)
+    void countBytes(size_t n_bytes)
+
+include "profile.pxi"
 
 cdef class MFDCCA:
     """MultiFractal Detrended Cross-Correlation Analysis class.
@@ -39,6 +43,11 @@ cdef class MFDCCA:
         First time series used for the analysis.
     tsVec2 : iterable
         Second time series used for the analysis.
+    nanPolicy : str, optional
+        Handling of NaNs in the input, 'omit' removes them, 'raise' raises an
+        error, 'propagate' keeps them (default : 'omit'). Contiguous float
+        arrays, including numpy memmaps, are used without being copied, so
+        they must not be modified while in use.
     F : numpy ndarray
         Array containing the values of the fluctuations in each window.
     listH : numpy ndarray
@@ -48,24 +57,30 @@ cdef class MFDCCA:
     isComputed : bool
         Boolean value to know if `F` has been computed in order to prevent the
         computation of other functions that need `F`.
+    lastRunStats : dict
+        Statistics of the last computation, None if it was not profiled (see
+        `fathonUtils.setProfiling`).
     """
 
     cdef:
         np.ndarray n
         np.ndarray tsVec1, tsVec2, F, listH, qList
         bint isComputed
+        str tsHash
+        dict flucParams
+    cdef readonly dict lastRunStats
 
-    def __init__(self, tsVec1, tsVec2=[]):
+    def __init__(self, tsVec1, tsVec2=[], nanPolicy='omit'):
         if isinstance(tsVec1, str) and len(tsVec2) == 0:
             if len(tsVec1.split('.')) > 1 and tsVec1.split('.')[-1] == 'fathon':
-                f = open(tsVec1, 'rb')
-                data = pickle.load(f)
-                f.close()
+                data = fu._loadObject(tsVec1)
                 if data['kind'] != 'mfdcca':
                     raise ValueError('Error: Loaded object is not a MFDFA object.')
                 else:
-                    self.tsVec1 = np.array(data['tsVec1'], dtype=float)
-                    self.tsVec2 = np.array(data['tsVec2'], dtype=float)
+                    self.tsVec1 = np.asarray(data.get('tsVec1', []), dtype=float)
+                    self.tsVec2 = np.asarray(data.get('tsVec2', []), dtype=float)
+                    self.tsHash = data.get('tsHash')
+                    self.flucParams = data.get('flucParams')
                     self.n = np.array(data['n'], dtype=ctypes.c_int)
                     self.F = np.array(data['F'], dtype=ctypes.c_double)
                     self.listH = np.array(data['listH'], dtype=ctypes.c_double)
@@ -73,12 +88,10 @@ cdef class MFDCCA:
                     self.isComputed = data['isComputed']
             else:
                 raise ValueError('Error: Not recognized extension.')
-        elif (isinstance(tsVec1, list) or isinstance(tsVec1, np.ndarray)) and (isinstance(tsVec2, list) or isinstance(tsVec2, np.ndarray)):
+        elif fu._isSeries(tsVec1) and fu._isSeries(tsVec2):
             if len(tsVec1) != 0 and len(tsVec2) != 0:
-                self.tsVec1 = np.array(tsVec1, dtype=float)
-                self.tsVec1 = self.tsVec1[~np.isnan(self.tsVec1)]
-                self.tsVec2 = np.array(tsVec2, dtype=float)
-                self.tsVec2 = self.tsVec2[~np.isnan(self.tsVec2)]
+                self.tsVec1 = fu._inputSeries(tsVec1, nanPolicy)
+                self.tsVec2 = fu._inputSeries(tsVec2, nanPolicy)
                 if len(self.tsVec1) != len(self.tsVec2):
                     warnings.warn("Warning: Input vectors have different length. The longest vector has been reduced to the size of the shortest one.")
                     self.tsVec1 = self.tsVec1[0:np.min([len(self.tsVec1), len(self.tsVec2)])]
@@ -90,7 +103,7 @@ cdef class MFDCCA:
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef cy_computeFlucVec(self, int tsLen, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, np.ndarray[np.float64_t, ndim=1, mode='c'] q_list, int polOrd, bint revSeg):
+    cdef cy_computeFlucVec(self, int tsLen, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, np.ndarray[np.float64_t, ndim=1, mode='c'] q_list, int polOrd, bint revSeg, int fitMethod):
         cdef Py_ssize_t j
         cdef int nLen, q_list_len
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] mtxf, vects1, vects2
@@ -101,23 +114,24 @@ cdef class MFDCCA:
         vecn = np.array(winSizes, dtype=ctypes.c_int)
         nLen = len(vecn)
         mtxf = np.zeros((len(q_list) * nLen, ), dtype=ctypes.c_double)
-        vects1 = np.array(self.tsVec1, dtype=ctypes.c_double)
-        vects2 = np.array(self.tsVec2, dtype=ctypes.c_double)
+        vects1 = np.ascontiguousarray(self.tsVec1, dtype=ctypes.c_double)
+        vects2 = np.ascontiguousarray(self.tsVec2, dtype=ctypes.c_double)
         q_list_len = len(q_list)
         
         t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        countBytes(t.nbytes)
         for j in prange(tsLen, nogil=True):
             t[j] = float(j) + 1.0
         
         with nogil:
             if revSeg:
-                flucMFDCCAForwBackwCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, &mtxf[0])
+                flucMFDCCAForwBackwCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, fitMethod, &mtxf[0])
             else:
-                flucMFDCCAForwCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, &mtxf[0])
+                flucMFDCCAForwCompute(&vects1[0], &vects2[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, fitMethod, &mtxf[0])
                         
         return vecn, np.reshape(mtxf, (q_list_len, nLen))
 
-    def computeFlucVec(self, winSizes, qList, polOrd=1, revSeg=False):
+    def computeFlucVec(self, winSizes, qList, polOrd=1, revSeg=False, method='gsl', nJobs=None):
         """Computation of the fluctuations in each window for each q-order.
 
         Parameters
@@ -131,6 +145,15 @@ cdef class MFDCCA:
         revSeg : bool, optional
             If True, the computation of `F` is repeated starting from the end
             of the time series (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial
+            basis shared by all the windows of the same size and stays accurate
+            at high `polOrd` (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -141,6 +164,10 @@ cdef class MFDCCA:
             window for each q-order.
         """
         tsLen = len(self.tsVec1)
+        fitMethod = fu._fitMethodCode(method, polOrd)
+        nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -151,6 +178,8 @@ cdef class MFDCCA:
             raise ValueError('Error: `winSizes[-1]` must be smaller than the input vector length.')
         if winSizes[0] < (polOrd + 2):
             raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+        if method == 'fast':
+            raise ValueError('Error: Method `fast` cannot be used with absolute values of the fluctuations.')
 
         if isinstance(qList, float):
             qList = np.array([qList], dtype=ctypes.c_double)
@@ -159,11 +188,70 @@ cdef class MFDCCA:
         else:
             raise ValueError('Error: qList type is {}. Expected float, list, or numpy array.'.format(type(qList)))
             
-        self.n, self.F = self.cy_computeFlucVec(tsLen, winSizes, qList, polOrd, revSeg)
+        cacheKey = fu._cacheKey('mfdcca', (self.tsVec1, self.tsVec2), {'winSizes': tuple(np.asarray(winSizes).tolist()), 'qList': tuple(qList.tolist()),
+                                                                       'polOrd': polOrd, 'revSeg': bool(revSeg), 'method': method})
+        cached = fu._cacheGet(cacheKey)
+        counters = None
+        if cached is not None:
+            self.qList = qList
+            self.n, self.F = cached
+        else:
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(winSizes))
+            try:
+                self.n, self.F = self.cy_computeFlucVec(tsLen, winSizes, qList, polOrd, revSeg, fitMethod)
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(winSizes))
+            fu._cachePut(cacheKey, (self.n, self.F))
         self.isComputed = True
+        self.flucParams = {'polOrd': polOrd, 'revSeg': bool(revSeg), 'method': method}
+        self.lastRunStats = fu._runStats(profStart, self.n, counters, cached is not None)
         
         return self.n, self.F
 
+    def extendFlucVec(self, moreWinSizes, nJobs=None):
+        """Computation of the fluctuations in additional windows, using the parameters
+        of the last call to `computeFlucVec`. Window's sizes already in `n` are not
+        computed again, and the new ones are merged into `n` and `F`.
+
+        Parameters
+        ----------
+        moreWinSizes : numpy ndarray
+            Array of window's sizes to be added.
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Sorted array `n` of window's sizes.
+        numpy ndarray
+            qxn array `F` containing the values of the fluctuations in each
+            window for each q-order.
+        """
+        cdef int tsLen = len(self.tsVec1)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
+        newN = fu._missingWinSizes(self.isComputed, self.flucParams, self.n, moreWinSizes, tsLen)
+
+        counters = None
+        if len(newN) > 0:
+            p = self.flucParams
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(newN))
+            try:
+                _, newF = self.cy_computeFlucVec(tsLen, newN, self.qList, p['polOrd'], p['revSeg'], fu._fitMethodCode(p['method'], p['polOrd']))
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(newN))
+            self.n, self.F = fu._mergeFluc(self.n, self.F, newN, newF)
+        self.lastRunStats = fu._runStats(profStart, newN, counters)
+
+        return self.n, self.F
+
     @cython.boundscheck(False)
     @cython.nonecheck(False)
     cpdef fitFlucVec(self, int nStart=-999, int nEnd=-999, float logBase=np.e, bint verbose=False):
@@ -225,6 +313,39 @@ cdef class MFDCCA:
         else:
             print('At least two points are required.')
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    cpdef findCrossovers(self, int nRegimes=2, int minPoints=3, float logBase=np.e, bint verbose=False):
+        """Piecewise-linear fit of the fluctuations values in log-log scale, with the crossovers
+        between the scaling regimes chosen to minimise the squared residuals of the fits, summed
+        over the q-orders.
+
+        Parameters
+        ----------
+        nRegimes : int, optional
+            Number of scaling regimes, if 0 it is chosen with the Bayesian information criterion (default : 2).
+        minPoints : int, optional
+            Minimum number of window's sizes in each regime (default : 3).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        verbose : bool, optional
+            Verbosity (default : False).
+
+        Returns
+        -------
+        numpy ndarray
+            Sizes of the first window of each regime after the first one.
+        numpy ndarray
+            qxk array of the slopes of the fits in each of the k regimes for each q-order.
+        numpy ndarray
+            qxk array of the intercepts of the fits in each of the k regimes for each q-order.
+        """
+        if self.isComputed:
+            return fu._piecewiseFit(self.n, self.F, nRegimes, minPoints, logBase, verbose, self.qList)
+        else:
+            print('Nothing to fit, fluctuations vector has not been computed yet.')
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
@@ -271,36 +392,20 @@ cdef class MFDCCA:
         else:
             print('Cannot compute multifractal spectrum, fluctuations vector has not been computed yet.')
 
-    def saveObject(self, outFileName):
+    def saveObject(self, outFileName, saveTs=True):
         """Save current object state to binary file.
         
         Parameters
         ----------
         outFileName : str
             Output binary file. `.fathon` extension will be appended to the file name.
+        saveTs : bool, optional
+            If False, only the results are saved and the time series is replaced by its
+            hash (see `fathonUtils.seriesHash`); the object loaded from the file can fit
+            the saved results but cannot compute new ones (default : True).
         """
-        saveDict = {}
-        saveDict['kind'] = 'mfdcca'
-        saveDict['tsVec1'] = self.tsVec1.tolist()
-        saveDict['tsVec2'] = self.tsVec2.tolist()
-        try:
-            saveDict['n'] = self.n.tolist()
-        except:
-            saveDict['n'] = []
-        try:
-            saveDict['F'] = self.F.tolist()
-        except:
-            saveDict['F'] = []
-        try:
-            saveDict['listH'] = self.listH.tolist()
-        except:
-            saveDict['listH'] = []
-        try:
-            saveDict['qList'] = self.qList.tolist()
-        except:
-            saveDict['qList'] = []
-        saveDict['isComputed'] = self.isComputed
-
-        f = open(outFileName + '.fathon', 'wb')
-        pickle.dump(saveDict, f)
-        f.close()
+        arrays, scalars = fu._seriesMembers(saveTs, self.tsHash, {'tsVec1': self.tsVec1, 'tsVec2': self.tsVec2})
+        arrays.update({'n': self.n, 'F': self.F, 'listH': self.listH, 'qList': self.qList})
+        scalars['isComputed'] = self.isComputed
+        scalars['flucParams'] = self.flucParams
+        fu._saveObject(outFileName + '.fathon', 'mfdcca', arrays, scalars)
@@ -21,11 +21,19 @@ cimport numpy as np
 cimport cython
 from cython.parallel import prange
 import ctypes
-import pickle
+from . import fathonUtils as fu
 
 cdef extern from "cLoops.h" nogil:
-    void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
-    void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, double *f_vec)
+    void flucMFDFAForwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+    void flucMFDFAForwBackwCompute(double *y, double *t, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int fit_method, double *f_vec)
+    void flucMFDFAFastCompute(double *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, double *f_vec)
+    void flucMFDFABatchCompute(double *y, double *t, int *offsets, int *lens, int n_series, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+    void flucMFDFAComputeF(float *y, int N, int *wins, int n_wins, double *qs, int n_q, int pol_ord, int rev_seg, int fit_method, double *f_vec)
+    int setNumThreads(int n_threads)
+    void countBytes(size_t n_bytes)
+    enum: FIT_FAST
+
+include "profile.pxi"
 
 cdef class MFDFA:
     """MultiFractal Detrended Fluctuation Analysis class.
@@ -36,6 +44,21 @@ cdef class MFDFA:
         Array of window's sizes used for the computation.
     tsVec : iterable
         Time series used for the analysis.
+    nanPolicy : str, optional
+        Handling of NaNs in the input, 'omit' removes them, 'raise' raises an
+        error, 'propagate' keeps them (default : 'omit'). Contiguous float
+        arrays, including numpy memmaps, are used without being copied, so
+        they must not be modified while in use.
+    dtype : numpy dtype, optional
+        Precision of the stored time series, numpy.float64 or numpy.float32
+        (default : numpy.float64). Single precision halves the memory used by
+        the time series; with methods 'direct' and 'ortho' the segments are
+        detrended in single precision and the sums of the residuals are
+        accumulated in double precision, the other methods use a double
+        precision copy of the time series. On the time series in `tests/mat`, `F`
+        differs from the one of the double precision time series by less than 1e-3
+        relative for q between -5 and 5 and `polOrd` up to 3, the largest
+        differences being at the most negative q.
     F : numpy ndarray
         Array containing the values of the fluctuations in each window.
     listH : numpy ndarray
@@ -45,23 +68,29 @@ cdef class MFDFA:
     isComputed : bool
         Boolean value to know if `F` has been computed in order to prevent the
         computation of other functions that need `F`.
+    lastRunStats : dict
+        Statistics of the last computation, None if it was not profiled (see
+        `fathonUtils.setProfiling`).
     """
 
     cdef:
         np.ndarray n
         np.ndarray tsVec, F, listH, qList
         bint isComputed
+        str tsHash
+        dict flucParams
+    cdef readonly dict lastRunStats
 
-    def __init__(self, tsVec):
+    def __init__(self, tsVec, nanPolicy='omit', dtype=np.float64):
         if isinstance(tsVec, str):
             if len(tsVec.split('.')) > 1 and tsVec.split('.')[-1] == 'fathon':
-                f = open(tsVec, 'rb')
-                data = pickle.load(f)
-                f.close()
+                data = fu._loadObject(tsVec)
                 if data['kind'] != 'mfdfa':
                     raise ValueError('Error: Loaded object is not a MFDFA object.')
                 else:
-                    self.tsVec = np.array(data['tsVec'], dtype=float)
+                    self.tsVec = fu._storedSeries(data.get('tsVec', []))
+                    self.tsHash = data.get('tsHash')
+                    self.flucParams = data.get('flucParams')
                     self.n = np.array(data['n'], dtype=ctypes.c_int)
                     self.F = np.array(data['F'], dtype=ctypes.c_double)
                     self.listH = np.array(data['listH'], dtype=ctypes.c_double)
@@ -70,17 +99,17 @@ cdef class MFDFA:
             else:
                 raise ValueError('Error: Not recognized extension.')
         else:
-            self.tsVec = np.array(tsVec, dtype=float)
-            self.tsVec = self.tsVec[~np.isnan(self.tsVec)]
+            self.tsVec = fu._inputSeries(tsVec, nanPolicy, dtype)
             self.isComputed = False
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
-    cdef cy_computeFlucVec(self, int tsLen, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, np.ndarray[np.float64_t, ndim=1, mode='c'] q_list, int polOrd, bint revSeg):
+    cdef cy_computeFlucVec(self, int tsLen, np.ndarray[np.int64_t, ndim=1, mode='c'] winSizes, np.ndarray[np.float64_t, ndim=1, mode='c'] q_list, int polOrd, bint revSeg, int fitMethod):
         cdef Py_ssize_t j
         cdef int nLen, q_list_len
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] mtxf, vects
+        cdef np.ndarray[np.float32_t, ndim=1, mode='c'] vectsF
         cdef np.ndarray[int, ndim=1, mode='c'] vecn
         cdef np.ndarray[np.float64_t, ndim=1, mode='c'] t
 
@@ -88,22 +117,34 @@ cdef class MFDFA:
         vecn = np.array(winSizes, dtype=ctypes.c_int)
         nLen = len(vecn)
         mtxf = np.zeros((len(q_list) * nLen, ), dtype=ctypes.c_double)
-        vects = np.array(self.tsVec, dtype=ctypes.c_double)
         q_list_len = len(q_list)
+
+        if fu._singlePrecision((self.tsVec, ), fitMethod):
+            vectsF = self.tsVec
+            with nogil:
+                flucMFDFAComputeF(&vectsF[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, revSeg, fitMethod, &mtxf[0])
+            return vecn, np.reshape(mtxf, (q_list_len, nLen))
+
+        vects = np.ascontiguousarray(self.tsVec, dtype=ctypes.c_double)
+        if vects is not self.tsVec:
+            countBytes(vects.nbytes)
         
         t = np.empty((tsLen, ), dtype=ctypes.c_double)
+        countBytes(t.nbytes)
         for j in prange(tsLen, nogil=True):
             t[j] = float(j) + 1.0
         
         with nogil:
-            if revSeg:
-                flucMFDFAForwBackwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, &mtxf[0])
+            if fitMethod == FIT_FAST:
+                flucMFDFAFastCompute(&vects[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, revSeg, &mtxf[0])
+            elif revSeg:
+                flucMFDFAForwBackwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, fitMethod, &mtxf[0])
             else:
-                flucMFDFAForwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, &mtxf[0])
+                flucMFDFAForwCompute(&vects[0], &t[0], tsLen, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, fitMethod, &mtxf[0])
                         
         return vecn, np.reshape(mtxf, (q_list_len, nLen))
 
-    def computeFlucVec(self, winSizes, qList, polOrd=1, revSeg=False):
+    def computeFlucVec(self, winSizes, qList, polOrd=1, revSeg=False, method='gsl', nJobs=None):
         """Computation of the fluctuations in each window for each q-order.
 
         Parameters
@@ -117,6 +158,16 @@ cdef class MFDFA:
         revSeg : bool, optional
             If True, the computation of `F` is repeated starting from the end
             of the time series (default : False).
+        method : str, optional
+            Detrending method, 'gsl' fits each window with GSL's least squares,
+            'direct' uses a closed-form fit precomputed once for each window's
+            size, 'ortho' projects each window onto an orthonormal polynomial basis
+            shared by all the windows of the same size and stays accurate at high
+            `polOrd`, 'fast' computes the fluctuations from cumulative sums of the
+            time series and requires `polOrd` not greater than 2 (default : 'gsl').
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
 
         Returns
         -------
@@ -127,6 +178,10 @@ cdef class MFDFA:
             window for each q-order.
         """
         tsLen = len(self.tsVec)
+        fitMethod = fu._fitMethodCode(method, polOrd)
+        nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
 
         if polOrd < 1:
             raise ValueError('Error: Polynomial order must be greater than 0.')
@@ -145,11 +200,70 @@ cdef class MFDFA:
         else:
             raise ValueError('Error: qList type is {}. Expected float, list, or numpy array.'.format(type(qList)))
             
-        self.n, self.F = self.cy_computeFlucVec(tsLen, winSizes, qList, polOrd, revSeg)
+        cacheKey = fu._cacheKey('mfdfa', (self.tsVec, ), {'winSizes': tuple(np.asarray(winSizes).tolist()), 'qList': tuple(qList.tolist()),
+                                                          'polOrd': polOrd, 'revSeg': bool(revSeg), 'method': method})
+        cached = fu._cacheGet(cacheKey)
+        counters = None
+        if cached is not None:
+            self.qList = qList
+            self.n, self.F = cached
+        else:
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(winSizes))
+            try:
+                self.n, self.F = self.cy_computeFlucVec(tsLen, winSizes, qList, polOrd, revSeg, fitMethod)
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(winSizes))
+            fu._cachePut(cacheKey, (self.n, self.F))
         self.isComputed = True
+        self.flucParams = {'polOrd': polOrd, 'revSeg': bool(revSeg), 'method': method}
+        self.lastRunStats = fu._runStats(profStart, self.n, counters, cached is not None)
         
         return self.n, self.F
 
+    def extendFlucVec(self, moreWinSizes, nJobs=None):
+        """Computation of the fluctuations in additional windows, using the parameters
+        of the last call to `computeFlucVec`. Window's sizes already in `n` are not
+        computed again, and the new ones are merged into `n` and `F`.
+
+        Parameters
+        ----------
+        moreWinSizes : numpy ndarray
+            Array of window's sizes to be added.
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Sorted array `n` of window's sizes.
+        numpy ndarray
+            qxn array `F` containing the values of the fluctuations in each
+            window for each q-order.
+        """
+        cdef int tsLen = len(self.tsVec)
+        cdef int nThreads = fu._numThreads(nJobs)
+        profStart = fu._profileBegin()
+        fu._checkSeries(tsLen, self.tsHash)
+        newN = fu._missingWinSizes(self.isComputed, self.flucParams, self.n, moreWinSizes, tsLen)
+
+        counters = None
+        if len(newN) > 0:
+            p = self.flucParams
+            prevThreads = setNumThreads(nThreads)
+            profThreads = _profileStart(profStart, len(newN))
+            try:
+                _, newF = self.cy_computeFlucVec(tsLen, newN, self.qList, p['polOrd'], p['revSeg'], fu._fitMethodCode(p['method'], p['polOrd']))
+            finally:
+                setNumThreads(prevThreads)
+                counters = _profileStop(profStart, profThreads, len(newN))
+            self.n, self.F = fu._mergeFluc(self.n, self.F, newN, newF)
+        self.lastRunStats = fu._runStats(profStart, newN, counters)
+
+        return self.n, self.F
+
     @cython.boundscheck(False)
     @cython.nonecheck(False)
     cpdef fitFlucVec(self, int nStart=-999, int nEnd=-999, float logBase=np.e, bint verbose=False):
@@ -211,6 +325,39 @@ cdef class MFDFA:
         else:
             print('At least two points are required.')
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    cpdef findCrossovers(self, int nRegimes=2, int minPoints=3, float logBase=np.e, bint verbose=False):
+        """Piecewise-linear fit of the fluctuations values in log-log scale, with the crossovers
+        between the scaling regimes chosen to minimise the squared residuals of the fits, summed
+        over the q-orders.
+
+        Parameters
+        ----------
+        nRegimes : int, optional
+            Number of scaling regimes, if 0 it is chosen with the Bayesian information criterion (default : 2).
+        minPoints : int, optional
+            Minimum number of window's sizes in each regime (default : 3).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F` (default : e).
+        verbose : bool, optional
+            Verbosity (default : False).
+
+        Returns
+        -------
+        numpy ndarray
+            Sizes of the first window of each regime after the first one.
+        numpy ndarray
+            qxk array of the slopes of the fits in each of the k regimes for each q-order.
+        numpy ndarray
+            qxk array of the intercepts of the fits in each of the k regimes for each q-order.
+        """
+        if self.isComputed:
+            return fu._piecewiseFit(self.n, self.F, nRegimes, minPoints, logBase, verbose, self.qList)
+        else:
+            print('Nothing to fit, fluctuations vector has not been computed yet.')
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.nonecheck(False)
@@ -257,35 +404,117 @@ cdef class MFDFA:
         else:
             print('Cannot compute multifractal spectrum, fluctuations vector has not been computed yet.')
 
-    def saveObject(self, outFileName):
+    @staticmethod
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.nonecheck(False)
+    def batch(tsVecs, winSizes, qList, int polOrd=1, bint revSeg=False, str method='gsl', int nStart=-999, int nEnd=-999, float logBase=np.e, nJobs=None):
+        """Computation and fit of the fluctuations of many time series at the
+        same time.
+
+        Parameters
+        ----------
+        tsVecs : numpy ndarray or iterable
+            2-D array with a time series in each row, or list of time series
+            of different lengths.
+        winSizes : numpy ndarray
+            Array of window's sizes.
+        qList : float or iterable or numpy ndarray
+            List of q-orders used to compute `F`.
+        polOrd : int, optional
+            Order of the polynomial to be fitted in each window (default : 1).
+        revSeg : bool, optional
+            If True, the computation of `F` is repeated starting from the end
+            of the time series (default : False).
+        method : str, optional
+            Detrending method, same as in `computeFlucVec` (default : 'gsl').
+        nStart : int, optional
+            Size of the smaller window used to fit `F` (default : first value
+            of `winSizes`).
+        nEnd : int, optional
+            Size of the bigger window used to fit `F` (default : last value of
+            `winSizes`).
+        logBase : float, optional
+            Base of the logarithm for the log-log fit of `n` vs `F`
+            (default : e).
+        nJobs : int, optional
+            Number of threads, negative values are counted back from the number of CPUs
+            (default : number set with `fathonUtils.setNumThreads`).
+
+        Returns
+        -------
+        numpy ndarray
+            Array `n` of window's sizes.
+        numpy ndarray
+            sxqxn array `F` containing the values of the fluctuations in each
+            window for each q-order, for each of the s time series.
+        numpy ndarray
+            sxq array of the slopes of the fits at each q-order.
+        numpy ndarray
+            sxq array of the intercepts of the fits at each q-order.
+        """
+        cdef int nLen, nSeries, maxLen, q_list_len
+        cdef Py_ssize_t j
+        cdef int fitMethod = fu._fitMethodCode(method, polOrd)
+        cdef int nThreads = fu._numThreads(nJobs), prevThreads
+        cdef np.ndarray[np.float64_t, ndim=1, mode='c'] vects, t, mtxf, q_list
+        cdef np.ndarray[int, ndim=1, mode='c'] offsets, lens, vecn
+
+        seriesList = fu._toSeriesList(tsVecs)
+        vects, offsets, lens = fu._packSeries(seriesList)
+
+        if polOrd < 1:
+            raise ValueError('Error: Polynomial order must be greater than 0.')
+        if len(winSizes) > 1:
+            if winSizes[len(winSizes)-1] <= winSizes[0]:
+                raise ValueError('Error: `winSizes[-1]` must be greater than variable `winSizes[0]`.')
+        if winSizes[len(winSizes)-1] > np.min(lens):
+            raise ValueError('Error: `winSizes[-1]` must be smaller than the length of the shortest time series.')
+        if winSizes[0] < (polOrd + 2):
+            raise ValueError('Error: `winSizes[0]` must be at least equal to {}.'.format(polOrd + 2))
+
+        if isinstance(qList, float):
+            q_list = np.array([qList], dtype=ctypes.c_double)
+        elif isinstance(qList, list) or isinstance(qList, np.ndarray):
+            q_list = np.array(qList, dtype=ctypes.c_double)
+        else:
+            raise ValueError('Error: qList type is {}. Expected float, list, or numpy array.'.format(type(qList)))
+
+        vecn = np.array(winSizes, dtype=ctypes.c_int)
+        nLen = len(vecn)
+        nSeries = len(lens)
+        maxLen = np.max(lens)
+        q_list_len = len(q_list)
+        mtxf = np.zeros((nSeries * q_list_len * nLen, ), dtype=ctypes.c_double)
+
+        t = np.empty((maxLen, ), dtype=ctypes.c_double)
+        for j in prange(maxLen, nogil=True):
+            t[j] = float(j) + 1.0
+
+        with nogil:
+            prevThreads = setNumThreads(nThreads)
+            flucMFDFABatchCompute(&vects[0], &t[0], &offsets[0], &lens[0], nSeries, &vecn[0], nLen, &q_list[0], q_list_len, polOrd, revSeg, fitMethod, &mtxf[0])
+            setNumThreads(prevThreads)
+
+        F = np.reshape(mtxf, (nSeries, q_list_len, nLen))
+        H, H_intercept = fu._batchFit(vecn, F, nStart, nEnd, logBase)
+
+        return vecn, F, H, H_intercept
+
+    def saveObject(self, outFileName, saveTs=True):
         """Save current object state to binary file.
         
         Parameters
         ----------
         outFileName : str
             Output binary file. `.fathon` extension will be appended to the file name.
+        saveTs : bool, optional
+            If False, only the results are saved and the time series is replaced by its
+            hash (see `fathonUtils.seriesHash`); the object loaded from the file can fit
+            the saved results but cannot compute new ones (default : True).
         """
-        saveDict = {}
-        saveDict['kind'] = 'mfdfa'
-        saveDict['tsVec'] = self.tsVec.tolist()
-        try:
-            saveDict['n'] = self.n.tolist()
-        except:
-            saveDict['n'] = []
-        try:
-            saveDict['F'] = self.F.tolist()
-        except:
-            saveDict['F'] = []
-        try:
-            saveDict['listH'] = self.listH.tolist()
-        except:
-            saveDict['listH'] = []
-        try:
-            saveDict['qList'] = self.qList.tolist()
-        except:
-            saveDict['qList'] = []
-        saveDict['isComputed'] = self.isComputed
-
-        f = open(outFileName + '.fathon', 'wb')
-        pickle.dump(saveDict, f)
-        f.close()
+        arrays, scalars = fu._seriesMembers(saveTs, self.tsHash, {'tsVec': self.tsVec})
+        arrays.update({'n': self.n, 'F': self.F, 'listH': self.listH, 'qList': self.qList})
+        scalars['isComputed'] = self.isComputed
+        scalars['flucParams'] = self.flucParams
+        fu._saveObject(outFileName + '.fathon', 'mfdfa', arrays, scalars)
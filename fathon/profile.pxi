@@ -0,0 +1,43 @@
+#    profile.pxi - profiling helpers of the C loops of fathon package
+#    Copyright (C) 2019-  Stefano Bianchi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# included by the modules that profile their computations (see `fathonUtils.setProfiling`)
+
+cdef extern from "cLoops.h" nogil:
+    int profileStart(int n_wins)
+    void profileStop(double *phases, long long *counts, double *thread_busy, double *win_cost)
+    enum: PROF_N_PHASES
+
+cdef int _profileStart(start, int nWins):
+    """Start of the profile of the C loops of a computation started at `start`, if it is
+    profiled (see `fathonUtils._profileBegin`), returns the number of threads profiled."""
+    return 0 if start is None else profileStart(nWins)
+
+cdef _profileStop(start, int nThreads, int nWins):
+    """End of the profile of the C loops of a computation started at `start`, returns the
+    counters of the C loops for `fathonUtils._runStats`, None if it is not profiled."""
+    cdef np.ndarray[np.float64_t, ndim=1, mode='c'] phases, threadBusy, winCost
+    cdef np.ndarray[np.int64_t, ndim=1, mode='c'] counts
+
+    if start is None:
+        return None
+    phases = np.zeros((PROF_N_PHASES, ), dtype=ctypes.c_double)
+    counts = np.zeros((2, ), dtype=np.int64)
+    threadBusy = np.zeros((nThreads + 1, ), dtype=ctypes.c_double)
+    winCost = np.zeros((nWins + 1, ), dtype=ctypes.c_double)
+    profileStop(&phases[0], <long long *>&counts[0], &threadBusy[0], &winCost[0])
+
+    return phases, counts, threadBusy[:nThreads], winCost[:nWins]
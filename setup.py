@@ -88,7 +88,7 @@ if __name__ == "__main__":
               description="A python package for detrended fluctuation analysis (DFA) and related algorithms.",
               long_description_content_type="text/markdown",
               long_description=README,
-              packages=find_packages(),
+              packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
               classifiers=["License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
                            "Operating System :: MacOS",
                            "Operating System :: Unix",
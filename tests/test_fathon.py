@@ -3,6 +3,10 @@ import fathon
 from fathon import fathonUtils as fu
 import math
 import os
+import sys
+import json
+import subprocess
+import threading
 
 # FUNCTIONALITY TESTS
 # -------------------
@@ -293,7 +297,7 @@ def test_rho_thresholds():
     winSizes = fu.linRangeByStep(10, 200, step=2)
     n4, int1, int2 = pydcca.rhoThresholds(len(ts1), winSizes, 10, 0.95)
 
-    assert math.isclose(int1[53], 0.2619278369335029) and math.isclose(int2[53], -0.41952479444776136)
+    assert math.isclose(int1[53], 0.5300814335034993) and math.isclose(int2[53], -0.1935959892207174)
 
 #####
 # Regression test 6
@@ -423,3 +427,657 @@ def test_multifractal_crosscorr_spectrum():
     a2, m2 = pymfdcca.computeMultifractalSpectrum()
 
     assert math.isclose(m2[1], 0.9355109825234913)
+
+#####
+# Regression test 16
+# It tests if the Hurst exponent of `ts1` is correct
+# using the direct detrending method
+#####
+def test_dfa_direct():
+    pydfa = fathon.DFA(ts1)
+    winSizes = fu.linRangeByStep(10, 200)
+    n1, F1 = pydfa.computeFlucVec(winSizes, revSeg=True, method='direct')
+    H1, H_int1 = pydfa.fitFlucVec()
+
+    assert math.isclose(H1, 0.7982194289592676)
+
+#####
+# Regression test 17
+# It tests if the direct detrending method gives the
+# same fluctuations of the GSL one for all the algorithms
+#####
+def test_direct_vs_gsl():
+    winSizes = fu.linRangeByStep(10, 200, step=2)
+    qs = np.arange(-3, 4, 1)
+    for polOrd in [1, 2]:
+        pydfa = fathon.DFA(ts4)
+        _, F_gsl = pydfa.computeFlucVec(fu.linRangeByStep(10, 100), polOrd=polOrd, unbiased=True)
+        _, F_dir = pydfa.computeFlucVec(fu.linRangeByStep(10, 100), polOrd=polOrd, unbiased=True, method='direct')
+        assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+
+        pymfdfa = fathon.MFDFA(ts3)
+        _, F_gsl = pymfdfa.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True)
+        _, F_dir = pymfdfa.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True, method='direct')
+        assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+
+        pydcca = fathon.DCCA(ts1, ts2)
+        _, F_gsl = pydcca.computeFlucVec(winSizes, polOrd=polOrd, overlap=True)
+        _, F_dir = pydcca.computeFlucVec(winSizes, polOrd=polOrd, overlap=True, method='direct')
+        assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+        _, rho_gsl = pydcca.computeRho(winSizes, polOrd=polOrd, revSeg=True)
+        _, rho_dir = pydcca.computeRho(winSizes, polOrd=polOrd, revSeg=True, method='direct')
+        assert np.allclose(rho_gsl, rho_dir, rtol=1e-9, atol=0)
+
+        pymfdcca = fathon.MFDCCA(ts1, ts3)
+        _, F_gsl = pymfdcca.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True)
+        _, F_dir = pymfdcca.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True, method='direct')
+        assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+
+        pyht = fathon.HT(ts2)
+        ht_gsl = pyht.computeHt([10, 100], polOrd=polOrd, q0Fit=[0.5, -0.2])
+        ht_dir = pyht.computeHt([10, 100], polOrd=polOrd, q0Fit=[0.5, -0.2], method='direct')
+        assert np.allclose(ht_gsl, ht_dir, rtol=1e-9, atol=0)
+
+#####
+# Regression test 18
+# It tests if the Hurst exponent of `ts1` is correct
+# using the fast method
+#####
+def test_dfa_fast():
+    pydfa = fathon.DFA(ts1)
+    winSizes = fu.linRangeByStep(10, 200)
+    n1, F1 = pydfa.computeFlucVec(winSizes, revSeg=True, method='fast')
+    H1, H_int1 = pydfa.fitFlucVec()
+
+    assert math.isclose(H1, 0.7982194289592676)
+
+#####
+# Regression test 19
+# It tests if the fast method gives the same results
+# of the direct one for linear and quadratic detrending
+#####
+def test_fast_vs_direct():
+    winSizes = fu.linRangeByStep(10, 200, step=2)
+    qs = np.arange(-3, 4, 1)
+    for polOrd in [1, 2]:
+        pymfdfa = fathon.MFDFA(ts3)
+        _, F_dir = pymfdfa.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True, method='direct')
+        _, F_fast = pymfdfa.computeFlucVec(winSizes, qs, polOrd=polOrd, revSeg=True, method='fast')
+        assert np.allclose(F_dir, F_fast, rtol=1e-9, atol=0)
+
+        pydcca = fathon.DCCA(ts1, ts2)
+        _, F_dir = pydcca.computeFlucVec(winSizes, polOrd=polOrd, absVals=False, overlap=True, method='direct')
+        _, F_fast = pydcca.computeFlucVec(winSizes, polOrd=polOrd, absVals=False, overlap=True, method='fast')
+        assert np.allclose(F_dir, F_fast, rtol=1e-9, atol=0)
+        _, rho_dir = pydcca.computeRho(winSizes, polOrd=polOrd, method='direct')
+        _, rho_fast = pydcca.computeRho(winSizes, polOrd=polOrd, method='fast')
+        assert np.allclose(rho_dir, rho_fast, rtol=1e-9, atol=0)
+
+        pyht = fathon.HT(ts2)
+        ht_dir = pyht.computeHt([10, 100], polOrd=polOrd, q0Fit=[0.5, -0.2], method='direct')
+        ht_fast = pyht.computeHt([10, 100], polOrd=polOrd, q0Fit=[0.5, -0.2], method='fast')
+        assert np.allclose(ht_dir, ht_fast, rtol=1e-9, atol=0)
+
+#####
+# Regression test 20
+# It tests if the fits updated point by point on overlapping
+# windows give the same results of the ones done window by window
+#####
+def test_sliding_vs_gsl():
+    winSizes = np.array([5, 6, 17, 64], dtype=np.int64)
+    y1 = fu.toAggregated(mn)
+    y2 = fu.toAggregated(mf)
+    for polOrd in [1, 2]:
+        pydfa = fathon.DFA(y1)
+        _, F_gsl = pydfa.computeFlucVec(winSizes, polOrd=polOrd, unbiased=True, method='gsl')
+        _, F_dir = pydfa.computeFlucVec(winSizes, polOrd=polOrd, unbiased=True, method='direct')
+        assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+
+        pydcca = fathon.DCCA(y1, y2)
+        for absVals in [True, False]:
+            _, F_gsl = pydcca.computeFlucVec(winSizes, polOrd=polOrd, absVals=absVals, overlap=True, method='gsl')
+            _, F_dir = pydcca.computeFlucVec(winSizes, polOrd=polOrd, absVals=absVals, overlap=True, method='direct')
+            assert np.allclose(F_gsl, F_dir, rtol=1e-9, atol=0)
+
+#####
+# Regression test 21
+# It tests if the confidence levels of the cross-correlation
+# coefficient are reproducible with a given seed
+#####
+def test_rho_thresholds_seed():
+    pydcca = fathon.DCCA()
+    winSizes = fu.linRangeByStep(10, 100, step=10)
+    n1, up1, down1 = pydcca.rhoThresholds(300, winSizes, 20, 0.9, method='direct', seed=3)
+    up1[0] = 10.0
+    n2, up2, down2 = pydcca.rhoThresholds(300, winSizes, 20, 0.9, method='direct', seed=3)
+    n3, up3, down3 = pydcca.rhoThresholds(300, winSizes, 20, 0.9, method='gsl', seed=3)
+
+    assert up2[0] != 10.0
+    assert np.allclose(up2, up3, rtol=1e-9, atol=0) and np.allclose(down2, down3, rtol=1e-9, atol=0)
+    assert np.all(up2 > down2)
+
+#####
+# Regression test 22
+# It tests if the batch computation of many time series gives
+# the same results of the computation of each single time series
+#####
+def test_batch_vs_single():
+    winSizes = np.array([16, 32, 64, 128], dtype=np.int64)
+    ts1 = [fu.toAggregated(wn), fu.toAggregated(mn)[0:3000], fu.toAggregated(mf)[0:1000]]
+    ts2 = [fu.toAggregated(mf), fu.toAggregated(wn)[0:2000], fu.toAggregated(mn)[0:1000]]
+    for method in ['gsl', 'fast']:
+        n, F, H, H_int = fathon.DFA.batch(ts1, winSizes, revSeg=True, method=method)
+        n, Fmf, Hmf, _ = fathon.MFDFA.batch(ts1, winSizes, q_list, polOrd=2, method=method)
+        n, Fdcca, Hdcca, _ = fathon.DCCA.batch(ts1, ts2, winSizes, absVals=False, method=method)
+        for i in range(len(ts1)):
+            pydfa = fathon.DFA(ts1[i])
+            _, F_single = pydfa.computeFlucVec(winSizes, revSeg=True, method=method)
+            h, h_int = pydfa.fitFlucVec()
+            assert np.allclose(F[i], F_single, rtol=1e-12, atol=0)
+            assert math.isclose(H[i], h, rel_tol=1e-9) and math.isclose(H_int[i], h_int, rel_tol=1e-9)
+
+            pymfdfa = fathon.MFDFA(ts1[i])
+            _, F_single = pymfdfa.computeFlucVec(winSizes, q_list, polOrd=2, method=method)
+            h, _ = pymfdfa.fitFlucVec()
+            assert np.allclose(Fmf[i], F_single, rtol=1e-12, atol=0)
+            assert np.allclose(Hmf[i], h, rtol=1e-9, atol=0)
+
+            pydcca = fathon.DCCA(ts1[i], ts2[i])
+            _, F_single = pydcca.computeFlucVec(winSizes, absVals=False, method=method)
+            assert np.allclose(Fdcca[i], F_single, rtol=1e-12, atol=0)
+
+    n, F, _, _ = fathon.DFA.batch(np.vstack([wn, mn]), winSizes, unbiased=True, method='direct')
+    _, F_single = fathon.DFA(mn).computeFlucVec(winSizes, unbiased=True, method='direct')
+    assert np.allclose(F[1], F_single, rtol=1e-12, atol=0)
+
+#####
+# Regression test 23
+# It tests if the matrix of the cross-correlation index of a panel
+# gives the same results of the computation of each couple of series
+#####
+def test_rho_matrix():
+    winSizes = np.array([10, 50, 200], dtype=np.int64)
+    panel = np.vstack([fu.toAggregated(wn), fu.toAggregated(mn), fu.toAggregated(mf)])
+    for overlap, revSeg in [(False, True), (True, False)]:
+        n, rho = fathon.DCCA.rhoMatrix(panel, winSizes, polOrd=2, overlap=overlap, revSeg=revSeg, method='direct')
+        assert rho.shape == (len(winSizes), 3, 3)
+        assert np.allclose(np.diagonal(rho, axis1=1, axis2=2), 1.0, rtol=1e-12, atol=0)
+        for i in range(3):
+            for j in range(i + 1, 3):
+                _, rho_single = fathon.DCCA(panel[i], panel[j]).computeRho(winSizes, polOrd=2, overlap=overlap, revSeg=revSeg, method='direct')
+                assert np.allclose(rho[:, i, j], rho_single, rtol=1e-9, atol=1e-12)
+                assert np.array_equal(rho[:, i, j], rho[:, j, i])
+
+#####
+# Regression test 24
+# It tests memory-mapped inputs and the policies for NaNs
+#####
+def test_memmap_and_nan_policy(tmp_path):
+    winSizes = np.array([16, 64, 256], dtype=np.int64)
+    y = fu.toAggregated(mn)
+    np.save(os.path.join(str(tmp_path), 'mn.npy'), y)
+    y_map = np.load(os.path.join(str(tmp_path), 'mn.npy'), mmap_mode='r')
+    _, F = fathon.DFA(y).computeFlucVec(winSizes)
+    _, F_map = fathon.DFA(y_map).computeFlucVec(winSizes)
+    assert np.array_equal(F, F_map)
+    _, F = fathon.DCCA(y, y[::-1].copy()).computeFlucVec(winSizes)
+    _, F_map = fathon.DCCA(y_map, y_map[::-1]).computeFlucVec(winSizes)
+    assert np.array_equal(F, F_map)
+
+    y_nan = y.copy()
+    y_nan[10] = np.nan
+    _, F = fathon.DFA(np.delete(y, 10)).computeFlucVec(winSizes)
+    _, F_omit = fathon.DFA(y_nan).computeFlucVec(winSizes)
+    assert np.array_equal(F, F_omit)
+    _, F_prop = fathon.DFA(y_nan, nanPolicy='propagate').computeFlucVec(winSizes)
+    assert np.isnan(F_prop).all()
+    try:
+        fathon.MFDFA(y_nan, nanPolicy='raise')
+        assert False
+    except ValueError:
+        pass
+
+#####
+# Regression test 25
+# It tests if the streaming DFA gives the same results
+# of the DFA of the whole time series
+#####
+def test_stream_dfa():
+    winSizes = np.array([10, 37, 100, 512], dtype=np.int64)
+    chunks = [1, 700, 5, 2000, 1294]
+    for method in ['gsl', 'direct', 'fast']:
+        pystream = fathon.StreamDFA(winSizes, polOrd=2, method=method, aggregate=True)
+        pos = 0
+        for c in chunks:
+            n, F = pystream.append(mn[pos:pos+c])
+            pos += c
+        pydfa = fathon.DFA(fu.toAggregated(mn[0:pos]))
+        _, F_full = pydfa.computeFlucVec(winSizes, polOrd=2, method=method)
+        H, _ = pystream.fitFlucVec()
+        H_full, _ = pydfa.fitFlucVec()
+        assert len(pystream) == pos
+        assert np.allclose(F, F_full, rtol=1e-9, atol=0)
+        assert math.isclose(H, H_full, rel_tol=1e-9)
+
+    pystream = fathon.StreamDFA(winSizes)
+    n, F = pystream.append(fu.toAggregated(mn)[0:50])
+    assert np.isnan(F[2]) and np.isnan(F[3]) and not np.isnan(F[1])
+
+#####
+# Regression test 26
+# It tests if the rolling Hurst exponent gives the same results
+# of the DFA of each position of the sliding window
+#####
+def test_rolling_h():
+    winSizes = np.array([16, 50, 128, 300], dtype=np.int64)
+    y = fu.toAggregated(mf)
+    for method in ['gsl', 'direct', 'fast']:
+        pos, F, H, H_int = fathon.DFA.rollingH(y, 1000, 96, winSizes, polOrd=2, revSeg=True, method=method)
+        assert len(pos) == (len(y) - 1000) // 96 + 1
+        for k in [0, 5, len(pos) - 1]:
+            pydfa = fathon.DFA(y[pos[k]-999:pos[k]+1])
+            _, F_single = pydfa.computeFlucVec(winSizes, polOrd=2, revSeg=True, method=method)
+            h, h_int = pydfa.fitFlucVec()
+            assert np.allclose(F[k], F_single, rtol=1e-9, atol=0)
+            assert math.isclose(H[k], h, rel_tol=1e-9) and math.isclose(H_int[k], h_int, rel_tol=1e-9)
+
+#####
+# Regression test 27
+# It tests if the results stored in the cache are the same of the computed ones
+# and if the cache is bounded by its size
+#####
+def test_result_cache(tmp_path):
+    winSizes = np.array([16, 50, 128, 300], dtype=np.int64)
+    fu.setResultCache(cacheDir=str(tmp_path))
+    try:
+        pydfa = fathon.DFA(fu.toAggregated(mf))
+        n, F = pydfa.computeFlucVec(winSizes, polOrd=2)
+        F[0] = -1.0
+        n_c, F_c = pydfa.computeFlucVec(winSizes, polOrd=2)
+        assert np.array_equal(n, n_c) and F_c[0] > 0.0
+        _, F_rev = pydfa.computeFlucVec(winSizes, polOrd=2, revSeg=True)
+        assert not np.array_equal(F_c, F_rev)
+
+        pymfdcca = fathon.MFDCCA(fu.toAggregated(mf), fu.toAggregated(mn))
+        _, F_mf = pymfdcca.computeFlucVec(winSizes, qList=[-2.0, 2.0])
+        fu._resultCache.clear()
+        fu._resultCacheConf['bytes'] = 0
+        pymfdcca = fathon.MFDCCA(fu.toAggregated(mf), fu.toAggregated(mn))
+        _, F_disk = pymfdcca.computeFlucVec(winSizes, qList=[-2.0, 2.0])
+        assert np.array_equal(F_mf, F_disk)
+        pymfdcca.fitFlucVec()
+        assert len(pymfdcca.computeMassExponents()) == 2
+
+        fu.setResultCache(maxBytes=64, cacheDir=str(tmp_path))
+        assert fu._resultCacheConf['bytes'] <= 64 and len(os.listdir(str(tmp_path))) == 0
+    finally:
+        fu.clearResultCache()
+        fu.setResultCache(0)
+
+#####
+# Regression test 28
+# It tests if the fluctuations of additional windows are the same of the ones
+# computed with the whole set of window's sizes
+#####
+def test_extend_fluc_vec(tmp_path):
+    winSizes = np.array([16, 64, 300], dtype=np.int64)
+    moreWinSizes = np.array([64, 200, 20, 500], dtype=np.int64)
+    allWinSizes = np.union1d(winSizes, moreWinSizes)
+    y1 = fu.toAggregated(mf)
+    y2 = fu.toAggregated(mn)
+    cases = [(fathon.DFA, (y1, ), {'polOrd': 2, 'revSeg': True, 'method': 'direct'}),
+             (fathon.DCCA, (y1, y2), {'polOrd': 2, 'absVals': False, 'overlap': True, 'method': 'fast'}),
+             (fathon.MFDFA, (y1, ), {'qList': [-3.0, 2.0], 'revSeg': True}),
+             (fathon.MFDCCA, (y1, y2), {'qList': [-3.0, 2.0], 'polOrd': 3})]
+    for cls, series, params in cases:
+        pyobj = cls(*series)
+        pyobj.computeFlucVec(winSizes, **params)
+        n, F = pyobj.extendFlucVec(moreWinSizes)
+        n_all, F_all = cls(*series).computeFlucVec(allWinSizes, **params)
+        assert np.array_equal(n, n_all)
+        assert np.allclose(F, F_all, rtol=1e-12, atol=0)
+
+        pyobj.saveObject(str(tmp_path / 'ext'))
+        pyobj = cls(str(tmp_path / 'ext.fathon'))
+        n, F = pyobj.extendFlucVec([700, 1000])
+        assert n[-1] == 1000 and F.shape[-1] == len(allWinSizes) + 2
+
+#####
+# Regression test 29
+# It tests if the crossover of an AR(1) process is found and if the fits of
+# the scaling regimes are the same of the ones of `fitFlucVec`
+#####
+def test_find_crossovers():
+    rng = np.random.default_rng(29)
+    noise = rng.standard_normal(2**14)
+    ar = np.zeros((len(noise), ))
+    for i in range(1, len(noise)):
+        ar[i] = 0.98 * ar[i-1] + noise[i]
+    winSizes = np.unique(np.logspace(3, 12, 37, base=2).astype(np.int64))
+
+    pydfa = fathon.DFA(fu.toAggregated(ar))
+    n, F = pydfa.computeFlucVec(winSizes)
+    nCross, H, H_int = pydfa.findCrossovers()
+    assert len(nCross) == 1 and 16 <= nCross[0] <= 512
+    assert H[0] > 1.2 and abs(H[1] - 0.5) < 0.15
+    h, h_int = pydfa.fitFlucVec(nStart=nCross[0], nEnd=n[-1])
+    assert math.isclose(H[1], h, rel_tol=1e-9) and math.isclose(H_int[1], h_int, rel_tol=1e-9)
+    nCrossAuto, H_auto, _ = pydfa.findCrossovers(nRegimes=0, minPoints=4)
+    assert len(H_auto) == len(nCrossAuto) + 1 >= 2
+
+    pymfdfa = fathon.MFDFA(fu.toAggregated(ar))
+    pymfdfa.computeFlucVec(winSizes, qList=[-2.0, 2.0, 4.0])
+    nCross, H, H_int = pymfdfa.findCrossovers(nRegimes=3)
+    assert len(nCross) == 2 and H.shape == (3, 3) and H_int.shape == (3, 3)
+    listH, _ = pymfdfa.fitFlucVec(nStart=n[0], nEnd=n[np.where(n == nCross[0])[0][0] - 1])
+    assert np.allclose(H[:, 0], listH, rtol=1e-9, atol=0)
+
+#####
+# Regression test 30
+# It tests if the fits of many intervals at the same time are the same
+# of the ones of `fitFlucVec`
+#####
+def test_multi_fit_vectorised():
+    winSizes = np.unique(np.logspace(4, 11, 30, base=2).astype(np.int64))
+    pydfa = fathon.DFA(fu.toAggregated(mf))
+    n, F = pydfa.computeFlucVec(winSizes, polOrd=2)
+    limits = np.array([[n[0], n[-1]], [n[3], n[4]], [n[10], n[25]], [n[10], n[25]]], dtype=int)
+    H, H_int, R2 = pydfa.multiFitFlucVec(limits, logBase=10, rSquared=True)
+    for i, (nStart, nEnd) in enumerate(limits):
+        h, h_int = pydfa.fitFlucVec(nStart=nStart, nEnd=nEnd, logBase=10)
+        assert math.isclose(H[i], h, rel_tol=1e-10) and math.isclose(H_int[i], h_int, rel_tol=1e-10)
+    assert R2[1] == 1.0 and np.all((R2 > 0.9) & (R2 <= 1.0))
+    assert len(pydfa.multiFitFlucVec(limits)) == 2
+
+    for bad in [[[n[5], n[2]]], [[n[0] - 1, n[2]]], [[n[0] + 1, n[2]]], [[n[2], n[2]]]]:
+        try:
+            pydfa.multiFitFlucVec(np.array(bad, dtype=int))
+            assert False
+        except ValueError:
+            pass
+
+#####
+# Regression test 31
+# It tests if the results do not depend on the number of threads
+#####
+def test_num_threads():
+    winSizes = np.array([16, 50, 128, 300], dtype=np.int64)
+    y1 = fu.toAggregated(mf)
+    y2 = fu.toAggregated(mn)
+    _, F = fathon.DFA(y1).computeFlucVec(winSizes, polOrd=2, method='direct')
+    _, rho = fathon.DCCA(y1, y2).computeRho(winSizes)
+    _, F_mf = fathon.MFDCCA(y1, y2).computeFlucVec(winSizes, qList=[-2.0, 2.0])
+    try:
+        for nJobs in [1, 3, -1]:
+            fu.setNumThreads(nJobs)
+            assert np.array_equal(fathon.DFA(y1).computeFlucVec(winSizes, polOrd=2, method='direct')[1], F)
+            assert np.array_equal(fathon.DCCA(y1, y2).computeRho(winSizes, nJobs=2)[1], rho)
+            assert np.array_equal(fathon.MFDCCA(y1, y2).computeFlucVec(winSizes, qList=[-2.0, 2.0], nJobs=4)[1], F_mf)
+    finally:
+        fu.setNumThreads(None)
+
+    try:
+        fathon.DFA(y1).computeFlucVec(winSizes, nJobs=0)
+        assert False
+    except ValueError:
+        pass
+
+#####
+# Regression test 32
+# It tests if the fluctuations of windows whose segments are split among
+# several tasks are the same of the ones computed window by window
+#####
+def test_segment_tasks():
+    rng = np.random.default_rng(32)
+    y1 = fu.toAggregated(rng.standard_normal(2**16))
+    y2 = fu.toAggregated(rng.standard_normal(2**16) + 0.5 * np.diff(y1, prepend=0.0))
+    winSizes = np.array([10, 40, 200], dtype=np.int64)
+    qList = [-3.0, 0.0, 2.0]
+    for method in ['gsl', 'direct', 'fast']:
+        for revSeg in [False, True]:
+            _, F = fathon.DFA(y1).computeFlucVec(winSizes, polOrd=2, revSeg=revSeg, method=method)
+            _, F_b, _, _ = fathon.DFA.batch([y1], winSizes, polOrd=2, revSeg=revSeg, method=method)
+            assert np.allclose(F, F_b[0], rtol=1e-12, atol=0)
+            _, F = fathon.MFDFA(y1).computeFlucVec(winSizes, qList, polOrd=2, revSeg=revSeg, method=method)
+            _, F_b, _, _ = fathon.MFDFA.batch([y1], winSizes, qList, polOrd=2, revSeg=revSeg, method=method)
+            assert np.allclose(F, F_b[0], rtol=1e-12, atol=0)
+            for overlap in [False, True]:
+                # overlapping segments are many more, a shorter series is enough to split them
+                x1, x2 = (y1[:4096], y2[:4096]) if overlap else (y1, y2)
+                if method != 'fast':
+                    _, rho = fathon.DCCA(x1, x2).computeRho(winSizes, overlap=overlap, revSeg=revSeg, method=method)
+                    _, rho_m = fathon.DCCA.rhoMatrix([x1, x2], winSizes, overlap=overlap, revSeg=revSeg, method=method)
+                    assert np.allclose(rho, rho_m[:, 0, 1], rtol=1e-12, atol=0)
+                for absVals in ([False] if method == 'fast' else [False, True]):
+                    _, F = fathon.DCCA(x1, x2).computeFlucVec(winSizes, absVals=absVals, overlap=overlap, revSeg=revSeg, method=method)
+                    _, F_b, _, _ = fathon.DCCA.batch([x1], [x2], winSizes, absVals=absVals, overlap=overlap, revSeg=revSeg, method=method)
+                    assert np.allclose(F, F_b[0], rtol=1e-12, atol=0)
+        if method != 'fast':
+            _, F = fathon.DFA(y1[:8192]).computeFlucVec(winSizes, polOrd=2, unbiased=True, method=method)
+            _, F_b, _, _ = fathon.DFA.batch([y1[:8192]], winSizes, polOrd=2, unbiased=True, method=method)
+            assert np.allclose(F, F_b[0], rtol=1e-12, atol=0)
+
+#####
+# Regression test 33
+# It tests if the orthogonal detrending gives the same fluctuations of a
+# least squares fit on a Legendre basis, also at high polynomial orders
+#####
+def test_ortho_method():
+    y = fu.toAggregated(mf)
+    winSizes = np.array([30, 100, 400], dtype=np.int64)
+    for polOrd in [1, 10]:
+        F_ref = []
+        for s in winSizes:
+            V = np.polynomial.legendre.legvander(np.linspace(-1, 1, s), polOrd)
+            Y = y[:(len(y) // s) * s].reshape(-1, s).T
+            res = Y - V @ np.linalg.lstsq(V, Y, rcond=None)[0]
+            F_ref.append(np.sqrt(np.mean(res**2)))
+        _, F = fathon.DFA(y).computeFlucVec(winSizes, polOrd=polOrd, method='ortho')
+        assert np.allclose(F, F_ref, rtol=1e-10, atol=0)
+        _, F_mf = fathon.MFDFA(y).computeFlucVec(winSizes, qList=[2.0], polOrd=polOrd, method='ortho')
+        assert np.allclose(F_mf[0], F_ref, rtol=1e-10, atol=0)
+        _, F_dcca = fathon.DCCA(y, y).computeFlucVec(winSizes, polOrd=polOrd, method='ortho')
+        assert np.allclose(F_dcca, F_ref, rtol=1e-10, atol=0)
+        _, F_mfdcca = fathon.MFDCCA(y, y).computeFlucVec(winSizes, qList=[2.0], polOrd=polOrd, method='ortho')
+        assert np.allclose(F_mfdcca[0], F_ref, rtol=1e-10, atol=0)
+
+    y2 = fu.toAggregated(mn)
+    for overlap in [False, True]:
+        _, F_gsl = fathon.DCCA(y, y2).computeFlucVec(winSizes, polOrd=2, absVals=False, overlap=overlap)
+        _, F = fathon.DCCA(y, y2).computeFlucVec(winSizes, polOrd=2, absVals=False, overlap=overlap, method='ortho')
+        assert np.allclose(F, F_gsl, rtol=1e-8, atol=0)
+    _, F_gsl = fathon.DFA(y).computeFlucVec(winSizes, polOrd=2, unbiased=True)
+    _, F = fathon.DFA(y).computeFlucVec(winSizes, polOrd=2, unbiased=True, method='ortho')
+    assert np.allclose(F, F_gsl, rtol=1e-8, atol=0)
+
+#####
+# Regression test 34
+# It tests if the vectorised residual kernels pass their self-test and give
+# the same fluctuations of the scalar ones
+#####
+def test_simd_kernels():
+    level, selfTests = fu.simdInfo()
+    assert level in selfTests and selfTests[level] is True and selfTests['scalar'] is True
+    assert all(res is not False for res in selfTests.values())
+
+    winSizes = np.array([10, 33, 100, 257], dtype=np.int64)
+    code = ('import numpy as np, fathon, sys, json\n'
+            'from fathon import fathonUtils as fu\n'
+            'y = fu.toAggregated(np.loadtxt(sys.argv[1]))\n'
+            'w = np.array({}, dtype=np.int64)\n'
+            'print(fu.simdInfo()[0])\n'
+            'print(json.dumps(fathon.DFA(y).computeFlucVec(w, polOrd=3, revSeg=True, method="direct")[1].tolist()))\n'
+            'print(json.dumps(fathon.DCCA(y, y[::-1].copy()).computeFlucVec(w, polOrd=2, absVals=False, method="direct")[1].tolist()))\n').format(winSizes.tolist())
+    env = dict(os.environ, FATHON_SIMD='scalar',
+               PYTHONPATH=os.pathsep.join([os.path.dirname(os.path.dirname(fathon.__file__)), os.environ.get('PYTHONPATH', '')]))
+    out = subprocess.run([sys.executable, '-c', code, os.path.join(TESTS_PATH, 'mat/multifractal.txt')],
+                         env=env, capture_output=True, text=True, check=True).stdout.split('\n')
+    assert out[0] == 'scalar'
+    y = fu.toAggregated(mf)
+    _, F = fathon.DFA(y).computeFlucVec(winSizes, polOrd=3, revSeg=True, method='direct')
+    assert np.allclose(F, json.loads(out[1]), rtol=1e-12, atol=0)
+    _, F = fathon.DCCA(y, y[::-1].copy()).computeFlucVec(winSizes, polOrd=2, absVals=False, method='direct')
+    assert np.allclose(F, json.loads(out[2]), rtol=1e-12, atol=0)
+
+#####
+# Regression test 35
+# It tests if the single precision mode stays within the documented bounds
+# of the double precision results on the reference time series
+#####
+def test_float32_mode():
+    winSizes = fu.linRangeByStep(10, 2000, step=20)
+    qs = np.arange(-5, 6, 1.0)
+    y2 = fu.toAggregated(wn)
+    for ts in [wn, mn, mf]:
+        y = fu.toAggregated(ts)
+        for method in ['direct', 'ortho']:
+            for polOrd in [1, 3]:
+                _, F = fathon.DFA(y, dtype=np.float32).computeFlucVec(winSizes, polOrd=polOrd, revSeg=True, method=method)
+                _, F_ref = fathon.DFA(y).computeFlucVec(winSizes, polOrd=polOrd, revSeg=True, method=method)
+                assert np.allclose(F, F_ref, rtol=1e-6, atol=0)
+
+                _, F = fathon.MFDFA(y, dtype=np.float32).computeFlucVec(winSizes, qs, polOrd=polOrd, method=method)
+                _, F_ref = fathon.MFDFA(y).computeFlucVec(winSizes, qs, polOrd=polOrd, method=method)
+                assert np.allclose(F, F_ref, rtol=1e-3, atol=0)
+
+                for overlap in ([False, True] if method == 'ortho' else [False]):
+                    _, F = fathon.DCCA(y, y2, dtype=np.float32).computeFlucVec(winSizes[:20], polOrd=polOrd, overlap=overlap, method=method)
+                    _, F_ref = fathon.DCCA(y, y2).computeFlucVec(winSizes[:20], polOrd=polOrd, overlap=overlap, method=method)
+                    assert np.allclose(F, F_ref, rtol=1e-6, atol=0)
+                    _, F = fathon.DCCA(y, y2, dtype=np.float32).computeFlucVec(winSizes[:20], polOrd=polOrd, absVals=False, overlap=overlap, method=method)
+                    _, F_ref = fathon.DCCA(y, y2).computeFlucVec(winSizes[:20], polOrd=polOrd, absVals=False, overlap=overlap, method=method)
+                    assert np.max(np.abs(F - F_ref)) < 1e-5 * np.max(np.abs(F_ref))
+
+        ht = fathon.HT(y, dtype=np.float32).computeHt([100, 500], polOrd=1, method='ortho')
+        ht_ref = fathon.HT(y).computeHt([100, 500], polOrd=1, method='ortho')
+        assert np.allclose(ht, ht_ref, rtol=0, atol=1e-5)
+
+    try:
+        fathon.DFA(wn, dtype=np.int32)
+        assert False
+    except ValueError:
+        pass
+
+#####
+# Regression test 36
+# It tests if the statistics of the profiled computations count the fits of
+# each window and do not change the results
+#####
+def test_run_stats():
+    winSizes = fu.linRangeByStep(10, 2000, step=20)
+    y = fu.toAggregated(wn)
+    y2 = fu.toAggregated(mn)
+    segs = len(y) // winSizes
+    pyDfa = fathon.DFA(y)
+    _, F_ref = pyDfa.computeFlucVec(winSizes, revSeg=True, method='direct')
+    assert pyDfa.lastRunStats is None
+
+    fu.setProfiling()
+    try:
+        for method in ['gsl', 'direct', 'ortho', 'fast']:
+            n, F = pyDfa.computeFlucVec(winSizes, revSeg=True, method=method, nJobs=2)
+            stats = pyDfa.lastRunStats
+            assert np.allclose(F, F_ref)
+            assert stats['fits'] == np.sum(2 * segs)
+            assert np.array_equal(stats['winSizes'], n)
+            assert len(stats['winCost']) == len(n) and np.all(stats['winCost'] >= 0)
+            assert len(stats['threadBusy']) == 2
+            assert np.isclose(np.sum(stats['threadBusy']), np.sum(stats['winCost']))
+            assert sum(stats['phases'].values()) <= stats['wallTime'] * (1 + 1e-6)
+            assert stats['bytesAllocated'] > 0 and not stats['cached']
+
+        pyDfa.extendFlucVec([2500, 3000])
+        assert pyDfa.lastRunStats['fits'] == 2 * (len(y) // 2500 + len(y) // 3000)
+        assert np.array_equal(pyDfa.lastRunStats['winSizes'], [2500, 3000])
+
+        pyMfdfa = fathon.MFDFA(y)
+        pyMfdfa.computeFlucVec(winSizes, [-2.0, 2.0], revSeg=True, method='ortho')
+        assert pyMfdfa.lastRunStats['fits'] == np.sum(2 * segs)
+
+        pyDcca = fathon.DCCA(y, y2)
+        pyDcca.computeFlucVec(winSizes, revSeg=True, method='direct')
+        assert pyDcca.lastRunStats['fits'] == np.sum(4 * segs)
+        pyDcca.computeRho(winSizes, method='direct')
+        assert pyDcca.lastRunStats['fits'] == np.sum(2 * segs)
+
+        pyMfdcca = fathon.MFDCCA(y, y2)
+        pyMfdcca.computeFlucVec(winSizes, [2.0], method='direct')
+        assert pyMfdcca.lastRunStats['fits'] == np.sum(2 * segs)
+
+        pyHt = fathon.HT(y)
+        pyHt.computeHt([100, 500], method='direct')
+        assert pyHt.lastRunStats['fits'] == 2 * len(y) - 600 + 2
+        assert pyHt.lastRunStats['mfdfa']['fits'] > 0
+
+        pyStream = fathon.StreamDFA(winSizes, method='direct')
+        pyStream.append(y)
+        assert pyStream.lastRunStats['fits'] == np.sum(segs)
+
+        fu.setResultCache()
+        pyDfa.computeFlucVec(winSizes)
+        pyDfa.computeFlucVec(winSizes)
+        assert pyDfa.lastRunStats['cached'] and pyDfa.lastRunStats['fits'] == 0
+    finally:
+        fu.setResultCache(0)
+        fu.clearResultCache()
+        fu.setProfiling(False)
+
+    pyDfa.computeFlucVec(winSizes)
+    assert pyDfa.lastRunStats is None
+
+#####
+# Regression test 37
+# It tests if computations profiled at the same time from different threads
+# keep their own statistics
+#####
+def test_run_stats_threads():
+    y = fu.toAggregated(wn)
+    winSizes = [fu.linRangeByStep(10, 500, step=10), fu.linRangeByStep(600, 2000, step=100)]
+    objs = [fathon.DFA(y), fathon.DFA(y)]
+
+    def compute(obj, n):
+        for _ in range(5):
+            obj.computeFlucVec(n, revSeg=True, method='direct', nJobs=1)
+
+    fu.setProfiling()
+    try:
+        soloBytes = []
+        for obj, n in zip(objs, winSizes):
+            obj.computeFlucVec(n, revSeg=True, method='direct', nJobs=1)
+            soloBytes.append(obj.lastRunStats['bytesAllocated'])
+        threads = [threading.Thread(target=compute, args=(obj, n)) for obj, n in zip(objs, winSizes)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+    finally:
+        fu.setProfiling(False)
+
+    for obj, n, nBytes in zip(objs, winSizes, soloBytes):
+        stats = obj.lastRunStats
+        assert stats['fits'] == np.sum(2 * (len(y) // n))
+        assert len(stats['winCost']) == len(n) and np.all(stats['winCost'] > 0)
+        assert len(stats['threadBusy']) == 1
+        assert np.isclose(stats['threadBusy'][0], np.sum(stats['winCost']))
+        assert stats['bytesAllocated'] == nBytes > 0
+
+#####
+# Regression test 38
+# It tests if the fits of many intervals at the same time are the same
+# of the ones of `fitFlucVec` when the window's sizes are not sorted
+#####
+def test_multi_fit_unsorted_windows():
+    winSizes = np.array([10, 300, 50, 800, 100, 1000], dtype=int)
+    pydfa = fathon.DFA(fu.toAggregated(mf))
+    n, F = pydfa.computeFlucVec(winSizes, polOrd=2)
+    limits = np.array([[10, 800], [50, 1000]], dtype=int)
+    H, H_int = pydfa.multiFitFlucVec(limits)
+    for i, (nStart, nEnd) in enumerate(limits):
+        h, h_int = pydfa.fitFlucVec(nStart=nStart, nEnd=nEnd)
+        assert math.isclose(H[i], h, rel_tol=1e-10) and math.isclose(H_int[i], h_int, rel_tol=1e-10)
+
+    try:
+        pydfa.multiFitFlucVec(np.array([[50, 300]], dtype=int))
+        assert False
+    except ValueError:
+        pass
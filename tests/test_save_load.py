@@ -2,6 +2,7 @@ import numpy as np
 import fathon
 from fathon import fathonUtils as fu
 import os
+import pickle
 
 # FUNCTIONALITY TESTS
 # -------------------
@@ -204,3 +205,88 @@ def test_mfdcca_save_load():
     assert np.array_equal(H_2, H)
     assert np.array_equal(I_2, I)
 
+#####
+# Functionality test 6
+# Load objects saved with the former pickle format
+#####
+def test_pickle_load():
+    dfa = fathon.DFA(fu.toAggregated(ts))
+    n, F = dfa.computeFlucVec(fu.linRangeByStep(10, 500))
+    H, I = dfa.fitFlucVec(100, 300)
+    saveDict = {'kind': 'dfa', 'tsVec': fu.toAggregated(ts).tolist(), 'n': n.tolist(), 'F': F.tolist(), 'isComputed': True}
+    f = open(get_object_path('dfa_pickle_obj', ext=True), 'wb')
+    pickle.dump(saveDict, f)
+    f.close()
+    F_load = fu.getObjectMember(get_object_path('dfa_pickle_obj', ext=True), 'F')
+    assert np.array_equal(F_load, F)
+    dfa_2 = fathon.DFA(get_object_path('dfa_pickle_obj', ext=True))
+    H_2, I_2 = dfa_2.fitFlucVec(100, 300)
+    assert H_2 == H
+    assert I_2 == I
+    os.remove(get_object_path('dfa_pickle_obj', ext=True))
+
+#####
+# Functionality test 7
+# Lazy loading of a single member of a binary file
+#####
+def test_binary_member_mmap():
+    ht = fathon.HT(fu.toAggregated(ts))
+    ht_mtx = ht.computeHt(np.array([100, 300], dtype=np.int64))
+    ht.saveObject(get_object_path('ht_obj'))
+    ht_load = fu.getObjectMember(get_object_path('ht_obj', ext=True), 'ht')
+    assert isinstance(ht_load, np.memmap)
+    assert ht_load.shape == ht_mtx.shape and ht_load.dtype == ht_mtx.dtype
+    assert np.array_equal(ht_load, ht_mtx)
+    with open(get_object_path('ht_obj', ext=True), 'rb') as f:
+        assert f.read(len(fu._FATHON_MAGIC)) == fu._FATHON_MAGIC
+    try:
+        fu.getObjectMember(get_object_path('ht_obj', ext=True), 'F')
+        assert False
+    except ValueError:
+        pass
+
+#####
+# Functionality test 8
+# Save only the results of the objects and reload
+#####
+def test_results_only_save_load():
+    y = fu.toAggregated(ts)
+    dfa = fathon.DFA(y)
+    n, F = dfa.computeFlucVec(fu.linRangeByStep(10, 500))
+    H, I = dfa.fitFlucVec(100, 300)
+    list_H, list_I = dfa.multiFitFlucVec(np.array([[10, 100], [100, 500]], dtype=int))
+    dfa.saveObject(get_object_path('dfa_res_obj'), saveTs=False)
+    assert fu.getObjectMember(get_object_path('dfa_res_obj', ext=True), 'tsHash') == fu.seriesHash(y)
+    dfa_2 = fathon.DFA(get_object_path('dfa_res_obj', ext=True))
+    assert dfa_2.fitFlucVec(100, 300) == (H, I)
+    list_H_2, list_I_2 = dfa_2.multiFitFlucVec(np.array([[10, 100], [100, 500]], dtype=int))
+    assert np.array_equal(list_H_2, list_H) and np.array_equal(list_I_2, list_I)
+    try:
+        dfa_2.computeFlucVec(fu.linRangeByStep(10, 500))
+        assert False
+    except ValueError:
+        pass
+    # saving again keeps the hash of the original time series
+    dfa_2.saveObject(get_object_path('dfa_res_obj'))
+    assert fu.getObjectMember(get_object_path('dfa_res_obj', ext=True), 'tsHash') == fu.seriesHash(y)
+    os.remove(get_object_path('dfa_res_obj', ext=True))
+
+    mfdfa = fathon.MFDFA(y)
+    n, F = mfdfa.computeFlucVec(fu.linRangeByStep(10, 500), fu.linRangeByStep(-3, 3))
+    H, I = mfdfa.fitFlucVec()
+    tau = mfdfa.computeMassExponents()
+    alpha, mfSpect = mfdfa.computeMultifractalSpectrum()
+    mfdfa.saveObject(get_object_path('mfdfa_res_obj'), saveTs=False)
+    mfdfa_2 = fathon.MFDFA(get_object_path('mfdfa_res_obj', ext=True))
+    H_2, I_2 = mfdfa_2.fitFlucVec()
+    assert np.array_equal(H_2, H) and np.array_equal(I_2, I)
+    assert np.array_equal(mfdfa_2.computeMassExponents(), tau)
+    alpha_2, mfSpect_2 = mfdfa_2.computeMultifractalSpectrum()
+    assert np.array_equal(alpha_2, alpha) and np.array_equal(mfSpect_2, mfSpect)
+    os.remove(get_object_path('mfdfa_res_obj', ext=True))
+
+    dcca = fathon.DCCA(y, y[::-1])
+    dcca.computeFlucVec(fu.linRangeByStep(10, 500))
+    dcca.saveObject(get_object_path('dcca_res_obj'), saveTs=False)
+    assert fu.getObjectMember(get_object_path('dcca_res_obj', ext=True), 'tsHash') == fu.seriesHash(y, y[::-1])
+    os.remove(get_object_path('dcca_res_obj', ext=True))